@@ -1,10 +1,134 @@
+import asyncio
 from maestroia.core.state import MaestroState
-from maestroia.services.openai_service import chat as openai_chat, generate_image
+from maestroia.services.openai_service import (
+    chat as openai_chat,
+    achat as openai_achat,
+    generate_image,
+    agenerate_image,
+)
+from maestroia.services.engagement import best_windows_text
+
+# Templates por canal
+TEMPLATES = {
+    "instagram": """
+    📸 **Post para Instagram:**
+    - **Texto (até 2200 caracteres):** [Texto envolvente e visual]
+    - **Hashtags:** #exemplo #conteudo
+    - **Call to Action:** "Curtiu? Salve e compartilhe!"
+    - **Imagem:** [Descrição detalhada para geração]
+    """,
+    "facebook": """
+    📘 **Post para Facebook:**
+    - **Texto (até 63206 caracteres):** [Texto informativo e conversacional]
+    - **Hashtags:** #exemplo #conteudo
+    - **Call to Action:** "Comente sua opinião!"
+    - **Imagem:** [Descrição para geração]
+    """,
+    "twitter/x": """
+    🐦 **Tweet para Twitter/X:**
+    - **Texto (até 280 caracteres):** [Texto conciso e impactante]
+    - **Hashtags:** #exemplo
+    - **Mencionar:** @conta_relevante
+    - **Imagem:** [Descrição opcional]
+    """,
+    "linkedin": """
+    💼 **Post para LinkedIn:**
+    - **Texto profissional:** [Conteúdo B2B, insights valiosos]
+    - **Hashtags:** #business #marketing
+    - **Call to Action:** "O que você acha? Compartilhe nos comentários!"
+    - **Imagem:** [Gráfico ou infográfico profissional]
+    """,
+    "tiktok": """
+    🎵 **Vídeo para TikTok:**
+    - **Duração:** 15-60 segundos
+    - **Roteiro:** [Passos do vídeo, fala, música]
+    - **Hashtags:** #viral #conteudo
+    - **Thumbnail:** [Descrição atraente]
+    """,
+    "youtube": """
+    📺 **Vídeo para YouTube:**
+    - **Título:** [Título otimizado para SEO]
+    - **Descrição:** [Descrição com keywords, links]
+    - **Thumbnail:** [Descrição chamativa]
+    - **Tags:** palavra1, palavra2
+    """,
+    "pinterest": """
+    📌 **Pin para Pinterest:**
+    - **Título:** [Título descritivo]
+    - **Descrição:** [Texto otimizado]
+    - **Link:** [URL de destino]
+    - **Imagem:** [Imagem vertical atraente]
+    """,
+    "snapchat": """
+    👻 **Story para Snapchat:**
+    - **Conteúdo:** [Texto curto, emoji, sticker]
+    - **Duração:** 24 horas
+    - **Filtro/Geofiltro:** [Sugestão]
+    """,
+    "google ads": """
+    📢 **Anúncio para Google Ads:**
+    - **Título:** [Título atraente, até 30 caracteres]
+    - **Descrição:** [Descrição persuasiva, até 90 caracteres]
+    - **URL:** [Página de destino]
+    - **Keywords:** [Lista de palavras-chave]
+    """
+}
+
+
+def _prompt_canal(canal: str, estrategia: str, publico: str = None) -> str:
+    template = TEMPLATES.get(canal.lower(), TEMPLATES["instagram"])
+    # Melhores horários vindos do histórico de engajamento (vazio sem dados)
+    horarios = best_windows_text(canal, publico)
+    if horarios:
+        horarios = f"""
+    Melhores horários para publicar neste canal e nicho (histórico de engajamento): {horarios}.
+    Adapte o tom e a chamada ao momento em que o post será visto.
+    """
+
+    return f"""
+    Você é um especialista em criação de conteúdo para {canal}.
+
+    Estratégia da campanha:
+    {estrategia}
+
+    Use este template para criar conteúdo otimizado:
+    {template}
+
+    Preencha o template com conteúdo relevante e persuasivo.
+    {horarios}"""
+
+
+def gerar_conteudo_canal(canal: str, estrategia: str, publico: str = None) -> str:
+    """Gera o conteúdo de um único canal a partir da estratégia."""
+    resposta_text = openai_chat(_prompt_canal(canal, estrategia, publico))
+    return f"**{canal}:**\n{resposta_text.strip()}"
+
+
+async def gerar_conteudo_canal_async(canal: str, estrategia: str, publico: str = None) -> str:
+    resposta_text = await openai_achat(_prompt_canal(canal, estrategia, publico))
+    return f"**{canal}:**\n{resposta_text.strip()}"
+
+
+IMAGE_PROMPT = "Uma imagem inspiradora para marketing digital sustentável"
+
+
+def gerar_imagens() -> list:
+    image_urls = generate_image(IMAGE_PROMPT, n=1)
+    return image_urls if image_urls else ["fallback_image"]
+
+
+async def gerar_imagens_async() -> list:
+    image_urls = await agenerate_image(IMAGE_PROMPT, n=1)
+    return image_urls if image_urls else ["fallback_image"]
+
 
 def agente_criador_conteudo(state: MaestroState) -> MaestroState:
     """
     Agente responsável por criar conteúdos de marketing
     com base na estratégia definida, otimizados por canal.
+
+    Quando o estado traz `canal` (ramo paralelo do grafo), gera apenas o
+    conteúdo desse canal; caso contrário percorre todos os `canais`.
     """
 
     estrategia = state.get("estrategia")
@@ -15,102 +139,51 @@ def agente_criador_conteudo(state: MaestroState) -> MaestroState:
             "erros": ["Estratégia não encontrada no estado."]
         }
 
-    conteudos = []
-
-    # Templates por canal
-    templates = {
-        "instagram": """
-        📸 **Post para Instagram:**
-        - **Texto (até 2200 caracteres):** [Texto envolvente e visual]
-        - **Hashtags:** #exemplo #conteudo
-        - **Call to Action:** "Curtiu? Salve e compartilhe!"
-        - **Imagem:** [Descrição detalhada para geração]
-        """,
-        "facebook": """
-        📘 **Post para Facebook:**
-        - **Texto (até 63206 caracteres):** [Texto informativo e conversacional]
-        - **Hashtags:** #exemplo #conteudo
-        - **Call to Action:** "Comente sua opinião!"
-        - **Imagem:** [Descrição para geração]
-        """,
-        "twitter/x": """
-        🐦 **Tweet para Twitter/X:**
-        - **Texto (até 280 caracteres):** [Texto conciso e impactante]
-        - **Hashtags:** #exemplo
-        - **Mencionar:** @conta_relevante
-        - **Imagem:** [Descrição opcional]
-        """,
-        "linkedin": """
-        💼 **Post para LinkedIn:**
-        - **Texto profissional:** [Conteúdo B2B, insights valiosos]
-        - **Hashtags:** #business #marketing
-        - **Call to Action:** "O que você acha? Compartilhe nos comentários!"
-        - **Imagem:** [Gráfico ou infográfico profissional]
-        """,
-        "tiktok": """
-        🎵 **Vídeo para TikTok:**
-        - **Duração:** 15-60 segundos
-        - **Roteiro:** [Passos do vídeo, fala, música]
-        - **Hashtags:** #viral #conteudo
-        - **Thumbnail:** [Descrição atraente]
-        """,
-        "youtube": """
-        📺 **Vídeo para YouTube:**
-        - **Título:** [Título otimizado para SEO]
-        - **Descrição:** [Descrição com keywords, links]
-        - **Thumbnail:** [Descrição chamativa]
-        - **Tags:** palavra1, palavra2
-        """,
-        "pinterest": """
-        📌 **Pin para Pinterest:**
-        - **Título:** [Título descritivo]
-        - **Descrição:** [Texto otimizado]
-        - **Link:** [URL de destino]
-        - **Imagem:** [Imagem vertical atraente]
-        """,
-        "snapchat": """
-        👻 **Story para Snapchat:**
-        - **Conteúdo:** [Texto curto, emoji, sticker]
-        - **Duração:** 24 horas
-        - **Filtro/Geofiltro:** [Sugestão]
-        """,
-        "google ads": """
-        📢 **Anúncio para Google Ads:**
-        - **Título:** [Título atraente, até 30 caracteres]
-        - **Descrição:** [Descrição persuasiva, até 90 caracteres]
-        - **URL:** [Página de destino]
-        - **Keywords:** [Lista de palavras-chave]
-        """
+    publico = state.get("publico_alvo")
+    canal = state.get("canal")
+    if canal:
+        return {"conteudos": [gerar_conteudo_canal(canal, estrategia, publico)]}
+
+    conteudos = [gerar_conteudo_canal(c, estrategia, publico) for c in canais]
+
+    return {
+        "conteudos": conteudos,
+        "imagens": gerar_imagens()
     }
 
-    for canal in canais:
-        canal_lower = canal.lower()
-        template = templates.get(canal_lower, templates["instagram"])
 
-        prompt = f"""
-        Você é um especialista em criação de conteúdo para {canal}.
+def agente_gerador_imagem(state: MaestroState) -> MaestroState:
+    """Gera as imagens da campanha em paralelo aos ramos de conteúdo."""
+    return {"imagens": gerar_imagens()}
 
-        Estratégia da campanha:
-        {estrategia}
 
-        Use este template para criar conteúdo otimizado:
-        {template}
+async def agente_criador_conteudo_async(state: MaestroState) -> MaestroState:
+    """Versão assíncrona de `agente_criador_conteudo`; sem `canal`, gera todos os canais concorrentemente."""
 
-        Preencha o template com conteúdo relevante e persuasivo.
-        """
+    estrategia = state.get("estrategia")
+    canais = state.get("canais", ["Instagram"])
 
-        resposta_text = openai_chat(prompt)
-        conteudo = f"**{canal}:**\n{resposta_text.strip()}"
-        conteudos.append(conteudo)
+    if not estrategia:
+        return {
+            "erros": ["Estratégia não encontrada no estado."]
+        }
 
-    image_prompt = "Uma imagem inspiradora para marketing digital sustentável"
-    image_urls = generate_image(image_prompt, n=1)
-    if image_urls:
-        imagens = image_urls
-    else:
-        imagens = ["fallback_image"]
+    publico = state.get("publico_alvo")
+    canal = state.get("canal")
+    if canal:
+        return {"conteudos": [await gerar_conteudo_canal_async(canal, estrategia, publico)]}
+
+    *conteudos, imagens = await asyncio.gather(
+        *(gerar_conteudo_canal_async(c, estrategia, publico) for c in canais),
+        gerar_imagens_async(),
+    )
 
     return {
-        "conteudos": conteudos,
+        "conteudos": list(conteudos),
         "imagens": imagens
     }
+
+
+async def agente_gerador_imagem_async(state: MaestroState) -> MaestroState:
+    """Versão assíncrona de `agente_gerador_imagem`."""
+    return {"imagens": await gerar_imagens_async()}
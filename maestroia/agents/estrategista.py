@@ -1,24 +1,15 @@
 from maestroia.core.state import MaestroState
-from maestroia.services.openai_service import chat as openai_chat
+from maestroia.services.openai_service import chat as openai_chat, achat as openai_achat
+from maestroia.memory.semantic_cache import semantic_cache
 
 
-def agente_estrategista(state: MaestroState) -> MaestroState:
-    """
-    Agente responsável por transformar a pesquisa de mercado
-    em uma estratégia de marketing prática e estruturada.
-    """
-
+def _prompt_estrategia(state: MaestroState) -> str:
     pesquisa = state.get("pesquisa")
     objetivo = state.get("objetivo", "Crescimento de marca")
     publico = state.get("publico_alvo", "Público geral")
     canais = state.get("canais", ["Instagram", "Google"])
 
-    if not pesquisa:
-        return {
-            "erros": ["Pesquisa de mercado não encontrada no estado."]
-        }
-
-    prompt = f"""
+    return f"""
     Você é um estrategista de marketing digital sênior.
 
     Objetivo: {objetivo}
@@ -37,7 +28,46 @@ def agente_estrategista(state: MaestroState) -> MaestroState:
     Seja claro, direto e profissional.
     """
 
-    resposta_text = openai_chat(prompt)
+
+def _pedido(state: MaestroState) -> str:
+    # A pesquisa fica de fora: para o mesmo objetivo/público ela é praticamente a mesma
+    objetivo = state.get("objetivo", "Crescimento de marca")
+    publico = state.get("publico_alvo", "Público geral")
+    canais = state.get("canais", ["Instagram", "Google"])
+    return f"Estratégia de marketing\nObjetivo: {objetivo}\nPúblico-alvo: {publico}\nCanais: {', '.join(canais)}"
+
+
+def agente_estrategista(state: MaestroState) -> MaestroState:
+    """
+    Agente responsável por transformar a pesquisa de mercado
+    em uma estratégia de marketing prática e estruturada.
+    """
+
+    if not state.get("pesquisa"):
+        return {
+            "erros": ["Pesquisa de mercado não encontrada no estado."]
+        }
+
+    resposta_text = semantic_cache.get_or_generate(
+        "estrategista", _pedido(state), lambda: openai_chat(_prompt_estrategia(state))
+    )
+
+    return {
+        "estrategia": resposta_text
+    }
+
+
+async def agente_estrategista_async(state: MaestroState) -> MaestroState:
+    """Versão assíncrona de `agente_estrategista`."""
+
+    if not state.get("pesquisa"):
+        return {
+            "erros": ["Pesquisa de mercado não encontrada no estado."]
+        }
+
+    resposta_text = await semantic_cache.aget_or_generate(
+        "estrategista", _pedido(state), lambda: openai_achat(_prompt_estrategia(state))
+    )
 
     return {
         "estrategia": resposta_text
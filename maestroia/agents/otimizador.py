@@ -1,5 +1,9 @@
 from maestroia.core.state import MaestroState
-from maestroia.services.openai_service import chat as openai_chat
+from maestroia.services.openai_service import chat as openai_chat, achat as openai_achat
+
+# Simulação de otimização (integrar analytics reais futuramente)
+METRICAS_SIMULADAS = {"cliques": 150, "conversoes": 10, "roi": 2.5}
+
 
 def agente_otimizador(state: MaestroState) -> MaestroState:
     """
@@ -9,9 +13,21 @@ def agente_otimizador(state: MaestroState) -> MaestroState:
     if not publicacoes:
         return {"erros": ["Publicações não encontradas no estado."]}
 
-    # Simulação de otimização (integrar analytics reais futuramente)
-    metricas = {"cliques": 150, "conversoes": 10, "roi": 2.5}
+    metricas = dict(METRICAS_SIMULADAS)
     prompt = f"Otimize com base em métricas: {metricas} para publicações: {publicacoes}"
     resposta_text = openai_chat(prompt)
 
     return {"metricas": metricas, "otimizacao": resposta_text}
+
+
+async def agente_otimizador_async(state: MaestroState) -> MaestroState:
+    """Versão assíncrona de `agente_otimizador`."""
+    publicacoes = state.get("publicacoes", [])
+    if not publicacoes:
+        return {"erros": ["Publicações não encontradas no estado."]}
+
+    metricas = dict(METRICAS_SIMULADAS)
+    prompt = f"Otimize com base em métricas: {metricas} para publicações: {publicacoes}"
+    resposta_text = await openai_achat(prompt)
+
+    return {"metricas": metricas, "otimizacao": resposta_text}
@@ -1,29 +1,24 @@
+import asyncio
 from maestroia.config.settings import (
     ENVIRONMENT,
     DEFAULT_LLM_MODEL,
     DEFAULT_TEMPERATURE,
 )
 from maestroia.core.state import MaestroState
-from maestroia.services.trends_service import get_trends_summary
-from maestroia.services.openai_service import chat as openai_chat
+from maestroia.services.trends_service import get_trends_summary, trend_keywords
+from maestroia.services.openai_service import chat as openai_chat, achat as openai_achat
+from maestroia.memory.semantic_cache import semantic_cache
 
-def agente_pesquisador(state: MaestroState) -> MaestroState:
-    """
-    Agente responsável por analisar o mercado e identificar tendências relevantes.
-    """
 
+def _contexto(state: MaestroState):
     objetivo = state.get("objetivo", "Marketing digital")
     publico = state.get("publico_alvo", "Público geral")
+    return objetivo, publico
 
-    # Buscar tendências via trends_service (pytrends encapsulado)
-    keywords = [objetivo, publico]
-    trends_summary = get_trends_summary(keywords)
-
-    # Simulação de dados SEMrush (API paga - integrar chave real futuramente)
-    semrush_data = f"Dados do SEMrush (dezembro 2024): Palavras-chave relacionadas '{objetivo}' com volume estimado de 8.500-12.000 buscas mensais globais, dificuldade de SEO média-alta (65/100). Palavras-chave relacionadas '{publico}' com volume de 4.200-6.800 buscas mensais, tendência de crescimento de 15% nos últimos 3 meses."
 
+def _prompt_concorrentes(objetivo: str, publico: str) -> str:
     # Usar LLM para identificar concorrentes reais
-    concorrentes_prompt = f"""
+    return f"""
     Baseado no objetivo de marketing "{objetivo}" e público-alvo "{publico}",
     identifique 3-5 concorrentes reais no mercado brasileiro ou internacional que atuam nessa área.
     Foque em empresas ou profissionais conhecidos nessa especialidade.
@@ -31,12 +26,14 @@ def agente_pesquisador(state: MaestroState) -> MaestroState:
     Para cada concorrente, inclua uma breve justificativa baseada em dados ou reconhecimento de mercado.
     """
 
-    concorrentes = openai_chat(concorrentes_prompt)
-    concorrentes = concorrentes.strip()
+
+def _prompt_analise(objetivo: str, publico: str, trends_summary: str, concorrentes: str) -> str:
+    # Simulação de dados SEMrush (API paga - integrar chave real futuramente)
+    semrush_data = f"Dados do SEMrush (dezembro 2024): Palavras-chave relacionadas '{objetivo}' com volume estimado de 8.500-12.000 buscas mensais globais, dificuldade de SEO média-alta (65/100). Palavras-chave relacionadas '{publico}' com volume de 4.200-6.800 buscas mensais, tendência de crescimento de 15% nos últimos 3 meses."
 
     semrush_data += f" Concorrentes identificados: {concorrentes}."
 
-    prompt = f"""
+    return f"""
     Analise o mercado de marketing digital considerando:
 
     Objetivo: {objetivo}
@@ -60,7 +57,59 @@ def agente_pesquisador(state: MaestroState) -> MaestroState:
     "Dados do SEMrush mostram que..."
     """
 
-    resposta_text = openai_chat(prompt)
+
+def _pedido(objetivo: str, publico: str) -> str:
+    # O que identifica a pesquisa no cache semântico (tendências e concorrentes derivam disso)
+    return f"Pesquisa de mercado\nObjetivo: {objetivo}\nPúblico-alvo: {publico}"
+
+
+def _pesquisar(objetivo: str, publico: str) -> str:
+    # Buscar tendências via trends_service (pytrends encapsulado); frases inteiras não têm volume
+    trends_summary = get_trends_summary(trend_keywords(objetivo, publico))
+
+    concorrentes = openai_chat(_prompt_concorrentes(objetivo, publico)).strip()
+
+    return openai_chat(_prompt_analise(objetivo, publico, trends_summary, concorrentes))
+
+
+async def _apesquisar(objetivo: str, publico: str) -> str:
+    trends_summary, concorrentes = await asyncio.gather(
+        asyncio.to_thread(get_trends_summary, trend_keywords(objetivo, publico)),
+        openai_achat(_prompt_concorrentes(objetivo, publico)),
+    )
+
+    return await openai_achat(_prompt_analise(objetivo, publico, trends_summary, concorrentes.strip()))
+
+
+def agente_pesquisador(state: MaestroState) -> MaestroState:
+    """
+    Agente responsável por analisar o mercado e identificar tendências relevantes.
+
+    Com SEMANTIC_CACHE_ENABLED, reaproveita a pesquisa de um objetivo/público parecido.
+    """
+
+    objetivo, publico = _contexto(state)
+
+    resposta_text = semantic_cache.get_or_generate(
+        "pesquisador", _pedido(objetivo, publico), lambda: _pesquisar(objetivo, publico)
+    )
+
+    return {
+        "pesquisa": resposta_text
+    }
+
+
+async def agente_pesquisador_async(state: MaestroState) -> MaestroState:
+    """Versão assíncrona de `agente_pesquisador`.
+
+    Google Trends (bloqueante) roda em thread, em paralelo à busca de concorrentes.
+    """
+
+    objetivo, publico = _contexto(state)
+
+    resposta_text = await semantic_cache.aget_or_generate(
+        "pesquisador", _pedido(objetivo, publico), lambda: _apesquisar(objetivo, publico)
+    )
 
     return {
         "pesquisa": resposta_text
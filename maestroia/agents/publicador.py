@@ -1,5 +1,7 @@
-import requests
-import tweepy
+import uuid
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from maestroia.config import settings
 from maestroia.config.settings import (
     OPENAI_API_KEY,
     DEFAULT_LLM_MODEL,
@@ -16,9 +18,12 @@ from maestroia.config.settings import (
     YOUTUBE_API_KEY,
     PINTEREST_ACCESS_TOKEN,
     SNAPCHAT_ACCESS_TOKEN,
+    PUBLISH_RATE_WAIT_SECONDS,
 )
 from maestroia.core.state import MaestroState
 from maestroia.services.openai_service import chat as openai_chat
+from maestroia.services.publishing import http_session, twitter_client, plataforma, limiter, executor
+from maestroia.services.outbox import publication_outbox, outbox_worker
 
 # Imports condicionais para evitar erros se bibliotecas não estiverem instaladas
 try:
@@ -48,7 +53,7 @@ Conteúdo pronto para publicação: {conteudo[:100]}..."""
                 "message": conteudo,
                 "access_token": META_ACCESS_TOKEN
             }
-            response = requests.post(url, data=params)
+            response = http_session().post(url, data=params)
             if response.status_code == 200:
                 post_id = response.json().get("id")
                 return f"Publicado no Facebook com sucesso (ID: {post_id})"
@@ -103,13 +108,7 @@ def publicar_twitter(conteudo: str) -> str:
 Tweet pronto: {conteudo[:100]}..."""
     
     try:
-        client = tweepy.Client(
-            consumer_key=TWITTER_API_KEY,
-            consumer_secret=TWITTER_API_SECRET,
-            access_token=TWITTER_ACCESS_TOKEN,
-            access_token_secret=TWITTER_ACCESS_TOKEN_SECRET
-        )
-        response = client.create_tweet(text=conteudo[:280])  # Limite do Twitter
+        response = twitter_client().create_tweet(text=conteudo[:280])  # Limite do Twitter
         return f"Tweet publicado com sucesso (ID: {response.data['id']})"
     except Exception as e:
         return f"Erro ao publicar no Twitter: {str(e)}"
@@ -150,7 +149,7 @@ Post profissional pronto: {conteudo[:100]}..."""
                 "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
             }
         }
-        response = requests.post(url, headers=headers, json=data)
+        response = http_session().post(url, headers=headers, json=data)
         if response.status_code == 201:
             return "Post publicado no LinkedIn com sucesso"
         else:
@@ -216,10 +215,99 @@ def publicar_snapchat(conteudo: str) -> str:
     # TODO: Implementar Snapchat API
     return f"Story publicado no Snapchat com sucesso (API Snapchat): {conteudo[:100]}..."
 
-def agente_publicador(state: MaestroState) -> MaestroState:
+def publicar_canal(canal: str, conteudo: str) -> str:
+    """Publica `conteudo` no canal indicado e retorna o status da publicação.
+
+    Respeita o limite de publicações por minuto da plataforma; se não houver
+    vaga em `PUBLISH_RATE_WAIT_SECONDS`, desiste sem chamar a API.
+    """
+    if not limiter(plataforma(canal)).acquire(timeout=PUBLISH_RATE_WAIT_SECONDS):
+        return f"Limite de publicações em {canal} atingido; tente novamente mais tarde."
+    canal_lower = canal.lower()
+
+    if canal_lower in ["instagram", "facebook"]:
+        return publicar_instagram_facebook(conteudo, canal)
+    elif canal_lower == "google ads":
+        return publicar_google_ads(conteudo)
+    elif canal_lower in ["twitter/x", "twitter"]:
+        return publicar_twitter(conteudo)
+    elif canal_lower == "linkedin":
+        return publicar_linkedin(conteudo)
+    elif canal_lower == "tiktok":
+        return publicar_tiktok(conteudo)
+    elif canal_lower == "youtube":
+        return publicar_youtube(conteudo)
+    elif canal_lower == "pinterest":
+        return publicar_pinterest(conteudo)
+    elif canal_lower == "snapchat":
+        return publicar_snapchat(conteudo)
+    return f"Publicação em {canal} não suportada ainda."
+
+def publicacao_falhou(resultado: str) -> bool:
+    """True para os status de `publicar_canal` que valem uma nova tentativa."""
+    return resultado.startswith(("Erro", "Limite de publicações"))
+
+def enfileirar_publicacoes(pares: list, campaign_id: Optional[str] = None) -> dict:
+    """Põe [(canal, conteudo)] na outbox e retorna na hora; os workers publicam depois.
+
+    A chave de idempotência (campanha + canal + conteúdo) impede publicar o
+    mesmo post duas vezes quando a campanha é executada de novo; sem
+    `campaign_id`, cada chamada é uma execução nova (nonce próprio).
+    """
+    outbox_worker.start()
+    nonce = uuid.uuid4().hex if campaign_id is None else None
+    publicacoes = {}
+    for canal, conteudo in pares:
+        chave, inserida = publication_outbox.enqueue(campaign_id, canal, conteudo, nonce=nonce)
+        if inserida:
+            publicacoes[canal] = f"Publicação em {canal} na fila (chave {chave[:16]})"
+        else:
+            publicacoes[canal] = f"Publicação em {canal} já enfileirada antes para esta campanha (chave {chave[:16]}); ignorada"
+    return publicacoes
+
+def publicar_canais(pares: list) -> dict:
+    """Publica [(canal, conteudo)] em todos os canais ao mesmo tempo (pool compartilhado).
+
+    Um canal lento ou fora do ar não atrasa os demais além do próprio timeout.
+    """
+    futuros = {canal: executor().submit(publicar_canal, canal, conteudo) for canal, conteudo in pares}
+    publicacoes = {}
+    for canal, futuro in futuros.items():
+        try:
+            publicacoes[canal] = futuro.result()
+        except Exception as e:
+            publicacoes[canal] = f"Erro ao publicar no {canal}: {e}"
+    return publicacoes
+
+def conteudo_do_canal(conteudos: list, indice: int) -> str:
+    """Conteúdo gerado para o canal na posição `indice` (mesma ordem de `canais`)."""
+    if not conteudos:
+        return "Conteúdo de exemplo"
+    return conteudos[indice] if indice < len(conteudos) else conteudos[0]
+
+def _publicar(pares: list, config: Optional[RunnableConfig]) -> dict:
+    if not settings.PUBLISH_OUTBOX_ENABLED:
+        if len(pares) == 1:
+            # Ramo paralelo de um canal: a falha volta como status (publicar_canal não levanta), sem retentativa
+            canal, conteudo = pares[0]
+            return {canal: publicar_canal(canal, conteudo)}
+        return publicar_canais(pares)
+    # Id da campanha = thread do checkpointer (None quando a campanha roda sem id)
+    campaign_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return enfileirar_publicacoes(pares, campaign_id)
+
+def agente_publicador(state: MaestroState, config: Optional[RunnableConfig] = None) -> MaestroState:
     """
     Agente responsável por publicar conteúdos em plataformas reais ou simuladas.
+
+    Quando o estado traz `canal` e `conteudo` (ramo paralelo do grafo), publica
+    apenas nesse canal; caso contrário publica em todos os `canais`. Com
+    `PUBLISH_OUTBOX_ENABLED`, só enfileira na outbox e retorna imediatamente.
     """
+    canal = state.get("canal")
+    if canal and state.get("conteudo"):
+        return {"publicacoes": _publicar([(canal, state["conteudo"])], config)}
+
     conteudos = state.get("conteudos", [])
     canais = state.get("canais", [])
     if not conteudos:
@@ -228,29 +316,7 @@ def agente_publicador(state: MaestroState) -> MaestroState:
     if not canais:
         return {"erros": ["Nenhum canal especificado para publicação."]}
 
-    # Publicação por canal
-    publicacoes = {}
-    for canal in canais:
-        canal_lower = canal.lower()
-        conteudo = conteudos[0] if conteudos else "Conteúdo de exemplo"
-        
-        if canal_lower in ["instagram", "facebook"]:
-            publicacoes[canal] = publicar_instagram_facebook(conteudo, canal)
-        elif canal_lower == "google ads":
-            publicacoes[canal] = publicar_google_ads(conteudo)
-        elif canal_lower in ["twitter/x", "twitter"]:
-            publicacoes[canal] = publicar_twitter(conteudo)
-        elif canal_lower == "linkedin":
-            publicacoes[canal] = publicar_linkedin(conteudo)
-        elif canal_lower == "tiktok":
-            publicacoes[canal] = publicar_tiktok(conteudo)
-        elif canal_lower == "youtube":
-            publicacoes[canal] = publicar_youtube(conteudo)
-        elif canal_lower == "pinterest":
-            publicacoes[canal] = publicar_pinterest(conteudo)
-        elif canal_lower == "snapchat":
-            publicacoes[canal] = publicar_snapchat(conteudo)
-        else:
-            publicacoes[canal] = f"Publicação em {canal} não suportada ainda."
+    # Publicação em todos os canais em paralelo
+    publicacoes = _publicar([(canal, conteudo_do_canal(conteudos, i)) for i, canal in enumerate(canais)], config)
 
     return {"publicacoes": publicacoes}
@@ -1,33 +1,301 @@
-
-# Rota para buscar histórico de campanhas do usuário autenticado
-@app.get("/campaign/history")
-def get_campaign_history(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    campaigns = db.query(Campaign).filter(Campaign.user_id == current_user.id).all()
-    history = []
-    for c in campaigns:
-        history.append({
-            "id": c.id,
-            "objetivo": c.objetivo,
-            "publico_alvo": c.publico_alvo,
-            "canais": c.canais.split(",") if c.canais else [],
-            "orcamento": c.orcamento,
-            "resultado": json.loads(c.resultado) if c.resultado else None
-        })
-    return {"history": history}
-
+from contextlib import contextmanager
+from typing import Optional
 from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from maestroia.graphs.marketing_graph import build_marketing_graph
+from maestroia.services.campaign_service import arun_campaign, astream_campaign
 from maestroia.core.state import MaestroState
-from maestroia.core.database import get_db, User, hash_password, verify_password
-from maestroia.core.auth import create_access_token, get_current_user
+from maestroia.core.database import get_db, SessionLocal, User, Campaign, hash_password, verify_password
+from maestroia.core.auth import create_access_token, get_current_user, user_claims, user_cache
 import json
 import mercadopago
 from maestroia.config.settings import MERCADOPAGO_ACCESS_TOKEN
 from maestroia.services.meta_service import get_meta_oauth_url, exchange_code_for_token
 from maestroia.services.token_store import save_token
-from maestroia.config.settings import META_REDIRECT_URI
+from maestroia.config.settings import META_REDIRECT_URI, TRENDS_PREWARM_ENABLED, SCHEDULER_ENABLED, PUBLISH_OUTBOX_ENABLED
+from maestroia.services.trends_prewarm import trends_prewarmer
+from maestroia.services.scheduler import post_scheduler
+from maestroia.services.outbox import outbox_worker
+from maestroia.services.jobs import campaign_jobs, JobQueueFull
+
+app = FastAPI(title="MaestroIA API")
+
+
+@app.on_event("startup")
+def _iniciar_aquecimento_trends():
+    if TRENDS_PREWARM_ENABLED:
+        trends_prewarmer.start()
+
+
+@app.on_event("startup")
+def _iniciar_agendador():
+    if SCHEDULER_ENABLED:
+        post_scheduler.start()
+
+
+@app.on_event("startup")
+def _iniciar_outbox():
+    # Publicações pendentes de antes de um restart saem sem esperar um novo enfileiramento
+    if PUBLISH_OUTBOX_ENABLED:
+        outbox_worker.start()
+
+
+@app.on_event("shutdown")
+def _parar_aquecimento_trends():
+    trends_prewarmer.stop(timeout=5)
+
+
+@app.on_event("shutdown")
+def _parar_agendador():
+    post_scheduler.stop(timeout=5)
+
+
+@app.on_event("shutdown")
+def _parar_outbox():
+    outbox_worker.stop(timeout=5)
+
+
+@app.on_event("shutdown")
+def _parar_jobs():
+    campaign_jobs.stop(timeout=5)
+
+
+@app.post("/register")
+def register(email: str, password: str, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.email == email).first()
+    if user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_password = hash_password(password)
+    new_user = User(email=email, hashed_password=hashed_password)
+    db.add(new_user)
+    db.commit()
+    return {"message": "User created"}
+
+@app.post("/token")
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.email == form_data.username).first()
+    if not user or not verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    access_token = create_access_token(data=user_claims(user))
+    return {"access_token": access_token, "token_type": "bearer"}
+
+def _salvar_campanha(db: Session, user_id: int, state: MaestroState, result: dict):
+    campaign = Campaign(
+        user_id=user_id,
+        objetivo=state.get('objetivo', ''),
+        publico_alvo=state.get('publico_alvo', ''),
+        canais=','.join(state.get('canais') or []),
+        orcamento=str(state.get('orcamento', '')),
+        resultado=json.dumps(result)
+    )
+    db.add(campaign)
+    db.commit()
+
+@contextmanager
+def _sessao_streaming():
+    """Sessão própria para código que roda depois que a rota retornou.
+
+    A sessão da dependência `get_db` pode já ter sido fechada durante o streaming.
+    """
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+def _sse(evento: dict) -> str:
+    return f"event: {evento['type']}\ndata: {json.dumps(evento, default=str)}\n\n"
+
+@app.post("/campaign/run")
+async def run_campaign(state: MaestroState, campaign_id: Optional[str] = None, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Executa a campanha; informe `campaign_id` para salvar checkpoints e, em
+    uma nova tentativa com o mesmo id, retomar do último nó concluído.
+
+    A conexão fica aberta durante toda a campanha; atrás de proxies prefira
+    `POST /campaign/jobs`."""
+    try:
+        # ainvoke: as chamadas ao LLM não bloqueiam o event loop do uvicorn
+        thread_id = f"{current_user.id}:{campaign_id}" if campaign_id else None
+        result = await arun_campaign(state, thread_id)
+        # Salva a campanha no banco de dados
+        _salvar_campanha(db, current_user.id, state, result)
+        return {"status": "success", "result": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/campaign/run/stream")
+async def run_campaign_stream(state: MaestroState, campaign_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Executa a campanha emitindo Server-Sent Events: um `node` por agente
+    concluído, `done` com o resultado final ou `error` em caso de falha."""
+    user_id = current_user.id
+    thread_id = f"{user_id}:{campaign_id}" if campaign_id else None
+
+    async def eventos():
+        try:
+            async for evento in astream_campaign(state, thread_id):
+                if evento["type"] == "done":
+                    with _sessao_streaming() as db:
+                        _salvar_campanha(db, user_id, state, evento["result"])
+                yield _sse(evento)
+        except Exception as e:
+            yield _sse({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _salvar_job(job):
+    with _sessao_streaming() as db:
+        _salvar_campanha(db, job.user_id, job.state, job.result)
+
+
+campaign_jobs.on_done = _salvar_job
+
+
+def _job_do_usuario(job_id: str, user_id):
+    job = campaign_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@app.post("/campaign/jobs", status_code=status.HTTP_202_ACCEPTED)
+def submit_campaign_job(state: MaestroState, campaign_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Enfileira a campanha e devolve o `job_id` na hora (429 com a fila cheia).
+
+    Reenviar com o mesmo `campaign_id` enquanto o job não terminou devolve o
+    mesmo job; depois de uma falha ou cancelamento, retoma do checkpoint.
+    """
+    try:
+        job = campaign_jobs.submit(dict(state), current_user.id, campaign_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/campaign/jobs/{job_id}")
+def get_campaign_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Status do job e o estado parcial montado com as saídas dos nós já concluídos."""
+    return _job_do_usuario(job_id, current_user.id).to_dict()
+
+@app.get("/campaign/jobs/{job_id}/events")
+async def stream_campaign_job(job_id: str, since: int = 0, current_user: User = Depends(get_current_user)):
+    """Server-Sent Events do job: `node` por agente concluído e, no fim, `done`,
+    `failed` ou `cancelled`. O `id:` de cada evento é o índice do próximo:
+    reconecte com `since=<último id>` para continuar sem repetir eventos."""
+    job = _job_do_usuario(job_id, current_user.id)
+
+    async def eventos():
+        indice = since
+        while True:
+            novos = await job.events_since(indice, 15.0)
+            if not novos:
+                # Job terminado e nada novo a enviar (reconexão após o fim)
+                if job.done and indice >= len(job.events):
+                    return
+                # Mantém a conexão viva através de proxies
+                yield ": keep-alive\n\n"
+                continue
+            for evento in novos:
+                indice += 1
+                yield f"id: {indice}\n" + _sse(evento)
+            if job.done and indice >= len(job.events):
+                return
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/campaign/jobs/{job_id}/cancel")
+def cancel_campaign_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Cancela o job: na fila, não chega a rodar; em execução, para após o nó atual."""
+    _job_do_usuario(job_id, current_user.id)
+    job = campaign_jobs.cancel(job_id, current_user.id)
+    return {"job_id": job.id, "status": job.status, "cancel_requested": job.cancel_requested.is_set()}
+
+# Campos do histórico; `resultado` (o estado final inteiro) só vem se pedido
+HISTORY_FIELDS = {
+    "id": Campaign.id,
+    "objetivo": Campaign.objetivo,
+    "publico_alvo": Campaign.publico_alvo,
+    "canais": Campaign.canais,
+    "orcamento": Campaign.orcamento,
+    "resultado": Campaign.resultado,
+}
+HISTORY_DEFAULT_FIELDS = ["id", "objetivo", "publico_alvo", "canais", "orcamento"]
+HISTORY_MAX_LIMIT = 500
+
+def _campos_historico(fields: Optional[str], padrao) -> list:
+    if not fields:
+        return list(padrao)
+    campos = [f.strip() for f in fields.split(",") if f.strip()]
+    invalidos = [f for f in campos if f not in HISTORY_FIELDS]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+    # O id é o cursor da paginação
+    return ["id"] + [f for f in dict.fromkeys(campos) if f != "id"]
+
+def _consulta_historico(db: Session, user_id: int, campos: list, after: Optional[int]):
+    consulta = db.query(*(HISTORY_FIELDS[c] for c in campos)).filter(Campaign.user_id == user_id)
+    if after is not None:
+        consulta = consulta.filter(Campaign.id > after)
+    return consulta.order_by(Campaign.id)
+
+def _item_historico(campos: list, linha) -> dict:
+    item = dict(zip(campos, linha))
+    if "canais" in item:
+        item["canais"] = item["canais"].split(",") if item["canais"] else []
+    return item
+
+def _linha_ndjson(campos: list, linha) -> str:
+    item = _item_historico(campos, linha)
+    if "resultado" not in item:
+        return json.dumps(item) + "\n"
+    # `resultado` já é JSON no banco: entra na linha como está, sem loads/dumps
+    resultado = item.pop("resultado") or "null"
+    return json.dumps(item)[:-1] + ', "resultado": ' + resultado + "}\n"
+
+# Rota para buscar histórico de campanhas do usuário autenticado
+@app.get("/campaign/history")
+def get_campaign_history(
+    limit: int = 50,
+    after: Optional[int] = None,
+    fields: Optional[str] = None,
+    format: str = "json",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Histórico paginado por chave: `after` é o `next_cursor` da página anterior.
+
+    `fields` escolhe as colunas (ex.: `id,objetivo,resultado`); por padrão
+    `resultado` fica de fora. `format=ndjson` exporta todo o histórico (a
+    partir de `after`) em streaming, uma campanha por linha e com todos os
+    campos por padrão, sem montar a lista em memória.
+    """
+    if format == "ndjson":
+        campos = _campos_historico(fields, HISTORY_FIELDS)
+        user_id = current_user.id
+
+        def linhas():
+            with _sessao_streaming() as sessao:
+                for linha in _consulta_historico(sessao, user_id, campos, after).yield_per(500):
+                    yield _linha_ndjson(campos, linha)
+
+        return StreamingResponse(linhas(), media_type="application/x-ndjson")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format deve ser json ou ndjson")
+
+    campos = _campos_historico(fields, HISTORY_DEFAULT_FIELDS)
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+    pagina = _consulta_historico(db, current_user.id, campos, after).limit(limit + 1).all()
+    history = [_item_historico(campos, linha) for linha in pagina[:limit]]
+    if "resultado" in campos:
+        for item in history:
+            item["resultado"] = json.loads(item["resultado"]) if item["resultado"] else None
+    next_cursor = history[-1]["id"] if len(pagina) > limit else None
+    return {"history": history, "next_cursor": next_cursor}
+
+# Última atualização dos dados do Google Trends aquecidos em segundo plano
+@app.get("/trends/prewarm/status")
+def get_trends_prewarm_status(current_user: User = Depends(get_current_user)):
+    return trends_prewarmer.status()
+
 @app.post("/webhook/mercadopago")
 async def webhook_mercadopago(request: Request, db: Session = Depends(get_db)):
     """
@@ -67,6 +335,8 @@ async def webhook_mercadopago(request: Request, db: Session = Depends(get_db)):
                     user.plano = "free"
                 user.pago = True
                 db.commit()
+                # O plano mudou: a próxima requisição relê o usuário do banco
+                user_cache.invalidate(user.email)
                 return {"status": f"Plano '{user.plano}' ativado para {payer_email}"}
             else:
                 return {"error": f"Usuário com email {payer_email} não encontrado."}
@@ -99,47 +369,3 @@ def meta_auth_callback(code: str, state: str = None, request: Request = None):
     # Persistir o token para o usuário
     save_token("meta", user_key, result.get("data"))
     return {"status": "ok", "user": user_key, "data": result.get("data")}
-
-app = FastAPI(title="MaestroIA API")
-
-graph = build_marketing_graph()
-
-@app.post("/register")
-def register(email: str, password: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = hash_password(password)
-    new_user = User(email=email, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    return {"message": "User created"}
-
-@app.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect email or password")
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
-
-from maestroia.core.database import Campaign
-
-@app.post("/campaign/run")
-async def run_campaign(state: MaestroState, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    try:
-        result = graph.invoke(state)
-        # Salva a campanha no banco de dados
-        campaign = Campaign(
-            user_id=current_user.id,
-            objetivo=state.objetivo if hasattr(state, 'objetivo') else str(getattr(state, 'objetivo', '')),
-            publico_alvo=state.publico_alvo if hasattr(state, 'publico_alvo') else str(getattr(state, 'publico_alvo', '')),
-            canais=','.join(state.canais) if hasattr(state, 'canais') and isinstance(state.canais, list) else str(getattr(state, 'canais', '')),
-            orcamento=str(state.orcamento) if hasattr(state, 'orcamento') else str(getattr(state, 'orcamento', '')),
-            resultado=json.dumps(result)
-        )
-        db.add(campaign)
-        db.commit()
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
@@ -28,6 +28,16 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEFAULT_LLM_MODEL = os.getenv("DEFAULT_LLM_MODEL", "gpt-4o-mini")
 DEFAULT_TEMPERATURE = float(os.getenv("DEFAULT_TEMPERATURE", "0.3"))
 
+# Máximo de chamadas simultâneas à OpenAI no processo (todas as campanhas somadas)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Cache de respostas (memória + SQLite), chaveado por modelo, temperatura e hash do prompt
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(BASE_DIR / "maestroia_cache.db"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+
 if not OPENAI_API_KEY:
     raise RuntimeError(
         "❌ OPENAI_API_KEY não encontrada. "
@@ -41,6 +51,25 @@ if not OPENAI_API_KEY:
 MAX_CAMPAIGNS_PER_USER = int(os.getenv("MAX_CAMPAIGNS_PER_USER", "3"))
 REQUIRE_HUMAN_APPROVAL = os.getenv("REQUIRE_HUMAN_APPROVAL", "true").lower() == "true"
 
+# =========================
+# AUTENTICAÇÃO
+# =========================
+
+JWT_SECRET_KEY_PADRAO = "your-secret-key"
+# Vazio (como no .env.example) conta como não definido
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY") or JWT_SECRET_KEY_PADRAO
+# Usuários autenticados ficam em cache (por e-mail) para não consultar `users` a cada requisição
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "1024"))
+# Token com id e plano do usuário: a requisição nem toca no banco (plano novo vale no próximo login)
+AUTH_CLAIMS_MODE = os.getenv("AUTH_CLAIMS_MODE", "false").lower() == "true"
+
+if AUTH_CLAIMS_MODE and JWT_SECRET_KEY == JWT_SECRET_KEY_PADRAO:
+    raise RuntimeError(
+        "❌ AUTH_CLAIMS_MODE confia no id e no plano assinados no token, mas JWT_SECRET_KEY não foi definida. "
+        "Defina uma chave secreta no arquivo .env."
+    )
+
 # =========================
 # LOGS
 # =========================
@@ -52,6 +81,87 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 # =========================
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small")
 DEFAULT_EMBEDDING_DIM = int(os.getenv("DEFAULT_EMBEDDING_DIM", "1536"))
+# Textos por requisição em get_embeddings (a API aceita até 2048 entradas)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+
+# =========================
+# MEMÓRIA VETORIAL
+# =========================
+# Diretório com o índice FAISS (index.faiss + index.delta) e os documentos (documents.db)
+MEMORY_INDEX_PATH = os.getenv("MEMORY_INDEX_PATH", str(BASE_DIR / "maestroia_memory"))
+# Vetores acumulados no arquivo incremental antes de regravar o index.faiss
+MEMORY_COMPACT_THRESHOLD = int(os.getenv("MEMORY_COMPACT_THRESHOLD", "50000"))
+# Workers que só consultam a memória (ex.: vários uvicorn) abrem o índice somente leitura
+MEMORY_READ_ONLY = os.getenv("MEMORY_READ_ONLY", "false").lower() == "true"
+# Acima deste número de vetores a busca usa um índice aproximado ("hnsw" ou "ivfpq")
+MEMORY_ANN_THRESHOLD = int(os.getenv("MEMORY_ANN_THRESHOLD", "100000"))
+MEMORY_ANN_INDEX = os.getenv("MEMORY_ANN_INDEX", "hnsw").lower()
+MEMORY_HNSW_M = int(os.getenv("MEMORY_HNSW_M", "32"))
+MEMORY_PQ_M = int(os.getenv("MEMORY_PQ_M", "64"))
+# Recall x velocidade: listas IVF visitadas / tamanho da fila de busca do HNSW
+MEMORY_NPROBE = int(os.getenv("MEMORY_NPROBE", "16"))
+MEMORY_EF_SEARCH = int(os.getenv("MEMORY_EF_SEARCH", "64"))
+# Códigos usados na busca: flat (float32), fp16, int8 (quantização escalar) ou pq
+MEMORY_STORAGE = os.getenv("MEMORY_STORAGE", "flat").lower()
+# Candidatos por resultado reordenados com os vetores exatos do disco (0/1 desliga)
+MEMORY_RERANK_FACTOR = int(os.getenv("MEMORY_RERANK_FACTOR", "4"))
+# Textos longos gravados comprimidos (zlib) no documents.db
+MEMORY_COMPRESS_DOCUMENTS = os.getenv("MEMORY_COMPRESS_DOCUMENTS", "true").lower() == "true"
+# Buscas filtradas (usuário/campanha) com até este número de documentos varrem a base exata
+MEMORY_FILTER_EXACT_LIMIT = int(os.getenv("MEMORY_FILTER_EXACT_LIMIT", "20000"))
+# Busca padrão de retrieve_memory: vector, lexical (FTS5/BM25) ou hybrid (fusão RRF)
+MEMORY_SEARCH_MODE = os.getenv("MEMORY_SEARCH_MODE", "hybrid")
+MEMORY_RRF_K = int(os.getenv("MEMORY_RRF_K", "60"))
+# Writer em segundo plano (store_memory): grava lotes de até N textos ou a cada X segundos
+MEMORY_WRITE_BATCH = int(os.getenv("MEMORY_WRITE_BATCH", "256"))
+MEMORY_WRITE_FLUSH_SECONDS = float(os.getenv("MEMORY_WRITE_FLUSH_SECONDS", "0.5"))
+
+# =========================
+# CACHE SEMÂNTICO DOS AGENTES
+# =========================
+# Opt-in: pesquisador/estrategista reaproveitam a saída de um pedido parecido já atendido
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+# Similaridade de cosseno mínima entre os pedidos (embeddings normalizados)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Janela de validade de uma saída (pesquisa de mercado envelhece)
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(3 * 24 * 3600)))
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", str(BASE_DIR / "maestroia_semantic_cache"))
+
+# =========================
+# GOOGLE TRENDS
+# =========================
+# Resultados do pytrends ficam no arquivo do LLM_CACHE_PATH (tabela trends_cache)
+TRENDS_CACHE_TTL_SECONDS = int(os.getenv("TRENDS_CACHE_TTL_SECONDS", str(6 * 3600)))
+# Por quanto tempo dados vencidos ainda servem quando o Google falha ou limita (429)
+TRENDS_STALE_SECONDS = int(os.getenv("TRENDS_STALE_SECONDS", str(14 * 24 * 3600)))
+TRENDS_RATE_PER_MINUTE = float(os.getenv("TRENDS_RATE_PER_MINUTE", "5"))
+TRENDS_BURST = int(os.getenv("TRENDS_BURST", "2"))
+TRENDS_COOLDOWN_SECONDS = int(os.getenv("TRENDS_COOLDOWN_SECONDS", "120"))
+TRENDS_TIMEOUT_SECONDS = float(os.getenv("TRENDS_TIMEOUT_SECONDS", "10"))
+# Grupos de 5 termos buscados em paralelo (cada thread com sua sessão, todas no mesmo limite)
+TRENDS_MAX_WORKERS = int(os.getenv("TRENDS_MAX_WORKERS", "2"))
+# Aquecimento em segundo plano dos nichos mais comuns (scripts/prewarm_trends.py ou thread na API)
+TRENDS_PREWARM_ENABLED = os.getenv("TRENDS_PREWARM_ENABLED", "false").lower() == "true"
+TRENDS_PREWARM_INTERVAL_SECONDS = int(os.getenv("TRENDS_PREWARM_INTERVAL_SECONDS", "3600"))
+TRENDS_PREWARM_TOP = int(os.getenv("TRENDS_PREWARM_TOP", "20"))
+TRENDS_HL = os.getenv("TRENDS_HL", "pt-BR")
+TRENDS_TZ = int(os.getenv("TRENDS_TZ", "180"))
+
+# =========================
+# CHECKPOINTS DO GRAFO
+# =========================
+# Banco SQLite (irmão do maestroia.db) onde cada campanha salva o progresso por nó
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", str(BASE_DIR / "maestroia_checkpoints.db"))
+
+# =========================
+# JOBS DE CAMPANHA (API)
+# =========================
+# POST /campaign/jobs devolve um job_id na hora; as campanhas rodam neste pool
+CAMPAIGN_JOB_WORKERS = int(os.getenv("CAMPAIGN_JOB_WORKERS", "4"))
+# Jobs aguardando além disso recebem 429 (controle de admissão)
+CAMPAIGN_JOB_QUEUE_SIZE = int(os.getenv("CAMPAIGN_JOB_QUEUE_SIZE", "20"))
+# Por quanto tempo um job concluído continua consultável
+CAMPAIGN_JOB_TTL_SECONDS = float(os.getenv("CAMPAIGN_JOB_TTL_SECONDS", "3600"))
 
 # =========================
 # APIs DE REDES SOCIAIS
@@ -97,6 +207,51 @@ PINTEREST_ACCESS_TOKEN = os.getenv("PINTEREST_ACCESS_TOKEN")
 # Snapchat
 SNAPCHAT_ACCESS_TOKEN = os.getenv("SNAPCHAT_ACCESS_TOKEN")
 
+# =========================
+# PUBLICAÇÃO
+# =========================
+# Timeouts (segundos) de conexão e de leitura das APIs das redes sociais
+PUBLISH_CONNECT_TIMEOUT = float(os.getenv("PUBLISH_CONNECT_TIMEOUT", "3.05"))
+PUBLISH_READ_TIMEOUT = float(os.getenv("PUBLISH_READ_TIMEOUT", "20"))
+# Canais publicados em paralelo (e tamanho do pool de conexões HTTP)
+PUBLISH_MAX_WORKERS = int(os.getenv("PUBLISH_MAX_WORKERS", "8"))
+# Publicações por minuto em cada plataforma (token bucket); PUBLISH_RATE_<PLATAFORMA> sobrescreve
+PUBLISH_DEFAULT_RATE_PER_MINUTE = float(os.getenv("PUBLISH_DEFAULT_RATE_PER_MINUTE", "30"))
+PUBLISH_RATE_PER_MINUTE = {
+    nome: float(os.getenv(f"PUBLISH_RATE_{nome.upper()}", padrao))
+    for nome, padrao in {
+        "facebook": "60", "instagram": "25", "twitter": "10", "linkedin": "30",
+        "google_ads": "30", "tiktok": "6", "youtube": "6", "pinterest": "30", "snapchat": "30",
+    }.items()
+}
+PUBLISH_BURST = int(os.getenv("PUBLISH_BURST", "3"))
+# Quanto uma publicação espera por vaga no limite da plataforma antes de desistir
+PUBLISH_RATE_WAIT_SECONDS = float(os.getenv("PUBLISH_RATE_WAIT_SECONDS", "30"))
+# Outbox: o publicador só enfileira; workers publicam com retentativas e chave de idempotência
+PUBLISH_OUTBOX_ENABLED = os.getenv("PUBLISH_OUTBOX_ENABLED", "true").lower() == "true"
+PUBLISH_OUTBOX_PATH = os.getenv("PUBLISH_OUTBOX_PATH", str(BASE_DIR / "maestroia_outbox.db"))
+PUBLISH_OUTBOX_WORKERS = int(os.getenv("PUBLISH_OUTBOX_WORKERS", "4"))
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))
+PUBLISH_RETRY_BASE_SECONDS = float(os.getenv("PUBLISH_RETRY_BASE_SECONDS", "30"))
+# Um item em andamento há mais que isso (worker caiu) volta para a fila
+PUBLISH_LEASE_SECONDS = float(os.getenv("PUBLISH_LEASE_SECONDS", "300"))
+# Posts agendados (aba "Agendar Post"): só os que vencem na janela ficam em memória
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_DB_PATH = os.getenv("SCHEDULER_DB_PATH", str(BASE_DIR / "maestroia_scheduler.db"))
+SCHEDULER_WINDOW_SECONDS = float(os.getenv("SCHEDULER_WINDOW_SECONDS", "3600"))
+SCHEDULER_REFRESH_SECONDS = float(os.getenv("SCHEDULER_REFRESH_SECONDS", "30"))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "100"))
+
+# =========================
+# ANALYTICS DE ENGAJAMENTO
+# =========================
+# Histórico colunar (NumPy) de engajamento por post, base das melhores janelas de publicação
+ENGAGEMENT_DATA_DIR = os.getenv("ENGAGEMENT_DATA_DIR", str(BASE_DIR / "maestroia_engagement"))
+# Fuso em que as horas da semana são contadas (padrão: horário de Brasília)
+ENGAGEMENT_UTC_OFFSET_HOURS = float(os.getenv("ENGAGEMENT_UTC_OFFSET_HOURS", "-3"))
+# Posts mínimos no nicho para usar o histórico dele (senão, o da plataforma)
+ENGAGEMENT_MIN_POSTS = int(os.getenv("ENGAGEMENT_MIN_POSTS", "5"))
+
 # =========================
 # DEBUG (SÓ PARA DEV)
 # =========================
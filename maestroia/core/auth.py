@@ -1,16 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from maestroia.config import settings
 from maestroia.core.database import get_db, User, verify_password
 
-SECRET_KEY = "your-secret-key"  # Mover para .env
+SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+class CurrentUser:
+    """Dados do usuário autenticado usados pelas rotas (sem sessão do banco presa)."""
+
+    __slots__ = ("id", "email", "plano")
+
+    def __init__(self, id: int, email: str, plano: Optional[str] = None):
+        self.id = id
+        self.email = email
+        self.plano = plano or "free"
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(user.id, user.email, user.plano)
+
+class UserCache:
+    """Cache LRU com TTL dos usuários autenticados, indexado pelo `sub` (e-mail).
+
+    Mudanças no usuário (ex.: plano ativado no webhook) devem chamar
+    `invalidate`; fora isso uma entrada vale por `ttl` segundos.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sub: str) -> Optional[CurrentUser]:
+        with self._lock:
+            item = self._itens.get(sub)
+            if item is None:
+                return None
+            expira, usuario = item
+            if expira < time.monotonic():
+                del self._itens[sub]
+                return None
+            self._itens.move_to_end(sub)
+            return usuario
+
+    def put(self, sub: str, usuario: CurrentUser):
+        with self._lock:
+            self._itens[sub] = (time.monotonic() + self.ttl, usuario)
+            self._itens.move_to_end(sub)
+            while len(self._itens) > self.max_entries:
+                self._itens.popitem(last=False)
+
+    def invalidate(self, sub: Optional[str] = None):
+        """Remove um usuário do cache (ou todos, sem `sub`)."""
+        with self._lock:
+            if sub is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(sub, None)
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_TTL_SECONDS, settings.AUTH_USER_CACHE_MAX_ENTRIES)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -21,6 +82,13 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def user_claims(user: User) -> dict:
+    """Claims do token: só `sub`, ou também id e plano com AUTH_CLAIMS_MODE."""
+    claims = {"sub": user.email}
+    if settings.AUTH_CLAIMS_MODE:
+        claims.update({"uid": user.id, "plan": user.plano or "free"})
+    return claims
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,7 +102,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    # Token assinado já traz id e plano: nada de banco nem cache
+    if settings.AUTH_CLAIMS_MODE and "uid" in payload:
+        return CurrentUser(payload["uid"], email, payload.get("plan"))
+    usuario = user_cache.get(email)
+    if usuario is not None:
+        return usuario
     user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    usuario = CurrentUser.from_user(user)
+    user_cache.put(email, usuario)
+    return usuario
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, Column, Integer, String, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from passlib.context import CryptContext
@@ -17,6 +17,9 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Atualizados pelo webhook do Mercado Pago
+    plano = Column(String, default="free")
+    pago = Column(Boolean, default=False)
 
 # Novo modelo para campanhas
 class Campaign(Base):
@@ -31,6 +34,18 @@ class Campaign(Base):
 
 Base.metadata.create_all(bind=engine)
 
+
+def _adicionar_colunas():
+    """create_all não altera tabelas existentes: adiciona a `users` as colunas novas."""
+    with engine.begin() as conn:
+        existentes = {linha[1] for linha in conn.exec_driver_sql("PRAGMA table_info(users)")}
+        for nome, ddl in (("plano", "VARCHAR DEFAULT 'free'"), ("pago", "BOOLEAN DEFAULT 0")):
+            if nome not in existentes:
+                conn.exec_driver_sql(f"ALTER TABLE users ADD COLUMN {nome} {ddl}")
+
+
+_adicionar_colunas()
+
 def get_db():
     db = SessionLocal()
     try:
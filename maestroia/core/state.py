@@ -1,10 +1,22 @@
-from typing import TypedDict, Optional, List
+import operator
+from typing import Optional, List, Dict, Annotated
+from typing_extensions import TypedDict
+
+
+def merge_dict(atual: Optional[dict], novo: Optional[dict]) -> dict:
+    """Reducer que combina dicionários vindos de ramos paralelos do grafo."""
+    combinado = dict(atual or {})
+    combinado.update(novo or {})
+    return combinado
 
 
 class MaestroState(TypedDict, total=False):
     """
     Estado global compartilhado entre os agentes do MaestroIA Marketing.
     Cada chave representa uma informação produzida ou consumida por agentes.
+
+    Chaves escritas por ramos paralelos (fan-out por canal) usam reducers
+    via `Annotated` para que as saídas de cada ramo sejam combinadas.
     """
 
     # =========================
@@ -20,12 +32,19 @@ class MaestroState(TypedDict, total=False):
     # =========================
     pesquisa: str
     estrategia: str
-    conteudos: List[str]
-    publicacoes: List[str]
+    conteudos: Annotated[List[str], operator.add]
+    imagens: List[str]
+    publicacoes: Annotated[Dict[str, str], merge_dict]
     metricas: dict
 
+    # =========================
+    # RAMOS PARALELOS (fan-out por canal)
+    # =========================
+    canal: str
+    conteudo: str
+
     # =========================
     # CONTROLE E GOVERNANÇA
     # =========================
     aprovacao_humana: bool
-    erros: List[str]
+    erros: Annotated[List[str], operator.add]
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+from maestroia.config import settings
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:
+    SqliteSaver = None
+    AsyncSqliteSaver = None
+
+_lock = threading.Lock()
+_savers = {}
+
+
+def _path(path: Optional[str]) -> str:
+    return path or settings.CHECKPOINT_DB_PATH
+
+
+def get_checkpointer(path: Optional[str] = None):
+    """Checkpointer SQLite compartilhado (um por arquivo) para `invoke`/`stream`."""
+    if SqliteSaver is None:
+        raise RuntimeError("langgraph-checkpoint-sqlite não instalado")
+    path = _path(path)
+    with _lock:
+        saver = _savers.get(path)
+        if saver is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            saver = SqliteSaver(conn)
+            _savers[path] = saver
+        return saver
+
+
+@asynccontextmanager
+async def async_checkpointer(path: Optional[str] = None):
+    """Checkpointer SQLite assíncrono para `ainvoke`/`astream`.
+
+    A conexão aiosqlite fica presa ao event loop e mantém uma thread própria,
+    por isso é aberta e fechada a cada execução.
+    """
+    if AsyncSqliteSaver is None:
+        raise RuntimeError("langgraph-checkpoint-sqlite não instalado")
+    async with AsyncSqliteSaver.from_conn_string(_path(path)) as saver:
+        yield saver
+
+
+def thread_config(campaign_id: str) -> dict:
+    """Config do LangGraph que identifica a campanha (thread) no checkpointer."""
+    return {"configurable": {"thread_id": str(campaign_id)}}
@@ -1,28 +1,94 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from maestroia.core.state import MaestroState
-from maestroia.agents.pesquisador import agente_pesquisador
-from maestroia.agents.estrategista import agente_estrategista
-from maestroia.agents.criador_conteudo import agente_criador_conteudo
-from maestroia.agents.publicador import agente_publicador
-from maestroia.agents.otimizador import agente_otimizador
+from maestroia.agents.pesquisador import agente_pesquisador, agente_pesquisador_async
+from maestroia.agents.estrategista import agente_estrategista, agente_estrategista_async
+from maestroia.agents.criador_conteudo import (
+    agente_criador_conteudo,
+    agente_criador_conteudo_async,
+    agente_gerador_imagem,
+    agente_gerador_imagem_async,
+)
+from maestroia.agents.publicador import agente_publicador, conteudo_do_canal
+from maestroia.agents.otimizador import agente_otimizador, agente_otimizador_async
 from maestroia.agents.maestro import agente_maestro
 
-def build_marketing_graph():
+
+def _agente(func, afunc):
+    """Nó com variante síncrona (`invoke`/`stream`) e assíncrona (`ainvoke`/`astream`)."""
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+
+def distribuir_conteudos(state: MaestroState):
+    """Fan-out: um ramo `criador_conteudo` por canal, mais a geração de imagem.
+
+    Sem estratégia, envia o estado completo para um único ramo, que registra o erro.
+    """
+    estrategia = state.get("estrategia")
+    if not estrategia:
+        return [Send("criador_conteudo", dict(state))]
+
+    canais = state.get("canais", ["Instagram"])
+    envios = [
+        Send("criador_conteudo", {
+            "estrategia": estrategia,
+            "canal": canal,
+            "publico_alvo": state.get("publico_alvo"),
+        })
+        for canal in canais
+    ]
+    envios.append(Send("gerador_imagem", {}))
+    return envios
+
+
+def consolidar_conteudos(state: MaestroState) -> MaestroState:
+    """Ponto de junção: aguarda todos os ramos de criação antes de publicar."""
+    return {}
+
+
+def distribuir_publicacoes(state: MaestroState):
+    """Fan-out: um ramo `publicador` por canal, com o conteúdo gerado para ele."""
+    conteudos = state.get("conteudos", [])
+    canais = state.get("canais", [])
+    if not conteudos or not canais:
+        return [Send("publicador", dict(state))]
+
+    return [
+        Send("publicador", {"canal": canal, "conteudo": conteudo_do_canal(conteudos, i)})
+        for i, canal in enumerate(canais)
+    ]
+
+
+def build_marketing_graph(checkpointer=None):
+    """Compila o grafo de marketing.
+
+    Com `checkpointer` (ver `maestroia.graphs.checkpoint`), cada nó concluído é
+    salvo por `thread_id`, e uma execução interrompida pode ser retomada.
+    """
     graph = StateGraph(MaestroState)
 
-    graph.add_node("pesquisador", agente_pesquisador)
-    graph.add_node("estrategista", agente_estrategista)
-    graph.add_node("criador_conteudo", agente_criador_conteudo)
+    # Agentes que chamam o LLM têm variante assíncrona; os demais (publicador,
+    # maestro) rodam em thread quando o grafo é executado com `ainvoke`.
+    graph.add_node("pesquisador", _agente(agente_pesquisador, agente_pesquisador_async))
+    graph.add_node("estrategista", _agente(agente_estrategista, agente_estrategista_async))
+    graph.add_node("criador_conteudo", _agente(agente_criador_conteudo, agente_criador_conteudo_async))
+    graph.add_node("gerador_imagem", _agente(agente_gerador_imagem, agente_gerador_imagem_async))
+    graph.add_node("consolidador", consolidar_conteudos)
     graph.add_node("publicador", agente_publicador)
-    graph.add_node("otimizador", agente_otimizador)
+    graph.add_node("otimizador", _agente(agente_otimizador, agente_otimizador_async))
     graph.add_node("maestro", agente_maestro)
 
     graph.set_entry_point("pesquisador")
     graph.add_edge("pesquisador", "estrategista")
-    graph.add_edge("estrategista", "criador_conteudo")
-    graph.add_edge("criador_conteudo", "publicador")
+    # Criação e publicação rodam um ramo por canal em paralelo; o tempo total
+    # passa a depender do canal mais lento e não da soma de todos.
+    graph.add_conditional_edges("estrategista", distribuir_conteudos, ["criador_conteudo", "gerador_imagem"])
+    graph.add_edge("criador_conteudo", "consolidador")
+    graph.add_edge("gerador_imagem", "consolidador")
+    graph.add_conditional_edges("consolidador", distribuir_publicacoes, ["publicador"])
     graph.add_edge("publicador", "otimizador")
     graph.add_edge("otimizador", "maestro")
     graph.add_edge("maestro", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from maestroia.config import settings
+from maestroia.memory.vector import VectorStore
+from maestroia.services.llm_cache import ResponseCache, cache_key
+from maestroia.services.openai_service import is_fallback
+
+
+class SemanticCache:
+    """Cache de saídas de agentes por similaridade do pedido, sobre um `VectorStore`.
+
+    Cada agente descreve o pedido em um texto curto (ex.: objetivo + público);
+    antes de chamar o LLM, procura no `VectorStore` (kind = nome do agente,
+    criado dentro de `ttl`) o pedido mais parecido e, se a similaridade de
+    cosseno passar de `threshold`, devolve a saída guardada para ele. As saídas
+    ficam em um `ResponseCache` chaveado pelo id e pelo texto do pedido.
+
+    `stats()` mostra, por agente, acertos, erros e o tempo de geração poupado
+    (média das gerações reais x acertos, menos o custo das consultas).
+    """
+
+    def __init__(self, store: VectorStore, outputs: ResponseCache,
+                 threshold: float = 0.92, ttl: float = 3 * 24 * 3600):
+        self.store = store
+        self.outputs = outputs
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _contador(self, agente: str) -> Dict[str, float]:
+        return self._stats.setdefault(agente, {"hits": 0, "misses": 0, "generation_s": 0.0, "lookup_s": 0.0})
+
+    def lookup(self, agente: str, texto: str) -> Optional[str]:
+        """Saída de um pedido parecido com `texto` já atendido por `agente`, ou None."""
+        documentos = self.store.search_documents(texto, k=1, kind=agente, since=time.time() - self.ttl)
+        if not documentos:
+            return None
+        # Embeddings normalizados: distância L2² = 2 - 2·cos
+        similaridade = 1.0 - documentos[0]["distance"] / 2.0
+        if similaridade < self.threshold:
+            return None
+        return self.outputs.get(cache_key(agente, documentos[0]["id"], documentos[0]["text"]))
+
+    def save(self, agente: str, texto: str, saida: Optional[str]):
+        if is_fallback(saida):
+            return
+        doc_id = self.store.add_document(texto, kind=agente)
+        self.outputs.set(cache_key(agente, doc_id, texto), saida)
+
+    def _consultar(self, agente: str, texto: str) -> Optional[str]:
+        inicio = time.perf_counter()
+        saida = self.lookup(agente, texto)
+        with self._lock:
+            contador = self._contador(agente)
+            contador["lookup_s"] += time.perf_counter() - inicio
+            if saida is not None:
+                contador["hits"] += 1
+        return saida
+
+    def _registrar_geracao(self, agente: str, inicio: float):
+        with self._lock:
+            contador = self._contador(agente)
+            contador["misses"] += 1
+            contador["generation_s"] += time.perf_counter() - inicio
+
+    def get_or_generate(self, agente: str, texto: str, gerar: Callable[[], str]) -> str:
+        """Reaproveita a saída de um pedido parecido ou chama `gerar()` e guarda o resultado.
+
+        Com `SEMANTIC_CACHE_ENABLED` desligado apenas chama `gerar()`.
+        """
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return gerar()
+        saida = self._consultar(agente, texto)
+        if saida is not None:
+            return saida
+        inicio = time.perf_counter()
+        saida = gerar()
+        self._registrar_geracao(agente, inicio)
+        self.save(agente, texto, saida)
+        return saida
+
+    async def aget_or_generate(self, agente: str, texto: str, agerar: Callable[[], Awaitable[str]]) -> str:
+        """Versão assíncrona de `get_or_generate` (consulta e gravação rodam em thread)."""
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return await agerar()
+        saida = await asyncio.to_thread(self._consultar, agente, texto)
+        if saida is not None:
+            return saida
+        inicio = time.perf_counter()
+        saida = await agerar()
+        self._registrar_geracao(agente, inicio)
+        await asyncio.to_thread(self.save, agente, texto, saida)
+        return saida
+
+    def stats(self) -> Dict[str, dict]:
+        resultado = {}
+        for agente, c in self._stats.items():
+            consultas = c["hits"] + c["misses"]
+            media_geracao = c["generation_s"] / c["misses"] if c["misses"] else 0.0
+            resultado[agente] = {
+                "hits": int(c["hits"]),
+                "misses": int(c["misses"]),
+                "hit_rate": c["hits"] / consultas if consultas else 0.0,
+                "avg_generation_s": media_geracao,
+                "latency_saved_s": max(0.0, media_geracao * c["hits"] - c["lookup_s"]),
+            }
+        return resultado
+
+
+semantic_cache = SemanticCache(
+    VectorStore(settings.SEMANTIC_CACHE_PATH),
+    ResponseCache(settings.LLM_CACHE_PATH, table="semantic_cache", ttl=settings.SEMANTIC_CACHE_TTL_SECONDS),
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl=settings.SEMANTIC_CACHE_TTL_SECONDS,
+)
@@ -1,9 +1,34 @@
+from concurrent.futures import Future
+from typing import List, Optional
+from maestroia.config import settings
 from maestroia.memory.vector import VectorStore
 
-store = VectorStore()
+# Persistido em MEMORY_INDEX_PATH: reinícios não perdem (nem re-embedam) a memória.
+# Um único índice serve todos os usuários; user_id/campaign_id isolam as buscas.
+# Compartilhado pelas threads do FastAPI: as gravações passam pela fila do writer.
+store = VectorStore(settings.MEMORY_INDEX_PATH, read_only=settings.MEMORY_READ_ONLY)
 
-def store_memory(text: str):
-    store.add_document(text)
+def store_memory(text: str, user_id: Optional[str] = None, campaign_id: Optional[str] = None,
+                 kind: Optional[str] = None) -> Future:
+    """Enfileira um texto para indexação. O Future resolve para a lista com o id gravado."""
+    return store.enqueue([text], user_id=user_id, campaign_id=campaign_id, kind=kind)
 
-def retrieve_memory(query: str):
-    return store.search(query)
+def store_memories(texts: List[str], user_id: Optional[str] = None, campaign_id: Optional[str] = None,
+                   kind: Optional[str] = None) -> Future:
+    """Enfileira vários textos; o Future resolve para os ids."""
+    return store.enqueue(texts, user_id=user_id, campaign_id=campaign_id, kind=kind)
+
+def retrieve_memory(query: str, user_id: Optional[str] = None, campaign_id: Optional[str] = None,
+                    kind: Optional[str] = None, k: int = 5, mode: Optional[str] = None):
+    """Memórias mais relevantes; `mode` = vector, lexical ou hybrid (padrão: MEMORY_SEARCH_MODE)."""
+    return store.search(query, k=k, mode=mode, user_id=user_id, campaign_id=campaign_id, kind=kind)
+
+def forget_memories(user_id: Optional[str] = None, campaign_id: Optional[str] = None,
+                    kind: Optional[str] = None) -> int:
+    """Remove as memórias de um usuário/campanha; o espaço é liberado no próximo `save_memory`."""
+    return store.delete_where(user_id=user_id, campaign_id=campaign_id, kind=kind)
+
+def save_memory():
+    """Compacta o índice em disco (ex.: ao desligar o servidor ou em um job periódico)."""
+    store.flush()
+    store.save()
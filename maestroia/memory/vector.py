@@ -1,21 +1,792 @@
+import atexit
+import glob
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager
 import faiss
 import numpy as np
-from maestroia.services.openai_service import get_embedding
+from typing import Dict, List, Optional
+from maestroia.services.openai_service import get_embeddings
 from maestroia.config import settings
 
+# Mapeia os vetores do index.faiss direto do arquivo (abertura instantânea, páginas
+# compartilhadas entre processos); versões antigas do faiss só conhecem IO_FLAG_MMAP
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+INDEX_FILE = "index.faiss"
+DELTA_FILE = "index.delta"
+DOCUMENTS_FILE = "documents.db"
+# Índice de busca sobre os vetores do index.faiss (aproximado e/ou comprimido), um
+# arquivo por configuração: search.<spec>.faiss (ex.: search.hnsw-int8.faiss)
+SEARCH_FILE = "search.{}.faiss"
+STORAGES = ("flat", "fp16", "int8", "pq")
+
+# Metadados aceitos como filtro de busca/remoção (colunas da tabela documents)
+METADATA_FIELDS = ("user_id", "campaign_id", "kind")
+
+# Índice invertido (SQLite FTS5, BM25) ao lado do FAISS, no mesmo documents.db.
+# Sem conteúdo próprio (content=''): guarda só os postings, o texto fica em documents.
+# '#', '@' e '_' fazem parte dos termos, então hashtags e menções casam inteiras.
+LEXICAL_TABLE = "documents_fts"
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+_TERMO = re.compile(r"[#@]?\w+(?:[-./]\w+)*")
+
+
+def _nlist(n: int) -> int:
+    # ~4·√n listas, com pelo menos 39 pontos de treino por centróide
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+
+def _flat_com_ids(dim: int):
+    return faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+
+
+def _vetores_e_ids(index):
+    """(vetores, ids) guardados em um IndexIDMap sobre IndexFlat."""
+    if index is None or not index.ntotal:
+        return None, None
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    return faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal), ids
+
+
+def _ann_spec(kind: Optional[str] = None, storage: Optional[str] = None) -> str:
+    kind = kind or settings.MEMORY_ANN_INDEX
+    storage = storage or settings.MEMORY_STORAGE
+    if storage not in STORAGES:
+        raise ValueError(f"MEMORY_STORAGE inválido: {storage} (use {', '.join(STORAGES)})")
+    if kind == "hnsw":
+        return f"hnsw-{storage}"
+    if kind == "ivfpq":
+        # Lista invertida com códigos PQ, a não ser que um quantizador escalar seja pedido
+        return f"ivf-{storage if storage in ('fp16', 'int8') else 'pq'}"
+    raise ValueError(f"MEMORY_ANN_INDEX inválido: {kind} (use 'hnsw' ou 'ivfpq')")
+
+
+def search_spec(n: int) -> Optional[str]:
+    """Configuração do índice de busca da base com `n` vetores (None = varrer a base exata).
+
+    Acima de MEMORY_ANN_THRESHOLD: índice aproximado (`hnsw-<storage>` ou
+    `ivf-<codec>`); abaixo, varredura exaustiva dos códigos comprimidos
+    (`fp16`, `int8`, `pq`) ou da própria base quando MEMORY_STORAGE=flat.
+    """
+    if n >= settings.MEMORY_ANN_THRESHOLD:
+        return _ann_spec()
+    return None if settings.MEMORY_STORAGE == "flat" else settings.MEMORY_STORAGE
+
+
+def _lossy(spec: Optional[str]) -> bool:
+    # Códigos comprimidos: as distâncias são aproximadas e valem um rerank exato
+    return spec is not None and not spec.endswith("flat")
+
+
+def build_search_index(vetores: np.ndarray, spec: str, ids: Optional[np.ndarray] = None):
+    """Constrói (e treina, se preciso) o índice de busca `spec` para `vetores`.
+
+    O índice devolvido é um IndexIDMap: a busca retorna `ids` (padrão: posições).
+    """
+    n, dim = vetores.shape
+    familia, _, codec = spec.rpartition("-")
+    m = min(settings.MEMORY_PQ_M, dim)
+    while dim % m:
+        m -= 1
+    # "np": sem o treino polissêmico do PQ, que custa minutos e não é usado na busca
+    codigos = {"flat": "Flat", "fp16": "SQfp16", "int8": "SQ8", "pq": f"PQ{m}" if familia == "hnsw" else f"PQ{m}np"}
+    if familia == "hnsw":
+        descricao = f"HNSW{settings.MEMORY_HNSW_M}" + ("" if codec == "flat" else f",{codigos[codec]}")
+    elif familia == "ivf":
+        descricao = f"IVF{_nlist(n)},{codigos[codec]}"
+    else:
+        descricao = codigos[codec]
+    index = faiss.index_factory(dim, f"IDMap,{descricao}")
+    if not index.is_trained:
+        ivf = faiss.try_extract_index_ivf(index)
+        rng = np.random.default_rng(0)
+        # Amostra mínima recomendada pelo faiss (39 por centróide do IVF e dos 256 do PQ)
+        minimo = max(39 * (ivf.nlist if ivf is not None else 1), 39 * 256)
+        amostra = vetores[np.sort(rng.choice(n, min(n, minimo), replace=False))]
+        index.train(np.ascontiguousarray(amostra))
+    index.add_with_ids(vetores, ids if ids is not None else np.arange(n, dtype=np.int64))
+    return index
+
+
+def build_ann_index(vetores: np.ndarray, kind: Optional[str] = None, ids: Optional[np.ndarray] = None,
+                    storage: Optional[str] = None):
+    """Índice aproximado (`kind`: hnsw/ivfpq) com os códigos de `storage`."""
+    return build_search_index(vetores, _ann_spec(kind, storage), ids)
+
+
+def rerank_exact(base, base_ids: np.ndarray, vector: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Distâncias L2² exatas entre `vector` e os vetores `ids` da base (IDMap sobre IndexFlat).
+
+    Os ids da base são crescentes, então a posição sai de uma busca binária e só
+    as linhas necessárias do index.faiss mapeado são lidas do disco.
+    """
+    posicoes = np.searchsorted(base_ids, ids)
+    exatos = faiss.downcast_index(base.index).reconstruct_batch(posicoes)
+    return ((exatos - vector.reshape(1, -1)) ** 2).sum(axis=1)
+
+
+def _comprimir(texto: str):
+    if settings.MEMORY_COMPRESS_DOCUMENTS and len(texto) >= 256:
+        return zlib.compress(texto.encode("utf-8"))
+    return texto
+
+
+def _descomprimir(valor) -> str:
+    return zlib.decompress(valor).decode("utf-8") if isinstance(valor, bytes) else valor
+
+
+def _termos(query: str) -> List[str]:
+    return _TERMO.findall(query.lower())
+
+
+def _consulta_fts(termos: List[str]) -> str:
+    # Cada termo entre aspas (SKUs como "ab-123" viram frase); basta um casar
+    return " OR ".join('"{}"'.format(t.replace('"', '""')) for t in termos)
+
+
+def _parece_palavra_chave(termos: List[str]) -> bool:
+    """Consulta só de hashtags, menções ou códigos (SKU): o lado vetorial pouco acrescenta."""
+    return bool(termos) and all(t[0] in "#@" or any(c.isdigit() for c in t) for t in termos)
+
+
+def rrf(listas: List[List[int]], k: int = 60) -> List[tuple]:
+    """Reciprocal rank fusion: [(score, id)] somando 1/(k + posição) em cada lista."""
+    scores: Dict[int, float] = {}
+    for lista in listas:
+        for posicao, i in enumerate(lista, 1):
+            scores[i] = scores.get(i, 0.0) + 1.0 / (k + posicao)
+    return sorted(((score, i) for i, score in scores.items()), key=lambda par: (-par[0], par[1]))
+
+
+def ann_search_params(ann, k: int, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                      sel=None):
+    """Parâmetros de busca por chamada (não alteram o índice, seguros entre threads).
+
+    `sel` (um faiss.IDSelector) restringe a busca a um subconjunto de ids.
+    """
+    interno = faiss.downcast_index(ann.index) if isinstance(ann, faiss.IndexIDMap) else ann
+    if isinstance(interno, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=min(interno.nlist, nprobe or settings.MEMORY_NPROBE), sel=sel)
+    if isinstance(interno, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=max(k, ef_search or settings.MEMORY_EF_SEARCH), sel=sel)
+    return faiss.SearchParameters(sel=sel) if sel is not None else None
+
+
+class _RWLock:
+    """Vários leitores ou um escritor; escritores esperando bloqueiam novos leitores."""
 
-class VectorStore:
     def __init__(self):
-        dim = getattr(settings, 'DEFAULT_EMBEDDING_DIM', 1536)
-        self.index = faiss.IndexFlatL2(dim)  # Dimensão do embedding
-        self.documents = []
-
-    def add_document(self, text: str):
-        vector = np.array(get_embedding(text), dtype=np.float32)
-        self.index.add(np.array([vector]))
-        self.documents.append(text)
-
-    def search(self, query: str, k=5):
-        vector = np.array(get_embedding(query), dtype=np.float32)
-        distances, indices = self.index.search(np.array([vector]), k)
-        return [self.documents[i] for i in indices[0] if i < len(self.documents)]
+        self._cond = threading.Condition()
+        self._leitores = 0
+        self._escrevendo = False
+        self._escritores_esperando = 0
+
+    @contextmanager
+    def leitura(self):
+        with self._cond:
+            while self._escrevendo or self._escritores_esperando:
+                self._cond.wait()
+            self._leitores += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._leitores -= 1
+                if not self._leitores:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def escrita(self):
+        with self._cond:
+            self._escritores_esperando += 1
+            while self._escrevendo or self._leitores:
+                self._cond.wait()
+            self._escritores_esperando -= 1
+            self._escrevendo = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._escrevendo = False
+                self._cond.notify_all()
+
+
+class VectorStore:
+    """Índice FAISS de memórias, opcionalmente persistido em `path` (um diretório).
+
+    Cada vetor tem um id estável e metadados (`user_id`, `campaign_id`, `kind`,
+    `created_at`) numa tabela SQLite `documents` (em memória quando não há
+    `path`). Com `path`:
+      - index.faiss: vetores compactados (IndexIDMap), aberto com mmap somente leitura;
+      - index.delta: registros (id int64 + vetor float32) adicionados depois da
+        última compactação, só com append;
+      - documents.db: textos e metadados chaveados pelo id do vetor.
+
+    `save()` compacta o delta no index.faiss e descarta os vetores removidos
+    por `delete`. Com `read_only=True` o índice só é consultado, então vários
+    workers podem compartilhar o mesmo mmap; chame `load()` para enxergar o
+    que outro processo gravou.
+
+    Quando a base compactada passa de `MEMORY_ANN_THRESHOLD` vetores, `save()`
+    também mantém um índice aproximado (`MEMORY_ANN_INDEX`: HNSW ou IVF-PQ) e a
+    busca na base passa a usá-lo; `nprobe`/`ef_search` ajustam recall x
+    velocidade. O delta continua sendo varrido de forma exata.
+
+    Seguro entre threads: buscas rodam em paralelo (lock de leitura; o faiss
+    libera o GIL) e escritas são exclusivas, mas os embeddings são calculados
+    fora do lock. `enqueue()` manda textos para um writer em segundo plano que
+    junta os pedidos em lotes (até `MEMORY_WRITE_BATCH` textos ou
+    `MEMORY_WRITE_FLUSH_SECONDS`), então ingestão pesada não trava as buscas.
+
+    Com `MEMORY_STORAGE` = fp16/int8/pq a busca roda sobre códigos comprimidos
+    (2x/4x/até 96x menores que float32) e os `k * MEMORY_RERANK_FACTOR`
+    melhores candidatos são reordenados com os vetores exatos lidos do
+    index.faiss em disco. Textos longos ficam comprimidos (zlib) no SQLite.
+    """
+
+    def __init__(self, path: Optional[str] = None, read_only: bool = False,
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        self.dim = getattr(settings, 'DEFAULT_EMBEDDING_DIM', 1536)
+        self.path = path
+        self.read_only = read_only
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._base = None  # vetores compactados: index.faiss mapeado em memória (nunca recebe add)
+        self._ann = None  # índice de busca (aproximado e/ou comprimido) sobre os vetores da base
+        self._ann_spec = None
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self.index = _flat_com_ids(self.dim)  # vetores ainda não compactados
+        self._conn = None
+        self._proximo_id = 0
+        self._vivos = 0  # documentos não removidos (o resto dos vetores são lápides)
+        self._rw = _RWLock()
+        self._db_lock = threading.Lock()  # leitores compartilham a conexão SQLite
+        self._fila = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        if path:
+            self.load()
+
+    @property
+    def ntotal(self) -> int:
+        return (self._base.ntotal if self._base is not None else 0) + self.index.ntotal
+
+    def _arquivo(self, nome: str) -> str:
+        return os.path.join(self.path, nome)
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            if self.path and self.read_only:
+                caminho = self._arquivo(DOCUMENTS_FILE)
+                if not os.path.exists(caminho):
+                    return None
+                self._conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+                return self._conn
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                conn = sqlite3.connect(self._arquivo(DOCUMENTS_FILE), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+            else:
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, text TEXT NOT NULL, "
+                "user_id TEXT, campaign_id TEXT, kind TEXT, created_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_tenant ON documents(user_id, campaign_id)")
+            # Maior id já emitido: ids removidos na compactação nunca são reaproveitados
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            existia = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (LEXICAL_TABLE,)).fetchone()
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {LEXICAL_TABLE} USING fts5(text, content='', "
+                "tokenize=\"unicode61 remove_diacritics 2 tokenchars '#@_'\")"
+            )
+            if not existia:
+                # Memória criada antes da busca lexical: indexa os textos que já existem
+                linhas = conn.execute("SELECT id, text FROM documents").fetchall()
+                conn.executemany(
+                    f"INSERT INTO {LEXICAL_TABLE} (rowid, text) VALUES (?, ?)",
+                    [(i, _descomprimir(t)) for i, t in linhas],
+                )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self):
+        """(Re)abre o índice salvo em `path`: mmap do index.faiss + vetores do delta."""
+        with self._rw.escrita():
+            self._load()
+
+    def _load(self):
+        base_path = self._arquivo(INDEX_FILE)
+        self._base = faiss.read_index(base_path, _MMAP_FLAGS) if os.path.exists(base_path) else None
+        self.index = _flat_com_ids(self.dim)
+        base_total = self._base.ntotal if self._base is not None else 0
+        self._base_ids = faiss.vector_to_array(self._base.id_map) if base_total else np.empty(0, dtype=np.int64)
+        self._ler_ann()
+        maior_id = int(self._base_ids.max()) if base_total else -1
+
+        db = self._db() if (os.path.isdir(self.path) or self.read_only) else None
+        delta_path = self._arquivo(DELTA_FILE)
+        if os.path.exists(delta_path):
+            ids, vetores = self._ler_delta(delta_path)
+            # Compactação interrompida depois de regravar o index.faiss: esses já estão na base
+            novos = ids > maior_id
+            if db is not None:
+                vivos = [r[0] for r in db.execute("SELECT id FROM documents WHERE id > ?", (maior_id,))]
+                novos &= np.isin(ids, np.asarray(vivos, dtype=np.int64))
+            if novos.any():
+                self.index.add_with_ids(np.ascontiguousarray(vetores[novos]), ids[novos])
+            if len(ids):
+                maior_id = max(maior_id, int(ids.max()))
+
+        self._proximo_id = maior_id + 1
+        if db is not None:
+            linha = db.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+            self._proximo_id = max(self._proximo_id, linha[0] if linha else 0)
+        if db is not None and not self.read_only:
+            # Textos gravados sem o vetor correspondente (escrita interrompida)
+            self._apagar(db, "id > ?", [maior_id])
+            db.commit()
+            if os.path.exists(delta_path):
+                self._reescrever_delta()
+        self._vivos = db.execute("SELECT COUNT(*) FROM documents").fetchone()[0] if db is not None else 0
+
+    def _ler_delta(self, delta_path: str):
+        dados = np.fromfile(delta_path, dtype=np.float32)
+        largura = self.dim + 2  # id int64 ocupa duas posições float32
+        registros = dados[:(dados.size // largura) * largura].reshape(-1, largura)
+        ids = np.ascontiguousarray(registros[:, :2]).view(np.int64).ravel()
+        return ids, registros[:, 2:]
+
+    def _registros(self, ids: np.ndarray, vetores: np.ndarray) -> bytes:
+        registros = np.empty((len(ids), self.dim + 2), dtype=np.float32)
+        registros[:, :2] = np.ascontiguousarray(ids, dtype=np.int64).view(np.float32).reshape(-1, 2)
+        registros[:, 2:] = vetores
+        return registros.tobytes()
+
+    def _ler_ann(self):
+        base_total = self._base.ntotal if self._base is not None else 0
+        spec = search_spec(base_total) if base_total else None
+        self._ann, self._ann_spec = None, None
+        caminho = self._arquivo(SEARCH_FILE.format(spec)) if spec else None
+        if caminho is None or not os.path.exists(caminho):
+            return
+        flags = (faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY) if spec.startswith("ivf") else _MMAP_FLAGS
+        ann = faiss.read_index(caminho, flags)
+        # Compactação interrompida antes de atualizar o índice de busca: usa a base exata
+        if ann.ntotal == base_total:
+            self._ann, self._ann_spec = ann, spec
+
+    def _reescrever_delta(self):
+        vetores, ids = _vetores_e_ids(self.index)
+        tmp = self._arquivo(DELTA_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            if ids is not None:
+                f.write(self._registros(ids, vetores))
+        os.replace(tmp, self._arquivo(DELTA_FILE))
+
+    def add_document(self, text: str, **metadata) -> int:
+        return self.add_documents([text], **metadata)[0]
+
+    def add_documents(self, texts: List[str], user_id: Optional[str] = None,
+                      campaign_id: Optional[str] = None, kind: Optional[str] = None) -> List[int]:
+        """Indexa vários textos de uma vez: os embeddings saem em poucas requisições em lote.
+
+        Os metadados valem para todo o lote. Retorna os ids dos vetores. Com
+        `path`, os textos e vetores novos são acrescentados ao disco sem
+        regravar o índice inteiro.
+        """
+        if not texts:
+            return []
+        if self.read_only:
+            raise RuntimeError("VectorStore aberto somente leitura")
+        vectors = get_embeddings(texts)
+        with self._rw.escrita():
+            return self._inserir(texts, vectors, user_id, campaign_id, kind)
+
+    def _inserir(self, texts: List[str], vectors: np.ndarray, user_id: Optional[str],
+                 campaign_id: Optional[str], kind: Optional[str]) -> List[int]:
+        ids = np.arange(self._proximo_id, self._proximo_id + len(texts), dtype=np.int64)
+        agora = time.time()
+        db = self._db()
+        db.executemany(
+            "INSERT OR REPLACE INTO documents (id, text, user_id, campaign_id, kind, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(int(i), _comprimir(t), user_id, campaign_id, kind, agora) for i, t in zip(ids, texts)],
+        )
+        db.executemany(
+            f"INSERT INTO {LEXICAL_TABLE} (rowid, text) VALUES (?, ?)",
+            [(int(i), t) for i, t in zip(ids, texts)],
+        )
+        db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (int(ids[-1]) + 1,))
+        db.commit()
+        if self.path:
+            with open(self._arquivo(DELTA_FILE), "ab") as f:
+                f.write(self._registros(ids, vectors))
+        self.index.add_with_ids(vectors, ids)
+        self._proximo_id += len(texts)
+        self._vivos += len(texts)
+        if self.index.ntotal >= settings.MEMORY_COMPACT_THRESHOLD:
+            self._save()
+        return ids.tolist()
+
+    def enqueue(self, texts: List[str], user_id: Optional[str] = None,
+                campaign_id: Optional[str] = None, kind: Optional[str] = None) -> Future:
+        """Agenda a indexação no writer em segundo plano. O Future resolve para os ids.
+
+        Os textos ficam visíveis nas buscas depois do próximo lote; `flush()`
+        espera a fila esvaziar.
+        """
+        if self.read_only:
+            raise RuntimeError("VectorStore aberto somente leitura")
+        futuro = Future()
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="vectorstore-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+        self._fila.put((list(texts), (user_id, campaign_id, kind), futuro))
+        return futuro
+
+    def _writer_loop(self):
+        parar = False
+        while not parar:
+            item = self._fila.get()
+            if item is None:
+                self._fila.task_done()
+                break
+            lote, total = [item], len(item[0])
+            prazo = time.monotonic() + settings.MEMORY_WRITE_FLUSH_SECONDS
+            while total < settings.MEMORY_WRITE_BATCH:
+                try:
+                    proximo = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    self._fila.task_done()
+                    parar = True
+                    break
+                lote.append(proximo)
+                total += len(proximo[0])
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote: list):
+        try:
+            # Uma única rodada de embeddings para todos os pedidos do lote, fora do lock
+            textos = [t for texts, _, _ in lote for t in texts]
+            vetores = get_embeddings(textos) if textos else None
+            inicio = 0
+            with self._rw.escrita():
+                for texts, metadados, futuro in lote:
+                    ids = self._inserir(texts, vetores[inicio:inicio + len(texts)], *metadados) if texts else []
+                    inicio += len(texts)
+                    futuro.set_result(ids)
+        except Exception as e:
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+        finally:
+            for _ in lote:
+                self._fila.task_done()
+
+    def flush(self):
+        """Espera o writer gravar tudo o que foi enfileirado até agora."""
+        if self._writer is not None:
+            self._fila.join()
+
+    def close(self):
+        """Grava o que está na fila e encerra o writer."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None and writer.is_alive():
+            self._fila.put(None)
+            writer.join()
+
+    def _where(self, filtros: Dict) -> tuple:
+        condicoes, valores = [], []
+        for campo in METADATA_FIELDS:
+            if filtros.get(campo) is not None:
+                condicoes.append(f"{campo} = ?")
+                valores.append(filtros[campo])
+        if filtros.get("since") is not None:
+            condicoes.append("created_at >= ?")
+            valores.append(filtros["since"])
+        return " AND ".join(condicoes), valores
+
+    def _ids_filtrados(self, filtros: Dict) -> np.ndarray:
+        where, valores = self._where(filtros)
+        with self._db_lock:
+            db = self._db()
+            if db is None:
+                return np.empty(0, dtype=np.int64)
+            linhas = db.execute(f"SELECT id FROM documents WHERE {where}", valores).fetchall()
+        return np.fromiter((r[0] for r in linhas), dtype=np.int64, count=len(linhas))
+
+    def delete(self, ids: List[int]) -> int:
+        """Remove documentos pelo id. Os vetores da base viram lápides até o próximo `save()`."""
+        if self.read_only:
+            raise RuntimeError("VectorStore aberto somente leitura")
+        with self._rw.escrita():
+            return self._delete(ids)
+
+    def _apagar(self, db: sqlite3.Connection, where: str, valores: list) -> int:
+        # Tabela FTS5 sem conteúdo: remover os termos exige o texto original
+        linhas = db.execute(f"SELECT id, text FROM documents WHERE {where}", valores).fetchall()
+        db.executemany(
+            f"INSERT INTO {LEXICAL_TABLE} ({LEXICAL_TABLE}, rowid, text) VALUES ('delete', ?, ?)",
+            [(i, _descomprimir(t)) for i, t in linhas],
+        )
+        return db.execute(f"DELETE FROM documents WHERE {where}", valores).rowcount
+
+    def _delete(self, ids: List[int]) -> int:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        db = self._db()
+        removidos = 0
+        for inicio in range(0, len(ids), 500):
+            lote = ids[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(lote))
+            removidos += self._apagar(db, f"id IN ({marcadores})", lote)
+        db.commit()
+        self.index.remove_ids(faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64)))
+        self._vivos -= removidos
+        return removidos
+
+    def delete_where(self, user_id: Optional[str] = None, campaign_id: Optional[str] = None,
+                     kind: Optional[str] = None) -> int:
+        """Remove todos os documentos com os metadados dados (ex.: memórias de um usuário)."""
+        filtros = {"user_id": user_id, "campaign_id": campaign_id, "kind": kind}
+        if not self._where(filtros)[0]:
+            raise ValueError("delete_where exige pelo menos um filtro")
+        if self.read_only:
+            raise RuntimeError("VectorStore aberto somente leitura")
+        with self._rw.escrita():
+            return self._delete(self._ids_filtrados(filtros).tolist())
+
+    def save(self):
+        """Compacta base + delta (em disco: novo index.faiss reaberto com mmap).
+
+        Vetores removidos são descartados aqui. Também cria ou estende o índice
+        aproximado quando a base passa de `MEMORY_ANN_THRESHOLD`. As buscas
+        esperam a compactação terminar.
+        """
+        if self.read_only:
+            return
+        with self._rw.escrita():
+            self._save()
+
+    def _save(self):
+        base_vetores, base_ids = _vetores_e_ids(self._base)
+        novos, novos_ids = _vetores_e_ids(self.index)
+        db = self._db()
+        vivos = np.fromiter((r[0] for r in db.execute("SELECT id FROM documents")), dtype=np.int64)
+        lapides_na_base = base_ids is not None and not np.isin(base_ids, vivos).all()
+        if lapides_na_base:
+            manter = np.isin(base_ids, vivos)
+            base_vetores, base_ids = base_vetores[manter], base_ids[manter]
+        if novos_ids is not None:
+            manter = np.isin(novos_ids, vivos)
+            novos, novos_ids = novos[manter], novos_ids[manter]
+
+        compacto = _flat_com_ids(self.dim)
+        for vetores, ids in ((base_vetores, base_ids), (novos, novos_ids)):
+            if ids is not None and len(ids):
+                compacto.add_with_ids(vetores, ids)
+        del base_vetores
+
+        if not self.path:
+            self._base = compacto
+            self._base_ids = faiss.vector_to_array(compacto.id_map)
+            self.index = _flat_com_ids(self.dim)
+            self._ann, self._ann_spec = self._atualizar_ann(novos, novos_ids, lapides_na_base)
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._arquivo(INDEX_FILE + ".tmp")
+        faiss.write_index(compacto, tmp)
+        os.replace(tmp, self._arquivo(INDEX_FILE))
+        del compacto
+
+        self._base = faiss.read_index(self._arquivo(INDEX_FILE), _MMAP_FLAGS)
+        self._base_ids = faiss.vector_to_array(self._base.id_map)
+        self.index = _flat_com_ids(self.dim)
+        self._reescrever_delta()
+
+        ann, spec = self._atualizar_ann(novos, novos_ids, lapides_na_base)
+        for antigo in glob.glob(self._arquivo(SEARCH_FILE.format("*"))):
+            if spec is None or antigo != self._arquivo(SEARCH_FILE.format(spec)):
+                os.remove(antigo)
+        if ann is not None:
+            tmp = self._arquivo(SEARCH_FILE.format(spec) + ".tmp")
+            faiss.write_index(ann, tmp)
+            os.replace(tmp, self._arquivo(SEARCH_FILE.format(spec)))
+            del ann
+        self._ler_ann()
+
+    def _atualizar_ann(self, novos: Optional[np.ndarray], novos_ids: Optional[np.ndarray], reconstruir: bool):
+        """(índice de busca, spec) para a base já compactada; (None, None) = base exata."""
+        total = self._base.ntotal if self._base is not None else 0
+        spec = search_spec(total) if total else None
+        if spec is None:
+            return None, None
+        ann = self._ann if self._ann_spec == spec else None
+        if ann is not None and self.path:
+            # O mapeado em memória é somente leitura: abre uma cópia gravável
+            ann = faiss.read_index(self._arquivo(SEARCH_FILE.format(spec)))
+        n_novos = len(novos_ids) if novos_ids is not None else 0
+        ivf = faiss.try_extract_index_ivf(ann) if ann is not None else None
+        reconstruir = (
+            reconstruir  # vetores removidos da base
+            or ann is None
+            or ann.ntotal + n_novos != total
+            # IVF treinado com bem menos vetores: listas grandes demais, retreina
+            or (ivf is not None and ivf.nlist * 2 < _nlist(total))
+        )
+        if reconstruir:
+            vetores, ids = _vetores_e_ids(self._base)
+            return build_search_index(vetores, spec, ids), spec
+        if n_novos:
+            ann.add_with_ids(novos, novos_ids)
+        return ann, spec
+
+    def _documentos(self, ids: List[int]) -> Dict[int, dict]:
+        if not ids:
+            return {}
+        marcadores = ",".join("?" * len(ids))
+        with self._db_lock:
+            db = self._db()
+            if db is None:
+                return {}
+            linhas = db.execute(
+                f"SELECT id, text, user_id, campaign_id, kind, created_at FROM documents WHERE id IN ({marcadores})", ids
+            ).fetchall()
+        campos = ("id", "text", "user_id", "campaign_id", "kind", "created_at")
+        return {linha[0]: {**dict(zip(campos, linha)), "text": _descomprimir(linha[1])} for linha in linhas}
+
+    def search_vectors(self, vector: np.ndarray, k: int = 5, sel=None, exact: bool = False,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[tuple]:
+        """Os `k` vizinhos de um vetor (1 x dim) como [(distância, id)], base + delta.
+
+        `sel` restringe a busca a um faiss.IDSelector; `exact=True` ignora o
+        índice de busca e varre a base exata. Sobre códigos comprimidos, busca
+        `k * MEMORY_RERANK_FACTOR` candidatos e os reordena com os vetores exatos.
+        """
+        with self._rw.leitura():
+            return self._search_vectors(vector, k, sel, exact, nprobe, ef_search)
+
+    def _search_vectors(self, vector, k, sel, exact, nprobe, ef_search) -> List[tuple]:
+        candidatos = []
+        usar_ann = self._ann is not None and not exact
+        rerank = usar_ann and _lossy(self._ann_spec) and settings.MEMORY_RERANK_FACTOR > 1
+        for index in ((self._ann if usar_ann else self._base), self.index):
+            if index is None or not index.ntotal:
+                continue
+            kk = k * settings.MEMORY_RERANK_FACTOR if rerank and index is self._ann else k
+            params = ann_search_params(index, kk, nprobe or self.nprobe, ef_search or self.ef_search, sel)
+            distances, indices = index.search(vector, min(kk, index.ntotal), params=params)
+            validos = indices[0] >= 0
+            ids, distancias = indices[0][validos], distances[0][validos]
+            if rerank and index is self._ann and len(ids):
+                distancias = rerank_exact(self._base, self._base_ids, vector, ids)
+            candidatos.extend((float(d), int(i)) for d, i in zip(distancias, ids))
+        candidatos.sort()
+        return candidatos[:k]
+
+    def search_documents(self, query: str, k: int = 5, user_id: Optional[str] = None,
+                         campaign_id: Optional[str] = None, kind: Optional[str] = None,
+                         since: Optional[float] = None) -> List[dict]:
+        """Busca com filtro por metadados; devolve dicts com texto, metadados e `distance`.
+
+        O filtro vira um IDSelector aplicado dentro do faiss. Filtros seletivos
+        (até `MEMORY_FILTER_EXACT_LIMIT` documentos) varrem a base exata, que só
+        calcula distância para os ids selecionados; nos demais casos o índice
+        aproximado é usado com `nprobe`/`efSearch` ampliados pelo inverso da
+        seletividade. Sem filtro, busca k + lápides para compensar removidos.
+        """
+        filtros = {"user_id": user_id, "campaign_id": campaign_id, "kind": kind, "since": since}
+        vector = get_embeddings([query])
+        with self._rw.leitura():
+            return self._buscar_documentos(vector, k, filtros)
+
+    def _buscar_documentos(self, vector: np.ndarray, k: int, filtros: Dict) -> List[dict]:
+        candidatos = self._candidatos(vector, k, filtros)
+        documentos = self._documentos([i for _, i in candidatos])
+        resultado = []
+        for distancia, i in candidatos:
+            if i in documentos:
+                resultado.append({**documentos[i], "distance": distancia})
+        return resultado[:k]
+
+    def _candidatos(self, vector: np.ndarray, k: int, filtros: Dict) -> List[tuple]:
+        if self._where(filtros)[0]:
+            ids = self._ids_filtrados(filtros)
+            if not len(ids):
+                return []
+            fator = max(1.0, self.ntotal / len(ids))
+            candidatos = self._search_vectors(
+                vector, min(k, len(ids)), sel=faiss.IDSelectorBatch(ids),
+                exact=len(ids) <= settings.MEMORY_FILTER_EXACT_LIMIT,
+                nprobe=int(min(4096, (self.nprobe or settings.MEMORY_NPROBE) * fator)),
+                ef_search=int(min(4096, (self.ef_search or settings.MEMORY_EF_SEARCH) * fator)),
+            )
+        else:
+            lapides = max(0, self.ntotal - self._vivos)
+            candidatos = self._search_vectors(vector, k + min(lapides, 10 * k), None, False, None, None)
+        return candidatos
+
+    def _buscar_lexical(self, termos: List[str], k: int, filtros: Dict) -> List[int]:
+        where, valores = self._where(filtros)
+        sql = f"SELECT f.rowid FROM {LEXICAL_TABLE} f"
+        if where:
+            sql += " JOIN documents d ON d.id = f.rowid"
+        sql += f" WHERE {LEXICAL_TABLE} MATCH ?" + (f" AND {where}" if where else "") + " ORDER BY f.rank LIMIT ?"
+        with self._db_lock:
+            db = self._db()
+            if db is None:
+                return []
+            try:
+                return [r[0] for r in db.execute(sql, [_consulta_fts(termos), *valores, k])]
+            except sqlite3.OperationalError:
+                # Leitor somente leitura de uma memória anterior ao índice lexical
+                return []
+
+    def search_hybrid(self, query: str, k: int = 5, mode: str = "hybrid", user_id: Optional[str] = None,
+                      campaign_id: Optional[str] = None, kind: Optional[str] = None,
+                      since: Optional[float] = None) -> List[dict]:
+        """Busca lexical (FTS5/BM25), vetorial ou as duas combinadas por reciprocal rank fusion.
+
+        Marcas, SKUs e hashtags casam pelo termo exato no índice invertido. No
+        modo `hybrid`, consultas só de hashtags/menções/códigos que já têm `k`
+        resultados lexicais dispensam a chamada de embeddings. Cada documento
+        traz o `score` da fusão (ou a `distance`, no modo `vector`).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode inválido: {mode} (use {', '.join(SEARCH_MODES)})")
+        filtros = {"user_id": user_id, "campaign_id": campaign_id, "kind": kind, "since": since}
+        if mode == "vector":
+            return self.search_documents(query, k, **filtros)
+        termos = _termos(query)
+        n = max(2 * k, 20)
+        with self._rw.leitura():
+            listas = [self._buscar_lexical(termos, n, filtros)] if termos else [[]]
+        if mode == "hybrid" and not (_parece_palavra_chave(termos) and len(listas[0]) >= k):
+            vector = get_embeddings([query])
+            with self._rw.leitura():
+                listas.append([i for _, i in self._candidatos(vector, n, filtros)])
+        fundidos = rrf(listas, settings.MEMORY_RRF_K)
+        with self._rw.leitura():
+            # A lista vetorial pode trazer lápides: só documentos vivos entram no top-k
+            documentos = self._documentos([i for _, i in fundidos])
+        return [{**documentos[i], "score": score} for score, i in fundidos if i in documentos][:k]
+
+    def search(self, query: str, k=5, mode: Optional[str] = None, **filtros):
+        """Textos mais relevantes para `query` (modo padrão: `MEMORY_SEARCH_MODE`)."""
+        return [d["text"] for d in self.search_hybrid(query, k, mode or settings.MEMORY_SEARCH_MODE, **filtros)]
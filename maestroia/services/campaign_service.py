@@ -1,5 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, Iterator, Optional
 from maestroia.graphs.marketing_graph import build_marketing_graph
+from maestroia.graphs.checkpoint import get_checkpointer, async_checkpointer, thread_config
 
-def run_campaign(state):
-    graph = build_marketing_graph()
-    return graph.invoke(state)
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """Grafo compilado uma única vez por processo."""
+    return build_marketing_graph()
+
+
+def with_checkpointer(graph, checkpointer):
+    """Cópia leve do grafo compilado usando `checkpointer` (sem recompilar)."""
+    return graph.copy(update={"checkpointer": checkpointer})
+
+
+def run_campaign(state, campaign_id: Optional[str] = None, checkpoint_path: Optional[str] = None):
+    """Executa a campanha.
+
+    Com `campaign_id`, o progresso é salvo no checkpointer SQLite: uma nova
+    chamada com o mesmo id retoma do último nó concluído (o `state` passado é
+    ignorado) e uma campanha já concluída devolve o resultado salvo sem
+    refazer chamadas pagas ao LLM.
+    """
+    if campaign_id is None:
+        return get_graph().invoke(state)
+
+    graph = with_checkpointer(get_graph(), get_checkpointer(checkpoint_path))
+    config = thread_config(campaign_id)
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        return graph.invoke(state, config)
+    if snapshot.next:
+        return graph.invoke(None, config)
+    return snapshot.values
+
+
+async def arun_campaign(state, campaign_id: Optional[str] = None, checkpoint_path: Optional[str] = None):
+    """Versão assíncrona de `run_campaign` (usa `ainvoke`)."""
+    if campaign_id is None:
+        return await get_graph().ainvoke(state)
+
+    async with async_checkpointer(checkpoint_path) as checkpointer:
+        graph = with_checkpointer(get_graph(), checkpointer)
+        config = thread_config(campaign_id)
+        snapshot = await graph.aget_state(config)
+        if not snapshot.values:
+            return await graph.ainvoke(state, config)
+        if snapshot.next:
+            return await graph.ainvoke(None, config)
+        return snapshot.values
+
+
+def _executar_item(indice: int, item) -> dict:
+    if not isinstance(item, dict):
+        return {"index": indice, "campaign_id": None, "status": "error",
+                "error": f"Entrada inválida (esperado objeto MaestroState): {str(item)[:80]}"}
+    state = dict(item)
+    campaign_id = state.pop("campaign_id", None)
+    try:
+        result = run_campaign(state, campaign_id=campaign_id)
+        return {"index": indice, "campaign_id": campaign_id, "status": "ok", "result": result}
+    except Exception as e:
+        return {"index": indice, "campaign_id": campaign_id, "status": "error", "error": str(e)}
+
+
+def run_campaigns(states: Iterable[dict], max_concurrency: int = 4) -> Iterator[dict]:
+    """Executa várias campanhas em paralelo, devolvendo cada resultado assim que fica pronto.
+
+    `states` é consumido sob demanda (no máximo `max_concurrency` campanhas em
+    andamento), então pode ser um gerador lendo um arquivo grande. Cada item
+    pode trazer `campaign_id` para salvar checkpoints e retomar o lote.
+    O total de chamadas simultâneas ao LLM continua limitado por
+    `LLM_MAX_CONCURRENCY` em `openai_service`.
+
+    Falhas ficam isoladas na própria campanha:
+      {"index": i, "campaign_id": ..., "status": "ok", "result": {...}}
+      {"index": i, "campaign_id": ..., "status": "error", "error": "..."}
+    """
+    itens = enumerate(states)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        pendentes = set()
+        for indice, item in itens:
+            pendentes.add(pool.submit(_executar_item, indice, item))
+            if len(pendentes) >= max_concurrency:
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield futuro.result()
+        while pendentes:
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                yield futuro.result()
+
+
+def stream_campaign(state, campaign_id: Optional[str] = None, checkpoint_path: Optional[str] = None) -> Iterator[dict]:
+    """Executa a campanha emitindo um evento a cada nó concluído (via `graph.stream`).
+
+    Eventos:
+      {"type": "node", "node": <nome do nó>, "update": <saída parcial do nó>}
+      {"type": "done", "result": <estado final>}
+
+    Nós de fan-out (criador_conteudo, publicador) emitem um evento por canal.
+    `campaign_id` tem a mesma semântica de retomada de `run_campaign`.
+    """
+    graph = get_graph()
+    config = None
+    if campaign_id is not None:
+        graph = with_checkpointer(graph, get_checkpointer(checkpoint_path))
+        config = thread_config(campaign_id)
+        snapshot = graph.get_state(config)
+        if snapshot.values and not snapshot.next:
+            yield {"type": "done", "result": snapshot.values}
+            return
+        if snapshot.values:
+            state = None
+
+    yield from _eventos(graph, state, config)
+
+
+async def astream_campaign(state, campaign_id: Optional[str] = None, checkpoint_path: Optional[str] = None) -> AsyncIterator[dict]:
+    """Versão assíncrona de `stream_campaign` (usa `astream`)."""
+    if campaign_id is None:
+        async for evento in _aeventos(get_graph(), state, None):
+            yield evento
+        return
+
+    async with async_checkpointer(checkpoint_path) as checkpointer:
+        graph = with_checkpointer(get_graph(), checkpointer)
+        config = thread_config(campaign_id)
+        snapshot = await graph.aget_state(config)
+        if snapshot.values and not snapshot.next:
+            yield {"type": "done", "result": snapshot.values}
+            return
+        async for evento in _aeventos(graph, None if snapshot.values else state, config):
+            yield evento
+
+
+def _eventos(graph, state, config) -> Iterator[dict]:
+    resultado = {}
+    for modo, chunk in graph.stream(state, config, stream_mode=["updates", "values"]):
+        if modo == "values":
+            resultado = chunk
+            continue
+        for no, atualizacao in chunk.items():
+            yield {"type": "node", "node": no, "update": atualizacao or {}}
+    yield {"type": "done", "result": resultado}
+
+
+async def _aeventos(graph, state, config) -> AsyncIterator[dict]:
+    resultado = {}
+    async for modo, chunk in graph.astream(state, config, stream_mode=["updates", "values"]):
+        if modo == "values":
+            resultado = chunk
+            continue
+        for no, atualizacao in chunk.items():
+            yield {"type": "node", "node": no, "update": atualizacao or {}}
+    yield {"type": "done", "result": resultado}
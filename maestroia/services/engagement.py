@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from maestroia.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Sem flock (Windows): só um processo por vez deve gravar no diretório
+    fcntl = None
+
+HORAS_SEMANA = 168
+DIAS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+COLUNAS = {"ts": np.int64, "platform": np.uint8, "niche": np.uint32, "how": np.uint8, "engagement": np.float32}
+
+
+def nicho(texto: Optional[str]) -> str:
+    """Chave do nicho: texto (ex.: público-alvo) em minúsculas, espaços normalizados."""
+    return " ".join((texto or "").lower().split())
+
+
+def plataforma(canal: str) -> str:
+    from maestroia.services.publishing import plataforma as _plataforma
+
+    return _plataforma(canal)
+
+
+def hora_da_semana(timestamps, utc_offset_hours: float) -> np.ndarray:
+    """Hora da semana (0 = segunda 00h … 167 = domingo 23h) no fuso `utc_offset_hours`."""
+    local = np.asarray(timestamps, dtype=np.int64) + int(utc_offset_hours * 3600)
+    # 01/01/1970 foi uma quinta-feira (dia 3 contando de segunda = 0)
+    return (((local // 86400 + 3) % 7) * 24 + (local // 3600) % 24).astype(np.uint8)
+
+
+def formatar_janela(how: int) -> str:
+    dia, hora = divmod(int(how), 24)
+    return f"{DIAS[dia]} {hora:02d}:00-{(hora + 1) % 24:02d}:00"
+
+
+class EngagementStore:
+    """Histórico de engajamento por post em formato colunar (NumPy).
+
+    Cada lote gravado vira um diretório com um `.npy` por coluna (timestamp,
+    plataforma, nicho, hora da semana e engajamento); plataforma e nicho são
+    códigos inteiros de um dicionário em `dicionario.json`, que só cresce: um
+    código novo é reservado no arquivo na hora, sob uma trava de arquivo, para
+    que processos gravando juntos (API e scripts de importação) nunca deem o
+    mesmo código a valores diferentes. A leitura usa
+    memmap e cada lote é reduzido às células (plataforma, nicho, hora) com
+    `np.unique` + `np.bincount`, sem laço em Python, então milhões de linhas
+    ocupam poucos MB e são agregadas em frações de segundo. O agregado e as
+    melhores janelas ficam em cache até um novo lote ser gravado.
+    """
+
+    def __init__(self, path: str, utc_offset_hours: float = -3.0, chunk_rows: int = 1_000_000,
+                 min_posts: int = 5):
+        self.path = path
+        self.utc_offset_hours = utc_offset_hours
+        self.chunk_rows = chunk_rows
+        self.min_posts = min_posts
+        self._lock = threading.RLock()
+        self._dicionario: Optional[Dict[str, Dict[str, int]]] = None
+        self._buffer: List[Dict[str, np.ndarray]] = []
+        self._buffer_linhas = 0
+        self._agregado = None
+        self._janelas: Dict[tuple, List[dict]] = {}
+
+    # ---------- dicionário de códigos ----------
+
+    def _arquivo_dicionario(self) -> str:
+        return os.path.join(self.path, "dicionario.json")
+
+    def _carregar_dicionario(self) -> Dict[str, Dict[str, int]]:
+        if self._dicionario is None:
+            try:
+                with open(self._arquivo_dicionario(), encoding="utf-8") as f:
+                    self._dicionario = json.load(f)
+            except FileNotFoundError:
+                self._dicionario = {"platform": {}, "niche": {}}
+        return self._dicionario
+
+    @contextmanager
+    def _trava_dicionario(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "dicionario.lock"), "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _codificar(self, coluna: str, valores: Sequence[str], normalizar) -> np.ndarray:
+        # Normaliza só os valores distintos; o resto é indexação vetorizada
+        codigos = self._carregar_dicionario()[coluna]
+        unicos, inverso = np.unique(np.asarray(valores).astype(str), return_inverse=True)
+        chaves = [normalizar(valor) for valor in unicos]
+        if any(chave not in codigos for chave in chaves):
+            # Relê sob a trava: outro processo pode ter reservado códigos desde a última leitura
+            with self._trava_dicionario():
+                self._dicionario = None
+                codigos = self._carregar_dicionario()[coluna]
+                for chave in chaves:
+                    codigos.setdefault(chave, len(codigos))
+                self._gravar_dicionario()
+        return np.array([codigos[chave] for chave in chaves], dtype=COLUNAS[coluna])[inverso]
+
+    def _gravar_dicionario(self):
+        tmp = self._arquivo_dicionario() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._dicionario, f, ensure_ascii=False)
+        os.replace(tmp, self._arquivo_dicionario())
+
+    # ---------- escrita ----------
+
+    def ingest(self, platforms: Sequence[str], niches: Sequence[str], timestamps: Sequence[float],
+               engagements: Sequence[float]) -> int:
+        """Acrescenta posts (colunas de mesmo tamanho); retorna quantas linhas entraram."""
+        ts = np.asarray(timestamps, dtype=np.int64)
+        if ts.size == 0:
+            return 0
+        with self._lock:
+            lote = {
+                "ts": ts,
+                "platform": self._codificar("platform", platforms, plataforma),
+                "niche": self._codificar("niche", niches, nicho),
+                "how": hora_da_semana(ts, self.utc_offset_hours),
+                "engagement": np.asarray(engagements, dtype=np.float32),
+            }
+            self._buffer.append(lote)
+            self._buffer_linhas += ts.size
+            self._invalidar()
+            if self._buffer_linhas >= self.chunk_rows:
+                self.flush()
+        return int(ts.size)
+
+    def ingest_records(self, registros: Sequence[dict]) -> int:
+        """Atalho para dicts com `platform`, `niche`, `timestamp` e `engagement`."""
+        return self.ingest(
+            [r["platform"] for r in registros], [r.get("niche", "") for r in registros],
+            [r["timestamp"] for r in registros], [r["engagement"] for r in registros],
+        )
+
+    def flush(self):
+        """Grava o buffer como um novo lote colunar."""
+        with self._lock:
+            if not self._buffer:
+                return
+            colunas = {nome: np.concatenate([lote[nome] for lote in self._buffer]) for nome in COLUNAS}
+            # Os códigos do buffer já estão no dicionario.json (reservados em `_codificar`)
+            os.makedirs(self.path, exist_ok=True)
+            nome = f"chunk-{time.time_ns()}-{os.getpid()}"
+            tmp = os.path.join(self.path, f".{nome}")
+            os.makedirs(tmp)
+            for coluna, valores in colunas.items():
+                np.save(os.path.join(tmp, f"{coluna}.npy"), valores)
+            os.rename(tmp, os.path.join(self.path, nome))
+            self._buffer, self._buffer_linhas = [], 0
+
+    # ---------- leitura ----------
+
+    def _lotes(self) -> List[str]:
+        try:
+            nomes = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(self.path, n) for n in nomes if n.startswith("chunk-"))
+
+    def _colunas(self):
+        for lote in self._lotes():
+            yield {c: np.load(os.path.join(lote, f"{c}.npy"), mmap_mode="r") for c in ("platform", "niche", "how", "engagement")}
+        yield from self._buffer
+
+    def _invalidar(self):
+        self._agregado = None
+        self._janelas = {}
+
+    def aggregate(self):
+        """Agregado esparso por (plataforma, nicho, hora da semana) + denso por plataforma.
+
+        Retorna `(chaves, somas, contagens, por_plataforma)`: as células com posts
+        (chave = (plataforma * n_nichos + nicho) * 168 + hora), ordenadas, e as
+        matrizes (plataformas x 168) de somas e contagens.
+        """
+        with self._lock:
+            versao = (tuple(self._lotes()), self._buffer_linhas)
+            if self._agregado is not None and self._agregado[0] == versao:
+                return self._agregado[1]
+            # Outro processo pode ter gravado lotes com códigos novos
+            self._dicionario = None
+            dicionario = self._carregar_dicionario()
+            n_plat = max(1, len(dicionario["platform"]))
+            n_nicho = max(1, len(dicionario["niche"]))
+            partes = []
+            for col in self._colunas():
+                chave = (col["platform"].astype(np.int64) * n_nicho + col["niche"]) * HORAS_SEMANA + col["how"]
+                unicas, inverso = np.unique(chave, return_inverse=True)
+                partes.append((unicas, np.bincount(inverso, weights=col["engagement"]), np.bincount(inverso)))
+            if partes:
+                unicas, inverso = np.unique(np.concatenate([p[0] for p in partes]), return_inverse=True)
+                somas = np.bincount(inverso, weights=np.concatenate([p[1] for p in partes]))
+                contagens = np.bincount(inverso, weights=np.concatenate([p[2] for p in partes])).astype(np.int64)
+            else:
+                unicas, somas, contagens = np.zeros(0, np.int64), np.zeros(0), np.zeros(0, np.int64)
+            plat = unicas // (n_nicho * HORAS_SEMANA) * HORAS_SEMANA + unicas % HORAS_SEMANA
+            tamanho = n_plat * HORAS_SEMANA
+            por_plataforma = (
+                np.bincount(plat, weights=somas, minlength=tamanho).reshape(n_plat, HORAS_SEMANA),
+                np.bincount(plat, weights=contagens, minlength=tamanho).astype(np.int64).reshape(n_plat, HORAS_SEMANA),
+            )
+            self._agregado = (versao, (unicas, somas, contagens, por_plataforma), n_nicho)
+            self._janelas = {}
+            return self._agregado[1]
+
+    def histogram(self, canal: str, niche: Optional[str] = None):
+        """(somas, contagens) por hora da semana; sem `niche`, a plataforma inteira."""
+        chaves, somas, contagens, (somas_plat, contagens_plat) = self.aggregate()
+        vazio = np.zeros(HORAS_SEMANA), np.zeros(HORAS_SEMANA, dtype=np.int64)
+        with self._lock:
+            dicionario = self._carregar_dicionario()
+            n_nicho = self._agregado[2]
+        p = dicionario["platform"].get(plataforma(canal))
+        if p is None or p >= len(somas_plat):
+            return vazio
+        if niche is None:
+            return somas_plat[p], contagens_plat[p]
+        n = dicionario["niche"].get(nicho(niche))
+        if n is None or n >= n_nicho:
+            return vazio
+        base = (p * n_nicho + n) * HORAS_SEMANA
+        inicio, fim = np.searchsorted(chaves, [base, base + HORAS_SEMANA])
+        horas = chaves[inicio:fim] - base
+        hist_somas, hist_contagens = vazio[0].copy(), vazio[1].copy()
+        hist_somas[horas] = somas[inicio:fim]
+        hist_contagens[horas] = contagens[inicio:fim]
+        return hist_somas, hist_contagens
+
+    def top_windows(self, canal: str, niche: Optional[str] = None, k: int = 3) -> List[dict]:
+        """As `k` horas da semana com maior engajamento médio por post.
+
+        Usa o histórico do nicho quando há ao menos `min_posts` posts nele,
+        senão o da plataforma; sem histórico, retorna lista vazia. Horas com
+        menos de `min_posts` posts só entram se nenhuma hora tiver tantos, e a
+        média é puxada para a média geral (`min_posts` posts "virtuais"), para
+        um único post viral não definir a janela.
+        """
+        self.aggregate()
+        chave = (plataforma(canal), nicho(niche) if niche else None, k)
+        with self._lock:
+            if chave in self._janelas:
+                return self._janelas[chave]
+        somas, contagens = self.histogram(canal, niche) if niche else (None, None)
+        if contagens is None or contagens.sum() < self.min_posts:
+            somas, contagens = self.histogram(canal)
+        janelas = []
+        if contagens.sum() > 0:
+            media_geral = somas.sum() / contagens.sum()
+            pontuacao = (somas + self.min_posts * media_geral) / (contagens + self.min_posts)
+            pontuacao[contagens < min(self.min_posts, contagens.max())] = -np.inf
+            for how in np.argsort(-pontuacao, kind="stable")[:k]:
+                if pontuacao[how] == -np.inf:
+                    break
+                janelas.append({
+                    "how": int(how),
+                    "janela": formatar_janela(how),
+                    "media": float(somas[how] / contagens[how]),
+                    "posts": int(contagens[how]),
+                })
+        with self._lock:
+            self._janelas[chave] = janelas
+        return janelas
+
+    def next_occurrence(self, how: int, agora: Optional[float] = None) -> float:
+        """Timestamp do próximo início da hora da semana `how` (sempre no futuro)."""
+        agora = time.time() if agora is None else agora
+        offset = int(self.utc_offset_hours * 3600)
+        hora_local = (int(agora) + offset) // 3600
+        atual = int(hora_da_semana([int(agora)], self.utc_offset_hours)[0])
+        delta = (how - atual - 1) % HORAS_SEMANA + 1
+        return float((hora_local + delta) * 3600 - offset)
+
+
+def best_windows_text(canal: str, niche: Optional[str] = None, k: int = 3) -> str:
+    """Melhores janelas em texto (ex.: 'Ter 18:00-19:00, Qui 12:00-13:00'); vazio sem histórico."""
+    return ", ".join(j["janela"] for j in engagement_store.top_windows(canal, niche, k))
+
+
+engagement_store = EngagementStore(
+    settings.ENGAGEMENT_DATA_DIR,
+    utc_offset_hours=settings.ENGAGEMENT_UTC_OFFSET_HOURS,
+    min_posts=settings.ENGAGEMENT_MIN_POSTS,
+)
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from maestroia.config import settings
+from maestroia.services.campaign_service import stream_campaign
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINAIS = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(RuntimeError):
+    """A fila de jobs está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+def _mesclar(parcial: dict, atualizacao: dict):
+    """Aplica a saída de um nó ao estado parcial (listas acumulam, dicts combinam)."""
+    for chave, valor in atualizacao.items():
+        if isinstance(valor, list) and isinstance(parcial.get(chave), list):
+            parcial[chave] = parcial[chave] + valor
+        elif isinstance(valor, dict) and isinstance(parcial.get(chave), dict):
+            parcial[chave] = {**parcial[chave], **valor}
+        else:
+            parcial[chave] = valor
+
+
+class CampaignJob:
+    """Uma execução de campanha em segundo plano: status, eventos e estado parcial."""
+
+    def __init__(self, state: dict, user_id, campaign_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.state = state
+        self.user_id = user_id
+        self.campaign_id = campaign_id
+        self.status = QUEUED
+        self.partial: dict = {}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.events: List[dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = threading.Event()
+        self._cond = threading.Condition()
+        # (loop, asyncio.Event) de quem acompanha o job por streaming
+        self._assinantes: List[tuple] = []
+
+    @property
+    def thread_id(self) -> Optional[str]:
+        # Só com campaign_id há checkpoint: repetir o mesmo id retoma do último nó concluído.
+        # Sem id ninguém retomaria a thread, que só faria o banco de checkpoints crescer.
+        if self.campaign_id is None:
+            return None
+        return f"{self.user_id}:{self.campaign_id}"
+
+    def _emitir(self, evento: dict):
+        with self._cond:
+            if evento["type"] == "node":
+                _mesclar(self.partial, evento["update"])
+            self.events.append(evento)
+            self._notificar()
+
+    def _finalizar(self, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            evento = {"type": "done", "result": result} if status == SUCCEEDED else {"type": status, "detail": error}
+            self.events.append(evento)
+            self._notificar()
+
+    def _notificar(self):
+        # Chamado com self._cond; acorda os streams no event loop de cada um
+        self._cond.notify_all()
+        for loop, sinal in self._assinantes:
+            try:
+                loop.call_soon_threadsafe(sinal.set)
+            except RuntimeError:
+                # Loop já encerrado: o stream morreu junto
+                pass
+
+    async def events_since(self, indice: int, timeout: float) -> List[dict]:
+        """Eventos a partir de `indice`, esperando até `timeout` segundos por um novo.
+
+        Espera no event loop (sem ocupar thread do pool), acordada pelo worker.
+        """
+        sinal = asyncio.Event()
+        with self._cond:
+            if len(self.events) > indice or self.done:
+                return self.events[indice:]
+            self._assinantes.append((asyncio.get_running_loop(), sinal))
+        try:
+            await asyncio.wait_for(sinal.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._assinantes = [a for a in self._assinantes if a[1] is not sinal]
+        with self._cond:
+            return self.events[indice:]
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAIS
+
+    def to_dict(self) -> dict:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "campaign_id": self.campaign_id,
+                "status": self.status,
+                "cancel_requested": self.cancel_requested.is_set(),
+                "nodes_done": sum(1 for e in self.events if e["type"] == "node"),
+                "partial": dict(self.partial),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class CampaignJobManager:
+    """Executa campanhas em um pool de `workers` threads com fila limitada.
+
+    `submit` devolve o job na hora ou levanta `JobQueueFull` quando já há
+    `queue_size` jobs esperando (controle de admissão: a API responde 429).
+    Um envio repetido com o mesmo usuário e `campaign_id` enquanto o job
+    anterior não terminou devolve esse job, em vez de pagar outra execução.
+    `cancel` para o job entre um nó e outro; com `campaign_id`, o progresso
+    fica no checkpoint (jobs sem id rodam sem checkpointer).
+    Jobs concluídos ficam consultáveis por `ttl` segundos. `on_done(job)` é
+    chamado (na thread do worker) quando uma campanha termina com sucesso.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 20, ttl: float = 3600.0,
+                 run: Callable = stream_campaign, on_done: Optional[Callable[[CampaignJob], None]] = None):
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.run = run
+        self.on_done = on_done
+        self._fila: "queue.Queue[Optional[CampaignJob]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._jobs: Dict[str, CampaignJob] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _iniciar(self):
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"campaign-job-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _limpar(self):
+        limite = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < limite]:
+            del self._jobs[job_id]
+
+    def submit(self, state: dict, user_id, campaign_id: Optional[str] = None) -> CampaignJob:
+        with self._lock:
+            self._limpar()
+            if campaign_id is not None:
+                for job in self._jobs.values():
+                    if job.user_id == user_id and job.campaign_id == campaign_id and not job.done:
+                        return job
+            job = CampaignJob(state, user_id, campaign_id)
+            try:
+                self._fila.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFull(f"Fila de campanhas cheia ({self._fila.maxsize} aguardando)")
+            self._jobs[job.id] = job
+            self._iniciar()
+        return job
+
+    def get(self, job_id: str, user_id=None) -> Optional[CampaignJob]:
+        """O job, se existir (e for do `user_id`, quando informado)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    def cancel(self, job_id: str, user_id=None) -> Optional[CampaignJob]:
+        job = self.get(job_id, user_id)
+        if job is None or job.done:
+            return job
+        job.cancel_requested.set()
+        with job._cond:
+            # Ainda na fila: o worker só descarta; marca já como cancelado
+            if job.status == QUEUED:
+                job._finalizar(CANCELLED, error="Cancelado antes de iniciar")
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            contagem = {s: 0 for s in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                contagem[job.status] += 1
+        return {**contagem, "queue_size": self._fila.maxsize, "workers": self.workers}
+
+    def _executar(self, job: CampaignJob):
+        with job._cond:
+            if job.done:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        eventos = self.run(job.state, job.thread_id)
+        try:
+            for evento in eventos:
+                if job.cancel_requested.is_set():
+                    job._finalizar(CANCELLED, error="Cancelado pelo usuário")
+                    return
+                if evento["type"] == "done":
+                    job._finalizar(SUCCEEDED, result=evento["result"])
+                    break
+                job._emitir(evento)
+        except Exception as e:
+            logger.warning("Job de campanha %s falhou: %s", job.id, e)
+            job._finalizar(FAILED, error=str(e))
+            return
+        finally:
+            # Fecha o gerador: um cancelamento interrompe o grafo antes do próximo nó
+            close = getattr(eventos, "close", None)
+            if close:
+                close()
+        if job.status == SUCCEEDED and self.on_done:
+            try:
+                self.on_done(job)
+            except Exception as e:
+                logger.warning("Falha ao salvar a campanha do job %s: %s", job.id, e)
+
+    def _loop(self):
+        while True:
+            job = self._fila.get()
+            if job is None:
+                return
+            try:
+                self._executar(job)
+            finally:
+                self._fila.task_done()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Cancela os jobs em andamento e encerra os workers."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job.id)
+        for _ in self._threads:
+            try:
+                self._fila.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout)
+
+
+campaign_jobs = CampaignJobManager(
+    workers=settings.CAMPAIGN_JOB_WORKERS,
+    queue_size=settings.CAMPAIGN_JOB_QUEUE_SIZE,
+    ttl=settings.CAMPAIGN_JOB_TTL_SECONDS,
+)
@@ -0,0 +1,162 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+from maestroia.config import settings
+
+Valor = Union[str, bytes]
+
+
+def cache_key(*partes) -> str:
+    """Chave endereçada por conteúdo: partes curtas em texto + SHA-256 da última (prompt/texto)."""
+    *prefixo, conteudo = partes
+    digest = hashlib.sha256(str(conteudo).encode("utf-8")).hexdigest()
+    return ":".join([*(str(p) for p in prefixo), digest])
+
+
+class ResponseCache:
+    """Cache em dois níveis: LRU em memória na frente de uma tabela SQLite.
+
+    - `ttl`: segundos até uma entrada expirar (nos dois níveis).
+    - `max_entries`: tamanho máximo da tabela em disco; as entradas menos
+      acessadas são removidas quando o limite é ultrapassado.
+    - `memory_entries`: tamanho do LRU em memória.
+    - `path=None` desativa o nível em disco.
+    """
+
+    def __init__(self, path: Optional[str], table: str = "llm_cache", ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 50000, memory_entries: int = 1024):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB, created_at REAL, accessed_at REAL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table}(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _lembrar(self, key: str, value: Valor, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Valor]:
+        agora = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                value, created_at = item
+                if agora - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return value
+                del self._memory[key]
+
+            if self.path:
+                db = self._db()
+                row = db.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if agora - created_at <= self.ttl:
+                        db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (agora, key))
+                        db.commit()
+                        self._lembrar(key, value, created_at)
+                        self.hits_disk += 1
+                        return value
+                    db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Valor):
+        agora = time.time()
+        with self._lock:
+            self._lembrar(key, value, agora)
+            if not self.path:
+                return
+            db = self._db()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, agora, agora),
+            )
+            self._puts += 1
+            # Verificar o tamanho a cada 100 gravações evita um COUNT(*) por chamada
+            if self._puts % 100 == 0:
+                self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        db.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        total = db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excesso = total - self.max_entries
+        if excesso > 0:
+            db.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (excesso,),
+            )
+
+    def evict(self):
+        """Remove entradas expiradas e aplica o limite de tamanho imediatamente."""
+        with self._lock:
+            if self.path:
+                db = self._db()
+                self._evict(db)
+                db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.path:
+                db = self._db()
+                db.execute(f"DELETE FROM {self.table}")
+                db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / total if total else 0.0,
+        }
+
+
+response_cache = ResponseCache(
+    settings.LLM_CACHE_PATH,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+)
+
+# Embeddings (float32 em bytes) chaveados por modelo e hash do texto, no mesmo arquivo
+embedding_cache = ResponseCache(
+    settings.LLM_CACHE_PATH,
+    table="embedding_cache",
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+)
@@ -1,77 +1,252 @@
-from typing import Optional
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import numpy as np
 from maestroia.config import settings
+from maestroia.services.llm_cache import response_cache, embedding_cache, cache_key
 
 try:
     import openai
     client = openai.OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+    # Cliente assíncrono compartilhado: reaproveita o pool de conexões entre campanhas
+    async_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
 except Exception:
     openai = None
     client = None
+    async_client = None
 
+# Limite global de chamadas simultâneas à API, compartilhado por todas as campanhas
+# (e pelos caminhos síncrono e assíncrono)
+_llm_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
 
-def chat(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None) -> str:
+
+@asynccontextmanager
+async def _aslots():
+    """Vaga em `_llm_slots` para o caminho assíncrono, sem bloquear o event loop.
+
+    Tenta sem bloquear e espera com `asyncio.sleep` entre as tentativas: nenhuma
+    thread fica presa esperando, e um cancelamento não deixa vaga ocupada.
+    """
+    espera = 0.005
+    while not _llm_slots.acquire(blocking=False):
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, 0.05)
+    try:
+        yield
+    finally:
+        _llm_slots.release()
+
+
+FALLBACK_MARKER = "[FALLBACK OPENAI]"
+
+
+def _fallback_chat(prompt: str, erro: Exception) -> str:
+    # Fallback: retornar prompt ecoado com aviso para ambiente de dev
+    return f"{FALLBACK_MARKER} Não foi possível contatar OpenAI: {erro}. Prompt: {prompt[:500]}"
+
+
+def is_fallback(texto: Optional[str]) -> bool:
+    """True se `texto` contém uma resposta de fallback (não deve ser reaproveitado)."""
+    return texto is None or FALLBACK_MARKER in texto
+
+
+def chat(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None, cache: bool = True) -> str:
     """Enviar prompt para OpenAI (ChatCompletion). Retorna texto da resposta.
 
-    Em caso de ausência do pacote `openai` ou erro, retorna mensagem de fallback.
+    Respostas são guardadas em `llm_cache.response_cache`; `cache=False` força
+    uma nova chamada. Em caso de ausência do pacote `openai` ou erro, retorna
+    mensagem de fallback (que nunca é guardada no cache).
     """
     model = model or settings.DEFAULT_LLM_MODEL
     temperature = temperature if temperature is not None else settings.DEFAULT_TEMPERATURE
+    key = cache_key("chat", model, temperature, prompt)
+    usar_cache = cache and settings.LLM_CACHE_ENABLED
+    if usar_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
     try:
         if not client:
             raise RuntimeError("Cliente OpenAI não inicializado")
 
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-        )
-        return resp.choices[0].message.content
+        with _llm_slots:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+            )
+        content = resp.choices[0].message.content
     except Exception as e:
-        # Fallback: retornar prompt ecoado com aviso para ambiente de dev
-        return f"[FALLBACK OPENAI] Não foi possível contatar OpenAI: {e}. Prompt: {prompt[:500]}"
+        return _fallback_chat(prompt, e)
+    if usar_cache and content is not None:
+        response_cache.set(key, content)
+    return content
+
+
+async def achat(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None, cache: bool = True) -> str:
+    """Versão assíncrona de `chat`, usando o `AsyncOpenAI` compartilhado e o mesmo cache.
+
+    O cache (que pode ir ao SQLite) é consultado e gravado numa thread, fora do event loop.
+    """
+    model = model or settings.DEFAULT_LLM_MODEL
+    temperature = temperature if temperature is not None else settings.DEFAULT_TEMPERATURE
+    key = cache_key("chat", model, temperature, prompt)
+    usar_cache = cache and settings.LLM_CACHE_ENABLED
+    if usar_cache:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            return cached
+    try:
+        if not async_client:
+            raise RuntimeError("Cliente OpenAI assíncrono não inicializado")
+
+        async with _aslots():
+            resp = await async_client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+            )
+        content = resp.choices[0].message.content
+    except Exception as e:
+        return _fallback_chat(prompt, e)
+    if usar_cache and content is not None:
+        await asyncio.to_thread(response_cache.set, key, content)
+    return content
 
 
 def generate_image(prompt: str, n: int = 1, size: str = "1024x1024") -> Optional[list]:
     try:
         if not client:
             raise RuntimeError("Cliente OpenAI não inicializado")
-        img_resp = client.images.generate(
-            prompt=prompt,
-            n=n,
-            size=size
-        )
+        with _llm_slots:
+            img_resp = client.images.generate(
+                prompt=prompt,
+                n=n,
+                size=size
+            )
         urls = [d.url for d in img_resp.data]
         return urls
     except Exception:
         return None
 
 
+async def agenerate_image(prompt: str, n: int = 1, size: str = "1024x1024") -> Optional[list]:
+    """Versão assíncrona de `generate_image`."""
+    try:
+        if not async_client:
+            raise RuntimeError("Cliente OpenAI assíncrono não inicializado")
+        async with _aslots():
+            img_resp = await async_client.images.generate(
+                prompt=prompt,
+                n=n,
+                size=size
+            )
+        return [d.url for d in img_resp.data]
+    except Exception:
+        return None
+
+
+def _fallback_embeddings(texts: List[str]) -> np.ndarray:
+    """Vetores determinísticos (hash) para quando a API não está disponível.
+
+    Uma semente de 64 bits por texto (SHA-256) alimenta um gerador splitmix64
+    calculado de uma vez para o lote inteiro; os valores ficam em [-1, 1) e
+    cada linha é normalizada (norma L2 = 1), sem NaN/inf.
+    """
+    import hashlib
+    dims = getattr(settings, 'DEFAULT_EMBEDDING_DIM', 1536)
+    seeds = np.array(
+        [int.from_bytes(hashlib.sha256(t.encode('utf-8')).digest()[:8], 'little') for t in texts],
+        dtype=np.uint64,
+    )
+    contador = np.arange(1, dims + 1, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        z = seeds[:, None] + contador[None, :] * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    vetores = (z >> np.uint64(40)).astype(np.float32) * np.float32(2.0 ** -23) - np.float32(1.0)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    return np.ascontiguousarray(vetores, dtype=np.float32)
+
+
+def _fallback_embedding(text: str) -> list:
+    return _fallback_embeddings([text])[0].tolist()
+
+
+def _embedding_model() -> str:
+    return getattr(settings, 'DEFAULT_EMBEDDING_MODEL', 'text-embedding-3-small')
+
+
+def _embed_lote(model: str, textos: List[str]):
+    """Uma requisição de embeddings para `textos`. Retorna (matriz, veio_da_api)."""
+    try:
+        if not client:
+            raise RuntimeError("Cliente OpenAI não inicializado")
+        with _llm_slots:
+            resp = client.embeddings.create(model=model, input=textos)
+        dados = sorted(resp.data, key=lambda d: d.index)
+        return np.asarray([d.embedding for d in dados], dtype=np.float32), True
+    except Exception:
+        return _fallback_embeddings(textos), False
+
+
+def get_embeddings(texts: List[str], cache: bool = True) -> np.ndarray:
+    """Embeddings de vários textos como matriz float32 contígua (len(texts) x dim).
+
+    Textos já vistos vêm de `llm_cache.embedding_cache` (chave: modelo + hash do
+    texto); os demais são deduplicados e enviados em lotes de
+    `EMBEDDING_BATCH_SIZE` por requisição. Vetores de fallback não são cacheados.
+    """
+    model = _embedding_model()
+    usar_cache = cache and settings.LLM_CACHE_ENABLED
+    linhas = [None] * len(texts)
+    faltando = {}
+    for i, texto in enumerate(texts):
+        blob = embedding_cache.get(cache_key("emb", model, texto)) if usar_cache else None
+        if blob is not None:
+            linhas[i] = np.frombuffer(blob, dtype=np.float32)
+        else:
+            faltando.setdefault(texto, []).append(i)
+
+    unicos = list(faltando)
+    lote_max = max(1, settings.EMBEDDING_BATCH_SIZE)
+    for inicio in range(0, len(unicos), lote_max):
+        lote = unicos[inicio:inicio + lote_max]
+        vetores, da_api = _embed_lote(model, lote)
+        for texto, vetor in zip(lote, vetores):
+            for i in faltando[texto]:
+                linhas[i] = vetor
+            if usar_cache and da_api:
+                embedding_cache.set(cache_key("emb", model, texto), vetor.tobytes())
+
+    if not linhas:
+        return np.empty((0, settings.DEFAULT_EMBEDDING_DIM), dtype=np.float32)
+    return np.ascontiguousarray(np.vstack(linhas), dtype=np.float32)
+
+
 def get_embedding(text: str) -> list:
     """Retorna embedding para `text`. Usa OpenAI Embeddings quando disponível; senão retorna vetor aleatório."""
+    return get_embeddings([text])[0].tolist()
+
+
+async def aget_embedding(text: str) -> list:
+    """Versão assíncrona de `get_embedding` (mesmo cache, acessado fora do event loop)."""
+    model = _embedding_model()
+    key = cache_key("emb", model, text)
+    usar_cache = settings.LLM_CACHE_ENABLED
+    blob = await asyncio.to_thread(embedding_cache.get, key) if usar_cache else None
+    if blob is not None:
+        return np.frombuffer(blob, dtype=np.float32).tolist()
     try:
-        _ensure_api_key()
-        if not openai:
-            raise RuntimeError("Biblioteca openai não encontrada")
-        model = getattr(settings, 'DEFAULT_EMBEDDING_MODEL', 'text-embedding-3-small')
-        resp = openai.Embedding.create(model=model, input=text)
-        # A resposta pode variar de formato; compatibilizar com list de floats
-        emb = resp.data[0].embedding
-        return emb
+        if not async_client:
+            raise RuntimeError("Cliente OpenAI assíncrono não inicializado")
+        async with _aslots():
+            resp = await async_client.embeddings.create(model=model, input=text)
+        vetor = np.asarray(resp.data[0].embedding, dtype=np.float32)
     except Exception:
-        # fallback: vetor aleatório determinístico (hash) para estabilidade
-        import hashlib
-        import struct
-        h = hashlib.sha256(text.encode('utf-8')).digest()
-        # gerar vetor de floats a partir do hash repetido
-        dims = getattr(settings, 'DEFAULT_EMBEDDING_DIM', 1536)
-        vals = []
-        while len(vals) < dims:
-            for i in range(0, len(h), 4):
-                if len(vals) >= dims:
-                    break
-                chunk = h[i:i+4]
-                if len(chunk) < 4:
-                    chunk = chunk.ljust(4, b"\0")
-                vals.append(struct.unpack("!f", chunk)[0])
-            h = hashlib.sha256(h).digest()
-        return vals[:dims]
+        return _fallback_embedding(text)
+    if usar_cache:
+        await asyncio.to_thread(embedding_cache.set, key, vetor.tobytes())
+    return vetor.tolist()
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+from maestroia.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, DEAD = "pending", "running", "done", "dead"
+
+
+class PublishError(RuntimeError):
+    """Falha de publicação que vale uma nova tentativa."""
+
+
+def idempotency_key(campaign_id: Optional[str], canal: str, conteudo: str, nonce: Optional[str] = None) -> str:
+    """Chave da publicação: a mesma campanha, canal e conteúdo nunca são publicados duas vezes.
+
+    Sem `campaign_id` não há como reconhecer uma reexecução, então a chave
+    leva um `nonce` da execução (aleatório se não for informado): o mesmo
+    briefing rodado de novo, com o mesmo texto vindo do cache, é publicado.
+    """
+    if campaign_id is None:
+        nonce = nonce or uuid.uuid4().hex
+    dados = f"{campaign_id or ''}\x00{nonce or ''}\x00{canal.lower()}\x00{conteudo}"
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+
+class PublicationOutbox:
+    """Fila de publicações em SQLite (padrão outbox).
+
+    `enqueue` grava (campaign_id, canal, conteúdo, chave de idempotência) e
+    retorna na hora; uma chave repetida é ignorada. Workers pegam itens com
+    `claim` (um UPDATE atômico, seguro entre threads e processos), e os
+    concluem com `complete` ou `fail`. Falhas são retentadas com backoff
+    exponencial até `max_attempts` e depois vão para a fila morta (`dead`).
+    Um item `running` cujo worker morreu volta para a fila quando o lease
+    expira.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, base_delay: float = 30.0,
+                 max_delay: float = 3600.0, lease: float = 120.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self._conn = None
+        self._lock = threading.Lock()
+        self.novos = threading.Event()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY, idempotency_key TEXT NOT NULL UNIQUE, campaign_id TEXT, "
+                "channel TEXT NOT NULL, content TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+                "next_attempt_at REAL NOT NULL, locked_until REAL, result TEXT, last_error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_fila ON outbox(status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_campanha ON outbox(campaign_id)")
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, campaign_id: Optional[str], canal: str, conteudo: str, key: Optional[str] = None,
+                nonce: Optional[str] = None) -> Tuple[str, bool]:
+        """Agenda a publicação; retorna (chave, inserida). Chave já existente não é inserida de novo."""
+        key = key or idempotency_key(campaign_id, canal, conteudo, nonce)
+        agora = time.time()
+        with self._lock:
+            inserida = self._db().execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, campaign_id, channel, content, status, attempts, "
+                "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (key, campaign_id, canal, conteudo, PENDING, agora, agora, agora),
+            ).rowcount == 1
+        if inserida:
+            self.novos.set()
+        return key, inserida
+
+    def claim(self) -> Optional[dict]:
+        """Reserva o próximo item vencido (ou com lease expirado) para este worker.
+
+        O item traz `lease` (o `locked_until` gravado); passe-o a `complete`/`fail`
+        para que um worker cujo lease expirou não sobrescreva a nova tentativa.
+        """
+        agora = time.time()
+        with self._lock:
+            linha = self._db().execute(
+                "UPDATE outbox SET status = ?, locked_until = ?, updated_at = ? WHERE id = ("
+                "SELECT id FROM outbox WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND locked_until < ?) "
+                "ORDER BY next_attempt_at LIMIT 1) "
+                "RETURNING id, idempotency_key, campaign_id, channel, content, attempts, locked_until",
+                (RUNNING, agora + self.lease, agora, PENDING, agora, RUNNING, agora),
+            ).fetchone()
+        if linha is None:
+            return None
+        campos = ("id", "idempotency_key", "campaign_id", "channel", "content", "attempts", "lease")
+        return dict(zip(campos, linha))
+
+    @staticmethod
+    def _do_lease(lease: Optional[float]) -> Tuple[str, tuple]:
+        if lease is None:
+            return "", ()
+        return " AND status = ? AND locked_until = ?", (RUNNING, lease)
+
+    def complete(self, item_id: int, resultado: str, lease: Optional[float] = None) -> bool:
+        """Marca como publicado; False se o `lease` já não é deste worker (nada muda)."""
+        filtro, valores = self._do_lease(lease)
+        with self._lock:
+            return self._db().execute(
+                "UPDATE outbox SET status = ?, result = ?, attempts = attempts + 1, locked_until = NULL, "
+                "updated_at = ? WHERE id = ?" + filtro,
+                (DONE, resultado, time.time(), item_id, *valores),
+            ).rowcount == 1
+
+    def fail(self, item_id: int, erro: str, tentativas: int, lease: Optional[float] = None) -> Optional[str]:
+        """Registra a falha; retorna o novo status (`pending` com backoff ou `dead`).
+
+        Retorna None se o `lease` já não é deste worker (nada muda).
+        """
+        tentativas += 1
+        agora = time.time()
+        if tentativas >= self.max_attempts:
+            status, proxima = DEAD, agora
+        else:
+            atraso = min(self.max_delay, self.base_delay * 2 ** (tentativas - 1))
+            status, proxima = PENDING, agora + atraso * random.uniform(0.9, 1.1)
+        filtro, valores = self._do_lease(lease)
+        with self._lock:
+            alterados = self._db().execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "locked_until = NULL, updated_at = ? WHERE id = ?" + filtro,
+                (status, tentativas, proxima, erro, agora, item_id, *valores),
+            ).rowcount
+        return status if alterados else None
+
+    def requeue(self, key: str) -> bool:
+        """Devolve um item da fila morta para a fila (ex.: depois de corrigir o token)."""
+        agora = time.time()
+        with self._lock:
+            alterados = self._db().execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? "
+                "WHERE idempotency_key = ? AND status = ?",
+                (PENDING, agora, agora, key, DEAD),
+            ).rowcount
+        self.novos.set()
+        return bool(alterados)
+
+    def _linhas(self, where: str, valores: tuple) -> List[dict]:
+        campos = ("idempotency_key", "campaign_id", "channel", "status", "attempts", "result", "last_error", "updated_at")
+        with self._lock:
+            linhas = self._db().execute(f"SELECT {', '.join(campos)} FROM outbox WHERE {where} ORDER BY id", valores).fetchall()
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def by_campaign(self, campaign_id: str) -> List[dict]:
+        return self._linhas("campaign_id = ?", (campaign_id,))
+
+    def dead_letters(self) -> List[dict]:
+        return self._linhas("status = ?", (DEAD,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            linhas = self._db().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {PENDING: 0, RUNNING: 0, DONE: 0, DEAD: 0, **dict(linhas)}
+
+
+class OutboxWorker:
+    """Threads que esvaziam a outbox chamando `publicar(canal, conteudo)`.
+
+    `publicar` retorna o status da publicação ou levanta `PublishError` (ou
+    qualquer exceção) para uma nova tentativa. As threads são daemon: um
+    processo de vida curta (CLI) deve chamar `drain` antes de sair.
+    """
+
+    def __init__(self, outbox: PublicationOutbox, publicar: Callable[[str, str], str],
+                 workers: int = 4, poll: float = 1.0):
+        self.outbox = outbox
+        self.publicar = publicar
+        self.workers = max(1, workers)
+        self.poll = poll
+        self._parar = threading.Event()
+        self._drenar = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def run_once(self) -> bool:
+        """Processa um item; False se a fila não tinha nada vencido."""
+        item = self.outbox.claim()
+        if item is None:
+            return False
+        try:
+            resultado = self.publicar(item["channel"], item["content"])
+        except Exception as e:
+            status = self.outbox.fail(item["id"], str(e), item["attempts"], item["lease"])
+            if status == DEAD:
+                logger.warning("Publicação %s em %s foi para a fila morta: %s", item["idempotency_key"], item["channel"], e)
+        else:
+            if not self.outbox.complete(item["id"], resultado, item["lease"]):
+                # O lease expirou durante a publicação e outro worker já pegou o item
+                logger.warning("Lease de %s expirou antes da conclusão; resultado descartado", item["idempotency_key"])
+        return True
+
+    def _loop(self):
+        while not self._parar.is_set():
+            if not self.run_once():
+                if self._drenar.is_set():
+                    return
+                self.outbox.novos.wait(self.poll)
+                self.outbox.novos.clear()
+
+    def start(self):
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._parar.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f"outbox-{i}", daemon=True) for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._parar.set()
+        self.outbox.novos.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def drain(self, timeout: Optional[float] = None) -> dict:
+        """Publica tudo o que já venceu, encerra os workers e retorna `outbox.stats()`.
+
+        Itens em backoff continuam `pending` para o próximo worker (ex.: a API).
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        self._drenar.set()
+        try:
+            self.start()
+            self.outbox.novos.set()
+            for t in self._threads:
+                t.join(None if limite is None else max(0.0, limite - time.monotonic()))
+            if any(t.is_alive() for t in self._threads):
+                logger.warning("Outbox não esvaziou em %ss; itens em andamento voltam após o lease", timeout)
+            self.stop(0)
+        finally:
+            self._drenar.clear()
+        return self.outbox.stats()
+
+
+def _publicar(canal: str, conteudo: str) -> str:
+    from maestroia.agents.publicador import publicar_canal, publicacao_falhou
+
+    resultado = publicar_canal(canal, conteudo)
+    if publicacao_falhou(resultado):
+        raise PublishError(resultado)
+    return resultado
+
+
+publication_outbox = PublicationOutbox(
+    settings.PUBLISH_OUTBOX_PATH,
+    max_attempts=settings.PUBLISH_MAX_ATTEMPTS,
+    base_delay=settings.PUBLISH_RETRY_BASE_SECONDS,
+    lease=settings.PUBLISH_LEASE_SECONDS,
+)
+outbox_worker = OutboxWorker(publication_outbox, _publicar, workers=settings.PUBLISH_OUTBOX_WORKERS)
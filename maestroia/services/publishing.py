@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from maestroia.config import settings
+from maestroia.services.rate_limit import TokenBucket
+
+# Nome do canal (como vem da UI/estado) -> plataforma que limita as publicações
+PLATAFORMAS = {
+    "facebook": "facebook",
+    "instagram": "instagram",
+    "google ads": "google_ads",
+    "twitter": "twitter",
+    "twitter/x": "twitter",
+    "linkedin": "linkedin",
+    "tiktok": "tiktok",
+    "youtube": "youtube",
+    "pinterest": "pinterest",
+    "snapchat": "snapchat",
+}
+
+
+class TimeoutSession(requests.Session):
+    """`requests.Session` com timeout (conexão, leitura) padrão em toda requisição."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def _nova_sessao() -> TimeoutSession:
+    sessao = TimeoutSession((settings.PUBLISH_CONNECT_TIMEOUT, settings.PUBLISH_READ_TIMEOUT))
+    adaptador = HTTPAdapter(pool_connections=16, pool_maxsize=settings.PUBLISH_MAX_WORKERS)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+_lock = threading.Lock()
+_sessao: Optional[TimeoutSession] = None
+_twitter = None
+_limites: Dict[str, TokenBucket] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def http_session() -> TimeoutSession:
+    """Sessão HTTP compartilhada por todas as campanhas (pool de conexões keep-alive)."""
+    global _sessao
+    with _lock:
+        if _sessao is None:
+            _sessao = _nova_sessao()
+        return _sessao
+
+
+def twitter_client():
+    """`tweepy.Client` criado uma vez, usando a sessão compartilhada (com timeouts)."""
+    global _twitter
+    with _lock:
+        if _twitter is None:
+            import tweepy
+
+            _twitter = tweepy.Client(
+                consumer_key=settings.TWITTER_API_KEY,
+                consumer_secret=settings.TWITTER_API_SECRET,
+                access_token=settings.TWITTER_ACCESS_TOKEN,
+                access_token_secret=settings.TWITTER_ACCESS_TOKEN_SECRET,
+            )
+            _twitter.session = _nova_sessao()
+        return _twitter
+
+
+def plataforma(canal: str) -> str:
+    return PLATAFORMAS.get(canal.lower(), canal.lower())
+
+
+def limiter(nome: str) -> TokenBucket:
+    """Token bucket da plataforma: `PUBLISH_RATE_PER_MINUTE[nome]` publicações por minuto."""
+    with _lock:
+        bucket = _limites.get(nome)
+        if bucket is None:
+            por_minuto = settings.PUBLISH_RATE_PER_MINUTE.get(nome, settings.PUBLISH_DEFAULT_RATE_PER_MINUTE)
+            bucket = TokenBucket(por_minuto / 60.0, settings.PUBLISH_BURST)
+            _limites[nome] = bucket
+        return bucket
+
+
+def executor() -> ThreadPoolExecutor:
+    """Pool de threads compartilhado para publicar em vários canais ao mesmo tempo."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.PUBLISH_MAX_WORKERS, thread_name_prefix="publicador")
+        return _executor
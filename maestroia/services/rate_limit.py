@@ -0,0 +1,51 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Limitador token bucket seguro entre threads.
+
+    `rate` fichas por segundo, acumulando no máximo `capacity` (rajada).
+    `acquire()` espera até haver ficha (ou até `timeout`, retornando False).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._fichas = self.capacity
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora: float):
+        self._fichas = min(self.capacity, self._fichas + (agora - self._atualizado) * self.rate)
+        self._atualizado = agora
+
+    def try_acquire(self, n: float = 1.0) -> bool:
+        with self._lock:
+            self._repor(time.monotonic())
+            if self._fichas >= n:
+                self._fichas -= n
+                return True
+            return False
+
+    def acquire(self, n: float = 1.0, timeout: Optional[float] = None) -> bool:
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._repor(agora)
+                if self._fichas >= n:
+                    self._fichas -= n
+                    return True
+                espera = (n - self._fichas) / self.rate if self.rate > 0 else float("inf")
+            if limite is not None:
+                if agora + espera > limite:
+                    return False
+            time.sleep(min(espera, 1.0))
+
+    def drain(self):
+        """Zera as fichas (ex.: depois de um 429, para esfriar antes da próxima chamada)."""
+        with self._lock:
+            self._fichas = 0.0
+            self._atualizado = time.monotonic()
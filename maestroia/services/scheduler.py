@@ -0,0 +1,280 @@
+import heapq
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from maestroia.config import settings
+from maestroia.services.outbox import publication_outbox, outbox_worker
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED, DISPATCHING, DISPATCHED, FAILED, CANCELLED = "scheduled", "dispatching", "dispatched", "failed", "cancelled"
+
+
+def _entregar(posts: List[dict]) -> Dict[int, str]:
+    """Entrega posts vencidos ao publicador; retorna {id: erro} dos que falharam.
+
+    Na outbox a chave usa o id do agendamento e as retentativas ficam com ela.
+    """
+    if settings.PUBLISH_OUTBOX_ENABLED:
+        for post in posts:
+            publication_outbox.enqueue(f"agendado:{post['id']}", post["channel"], post["content"])
+        outbox_worker.start()
+        return {}
+    from maestroia.agents.publicador import executor, publicacao_falhou, publicar_canal
+
+    # Um futuro por post (não por canal): dois posts no mesmo canal não se sobrescrevem
+    futuros = {post["id"]: executor().submit(publicar_canal, post["channel"], post["content"]) for post in posts}
+    falhas = {}
+    for post_id, futuro in futuros.items():
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            resultado = f"Erro ao publicar: {e}"
+        if publicacao_falhou(resultado):
+            falhas[post_id] = resultado
+    return falhas
+
+
+class PostScheduler:
+    """Agendador de posts persistente: tabela SQLite + min-heap em memória por janela.
+
+    Os agendamentos ficam em `scheduled_posts` (índice em status + due_at), então
+    sobrevivem a reinícios. Só os que vencem na próxima `window` segundos são
+    carregados no heap (uma leitura por faixa do índice, nunca a tabela toda),
+    e a janela é recarregada a cada `refresh` segundos para ver agendamentos
+    feitos por outros processos. Os vencidos saem em lotes de até `batch`:
+    cada lote é reservado com um UPDATE atômico (`dispatching`, com lease),
+    então dois despachantes (API e Streamlit) nunca entregam o mesmo post.
+    `deliver(posts)` retorna {id: erro} dos que falharam; esses voltam a
+    `scheduled` com backoff até `max_attempts` e depois ficam `failed`. Uma
+    queda no meio reentrega o lote quando o lease expira, e a chave de
+    idempotência da outbox evita duplicar.
+    """
+
+    def __init__(self, path: str, deliver: Callable[[List[dict]], Optional[Dict[int, str]]] = _entregar,
+                 window: float = 3600.0, refresh: float = 30.0, batch: int = 100,
+                 max_attempts: int = 5, retry_delay: float = 30.0, lease: float = 300.0):
+        self.path = path
+        self.deliver = deliver
+        self.window = window
+        self.refresh = refresh
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._no_heap = set()
+        self._fim_janela = 0.0
+        self._carregado_em = 0.0
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scheduled_posts ("
+                "id INTEGER PRIMARY KEY, user_id TEXT, channel TEXT NOT NULL, content TEXT NOT NULL, "
+                "due_at REAL NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL, dispatched_at REAL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, claimed_until REAL, last_error TEXT)"
+            )
+            # Bancos criados antes da reserva atômica
+            colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(scheduled_posts)")}
+            for coluna, tipo in (("attempts", "INTEGER NOT NULL DEFAULT 0"), ("claimed_until", "REAL"),
+                                 ("last_error", "TEXT")):
+                if coluna not in colunas:
+                    conn.execute(f"ALTER TABLE scheduled_posts ADD COLUMN {coluna} {tipo}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_due ON scheduled_posts(status, due_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_user ON scheduled_posts(user_id, due_at)")
+            self._conn = conn
+        return self._conn
+
+    def _executar(self, sql: str, valores=()) -> sqlite3.Cursor:
+        with self._db_lock:
+            return self._db().execute(sql, valores)
+
+    def _empilhar(self, post_id: int, due_at: float):
+        if post_id not in self._no_heap:
+            heapq.heappush(self._heap, (due_at, post_id))
+            self._no_heap.add(post_id)
+
+    def _carregar_janela(self, agora: float):
+        """Recarrega no heap os agendamentos que vencem até `agora + window`
+        (e os reservados por um despachante cujo lease expirou)."""
+        fim = agora + self.window
+        linhas = self._executar(
+            "SELECT id, due_at FROM scheduled_posts WHERE (status = ? AND due_at < ?) "
+            "OR (status = ? AND claimed_until < ?) ORDER BY due_at",
+            (SCHEDULED, fim, DISPATCHING, agora),
+        ).fetchall()
+        with self._cond:
+            for post_id, due_at in linhas:
+                self._empilhar(post_id, due_at)
+            self._fim_janela = fim
+            self._carregado_em = agora
+
+    def schedule(self, channel: str, content: str, due_at: float, user_id: Optional[str] = None) -> int:
+        """Agenda `content` em `channel` para o timestamp `due_at`; retorna o id."""
+        agora = time.time()
+        cursor = self._executar(
+            "INSERT INTO scheduled_posts (user_id, channel, content, due_at, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, channel, content, due_at, SCHEDULED, agora),
+        )
+        with self._cond:
+            if due_at < self._fim_janela:
+                self._empilhar(cursor.lastrowid, due_at)
+                self._cond.notify()
+        return cursor.lastrowid
+
+    def cancel(self, post_id: int) -> bool:
+        # Fica no heap até vencer; o despacho só pega quem ainda está `scheduled`
+        return bool(self._executar(
+            "UPDATE scheduled_posts SET status = ? WHERE id = ? AND status = ?", (CANCELLED, post_id, SCHEDULED)
+        ).rowcount)
+
+    def _reservar(self, ids: List[int], agora: float) -> List[dict]:
+        """Passa para `dispatching` os `ids` ainda livres; retorna só os reservados aqui."""
+        marcadores = ",".join("?" * len(ids))
+        campos = ("id", "user_id", "channel", "content", "due_at", "attempts")
+        linhas = self._executar(
+            f"UPDATE scheduled_posts SET status = ?, claimed_until = ? WHERE id IN ({marcadores}) "
+            f"AND (status = ? OR (status = ? AND claimed_until < ?)) RETURNING {', '.join(campos)}",
+            (DISPATCHING, agora + self.lease, *ids, SCHEDULED, DISPATCHING, agora),
+        ).fetchall()
+        return sorted((dict(zip(campos, linha)) for linha in linhas), key=lambda p: p["due_at"])
+
+    def _liberar(self, posts: List[dict]):
+        """Devolve uma reserva a `scheduled` sem contar tentativa (a entrega nem rodou)."""
+        ids = [p["id"] for p in posts]
+        self._executar(
+            f"UPDATE scheduled_posts SET status = ?, claimed_until = NULL WHERE id IN ({','.join('?' * len(ids))}) "
+            "AND status = ?",
+            (SCHEDULED, *ids, DISPATCHING),
+        )
+
+    def _falhou(self, post: dict, erro: str, agora: float):
+        tentativas = post["attempts"] + 1
+        if tentativas >= self.max_attempts:
+            logger.warning("Post agendado %s em %s falhou %d vezes: %s", post["id"], post["channel"], tentativas, erro)
+            status, due_at = FAILED, post["due_at"]
+        else:
+            atraso = self.retry_delay * 2 ** (tentativas - 1) * random.uniform(0.9, 1.1)
+            status, due_at = SCHEDULED, agora + atraso
+        self._executar(
+            "UPDATE scheduled_posts SET status = ?, due_at = ?, attempts = ?, last_error = ?, claimed_until = NULL "
+            "WHERE id = ? AND status = ?",
+            (status, due_at, tentativas, erro, post["id"], DISPATCHING),
+        )
+        if status == SCHEDULED:
+            with self._cond:
+                if due_at < self._fim_janela:
+                    self._empilhar(post["id"], due_at)
+
+    def run_due(self, agora: Optional[float] = None) -> int:
+        """Entrega os posts vencidos em lotes de `batch`; retorna quantos foram despachados."""
+        agora = time.time() if agora is None else agora
+        if agora >= self._fim_janela or agora - self._carregado_em >= self.refresh:
+            self._carregar_janela(agora)
+        total = 0
+        while True:
+            with self._cond:
+                ids = []
+                while self._heap and self._heap[0][0] <= agora and len(ids) < self.batch:
+                    _, post_id = heapq.heappop(self._heap)
+                    self._no_heap.discard(post_id)
+                    ids.append(post_id)
+            if not ids:
+                return total
+            posts = self._reservar(ids, agora)
+            if not posts:
+                continue
+            try:
+                falhas = self.deliver(posts) or {}
+            except Exception:
+                self._liberar(posts)
+                raise
+            entregues = [p["id"] for p in posts if p["id"] not in falhas]
+            if entregues:
+                self._executar(
+                    f"UPDATE scheduled_posts SET status = ?, dispatched_at = ?, claimed_until = NULL "
+                    f"WHERE id IN ({','.join('?' * len(entregues))}) AND status = ?",
+                    (DISPATCHED, time.time(), *entregues, DISPATCHING),
+                )
+            for post in posts:
+                if post["id"] in falhas:
+                    self._falhou(post, falhas[post["id"]], agora)
+            total += len(entregues)
+
+    def _proximo(self) -> float:
+        with self._cond:
+            proximo = self._heap[0][0] if self._heap else float("inf")
+        return min(proximo, self._fim_janela, self._carregado_em + self.refresh)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._parar:
+                    return
+            try:
+                self.run_due()
+            except Exception as e:
+                # O lote volta a `scheduled` no banco e ao heap na próxima recarga da janela
+                logger.warning("Falha ao despachar posts agendados: %s", e)
+            with self._cond:
+                if not self._parar:
+                    self._cond.wait(max(0.05, min(self.refresh, self._proximo() - time.time())))
+
+    def start(self):
+        """Despacha os vencidos em uma thread em segundo plano (idempotente)."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar = False
+            self._thread = threading.Thread(target=self._loop, name="post-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pending(self, user_id: Optional[str] = None, limit: int = 50) -> List[dict]:
+        """Próximos agendamentos (de um usuário, se informado)."""
+        campos = ("id", "user_id", "channel", "content", "due_at")
+        where, valores = "status = ?", [SCHEDULED]
+        if user_id is not None:
+            where += " AND user_id = ?"
+            valores.append(user_id)
+        linhas = self._executar(
+            f"SELECT {', '.join(campos)} FROM scheduled_posts WHERE {where} ORDER BY due_at LIMIT ?", (*valores, limit)
+        ).fetchall()
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def stats(self) -> dict:
+        linhas = self._executar("SELECT status, COUNT(*) FROM scheduled_posts GROUP BY status").fetchall()
+        with self._cond:
+            no_heap = len(self._heap)
+        contagem = {s: 0 for s in (SCHEDULED, DISPATCHING, DISPATCHED, FAILED, CANCELLED)}
+        return {**contagem, **dict(linhas), "in_memory": no_heap}
+
+
+post_scheduler = PostScheduler(
+    settings.SCHEDULER_DB_PATH,
+    window=settings.SCHEDULER_WINDOW_SECONDS,
+    refresh=settings.SCHEDULER_REFRESH_SECONDS,
+    batch=settings.SCHEDULER_BATCH_SIZE,
+    max_attempts=settings.PUBLISH_MAX_ATTEMPTS,
+    retry_delay=settings.PUBLISH_RETRY_BASE_SECONDS,
+    lease=settings.PUBLISH_LEASE_SECONDS,
+)
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from maestroia.config import settings
+from maestroia.services.trends_service import TrendsClient, TrendsUnavailable, trend_keywords, trends_client
+
+logger = logging.getLogger(__name__)
+
+
+def popular_niches(limite: int = 20, sessao=None) -> List[Tuple[str, str]]:
+    """Pares (objetivo, público-alvo) mais frequentes na tabela `campaigns`.
+
+    `sessao` é a fábrica de sessões (padrão: `SessionLocal`).
+    """
+    from maestroia.core.database import SessionLocal, Campaign
+
+    db = (sessao or SessionLocal)()
+    try:
+        linhas = (
+            db.query(Campaign.objetivo, Campaign.publico_alvo, func.count(Campaign.id).label("total"))
+            .filter(Campaign.objetivo.isnot(None))
+            .group_by(Campaign.objetivo, Campaign.publico_alvo)
+            .order_by(func.count(Campaign.id).desc())
+            .limit(limite)
+            .all()
+        )
+    finally:
+        db.close()
+    return [(objetivo, publico or "") for objetivo, publico, _ in linhas]
+
+
+class TrendsPrewarmer:
+    """Mantém aquecido o cache do Google Trends para os nichos mais comuns.
+
+    A cada `intervalo` segundos busca os `top` pares objetivo/público das
+    campanhas salvas e atualiza, com os mesmos termos que o pesquisador usa
+    (`trend_keywords`), os dados que venceriam antes da próxima rodada. As
+    chamadas passam pelo limite de requisições do `TrendsClient`.
+    `status()` mostra a última atualização de cada nicho.
+    """
+
+    def __init__(self, client: TrendsClient, intervalo: float = 3600, top: int = 20, fonte=popular_niches):
+        self.client = client
+        self.intervalo = intervalo
+        self.top = top
+        self.fonte = fonte
+        self._status: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[float] = None
+
+    def run_once(self) -> Dict[str, dict]:
+        """Uma rodada de aquecimento; retorna o status dos nichos atualizados."""
+        # Dados que vencem antes da próxima rodada são buscados de novo agora
+        max_age = max(0.0, self.client.ttl - self.intervalo)
+        for objetivo, publico in self.fonte(self.top):
+            if self._parar.is_set():
+                break
+            keywords = trend_keywords(objetivo, publico)
+            if not keywords:
+                continue
+            item = {"objetivo": objetivo, "publico_alvo": publico, "keywords": keywords}
+            try:
+                _, coletado_em = self.client.interest_over_time_many(keywords, max_age=max_age)
+                item.update(refreshed_at=coletado_em, error=None)
+            except TrendsUnavailable as e:
+                anterior = self._status.get(" | ".join(keywords), {})
+                item.update(refreshed_at=anterior.get("refreshed_at"), error=str(e))
+            with self._lock:
+                self._status[" | ".join(keywords)] = item
+        self.last_run = time.time()
+        return self.status()["niches"]
+
+    def status(self) -> dict:
+        with self._lock:
+            nichos = {chave: dict(item) for chave, item in self._status.items()}
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "last_run": self.last_run,
+            "niches": nichos,
+        }
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # Banco indisponível etc.: tenta de novo na próxima rodada
+                logger.warning("Aquecimento do Google Trends falhou: %s", e)
+            self._parar.wait(self.intervalo)
+
+    def start(self):
+        """Roda `run_once` a cada `intervalo` segundos em uma thread em segundo plano."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="trends-prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+trends_prewarmer = TrendsPrewarmer(
+    trends_client,
+    intervalo=settings.TRENDS_PREWARM_INTERVAL_SECONDS,
+    top=settings.TRENDS_PREWARM_TOP,
+)
@@ -1,35 +1,271 @@
-from typing import List
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from typing import List, Optional, Tuple
+import numpy as np
+from maestroia.config import settings
+from maestroia.services.llm_cache import ResponseCache, cache_key
+from maestroia.services.rate_limit import TokenBucket
+
+
+# O Google Trends aceita no máximo 5 termos por payload e os normaliza entre si (0–100)
+MAX_KEYWORDS_PER_PAYLOAD = 5
+
+_STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas", "um", "uma",
+    "para", "por", "com", "sem", "que", "se", "ao", "aos", "à", "às", "mais", "menos", "entre", "anos",
+    "meu", "minha", "seu", "sua", "seus", "suas", "nosso", "nossa", "como", "sobre", "até", "ou",
+    "aumentar", "vender", "vendas", "divulgar", "promover", "público", "geral", "marketing", "digital",
+}
+
+
+class TrendsUnavailable(RuntimeError):
+    """Google Trends fora do ar / limitado e sem dados em cache para a consulta."""
 
-def get_trends_summary(keywords: List[str], timeframe: str = "today 12-m", geo: str = "") -> str:
-    """Tenta buscar dados do Google Trends via pytrends; em falha retorna summary simulado.
 
-    Retorna um texto resumido pronto para inserção em prompts.
+class TrendsClient:
+    """Cliente do Google Trends com uma sessão pytrends reaproveitada e cache em disco.
+
+    Resultados de `interest_over_time` ficam em um `ResponseCache` chaveado por
+    (keywords, timeframe, geo) e são considerados frescos por `ttl` segundos.
+    Chamadas ao Google passam por um token bucket; depois de um 429 o cliente
+    espera `cooldown` segundos antes de tentar de novo. Em erro ou limite, os
+    dados em cache vencidos (até `stale_ttl`) são servidos no lugar.
+
+    `interest_over_time_many` aceita qualquer número de termos: divide em
+    grupos de 5 com um termo âncora em comum, busca os grupos em paralelo
+    (`workers` threads, cada uma com sua sessão) e reescala tudo para uma
+    única escala 0–100 pela âncora.
     """
-    try:
-        from pytrends.request import TrendReq
 
-        pytrends = TrendReq()
-        pytrends.build_payload(keywords, cat=0, timeframe=timeframe, geo=geo, gprop='')
-        trends_data = pytrends.interest_over_time()
-        if trends_data is None or trends_data.empty:
-            raise RuntimeError("Dados do Google Trends vazios")
+    def __init__(self, cache: ResponseCache, bucket: TokenBucket, ttl: float = 6 * 3600,
+                 cooldown: float = 60.0, hl: str = "pt-BR", tz: int = 180, timeout: float = 10.0,
+                 workers: int = 2):
+        self.cache = cache
+        self.bucket = bucket
+        self.ttl = ttl
+        self.cooldown = cooldown
+        self.hl = hl
+        self.tz = tz
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        # TrendReq guarda o payload na instância: uma sessão por thread, reaproveitada
+        self._local = threading.local()
+        self._pausa_ate = 0.0
+
+    def _sessao(self):
+        pytrends = getattr(self._local, "pytrends", None)
+        if pytrends is None:
+            from pytrends.request import TrendReq
+
+            pytrends = TrendReq(hl=self.hl, tz=self.tz, timeout=(min(5.0, self.timeout), self.timeout))
+            self._local.pytrends = pytrends
+        return pytrends
+
+    @staticmethod
+    def _chave(keywords: List[str], timeframe: str, geo: str) -> str:
+        return cache_key("trends", timeframe, geo, json.dumps(list(keywords), ensure_ascii=False))
 
-        latest = trends_data.iloc[-1] if len(trends_data) > 0 else trends_data.iloc[0]
-        previous = trends_data.iloc[-2] if len(trends_data) > 1 else latest
+    def _do_cache(self, chave: str):
+        valor = self.cache.get(chave)
+        if valor is None:
+            return None
+        import pandas as pd
 
-        parts = []
-        for kw in keywords:
+        item = json.loads(valor)
+        return pd.read_json(StringIO(item["data"]), orient="split"), item["fetched_at"]
+
+    def _baixar(self, keywords: List[str], timeframe: str, geo: str):
+        pytrends = self._sessao()
+        pytrends.build_payload(list(keywords), cat=0, timeframe=timeframe, geo=geo, gprop="")
+        return pytrends.interest_over_time()
+
+    def interest_over_time(self, keywords: List[str], timeframe: str = "today 12-m", geo: str = "",
+                           max_age: Optional[float] = None) -> Tuple["pd.DataFrame", float]:
+        """(DataFrame do interest_over_time, timestamp da coleta).
+
+        Usa o cache enquanto tiver menos de `max_age` (padrão: `ttl`) segundos.
+        Levanta `TrendsUnavailable` se o Google falhar e não houver cache.
+        """
+        chave = self._chave(keywords, timeframe, geo)
+        em_cache = self._do_cache(chave)
+        max_age = self.ttl if max_age is None else max_age
+        if em_cache is not None and time.time() - em_cache[1] <= max_age:
+            return em_cache
+
+        try:
+            if time.time() < self._pausa_ate:
+                raise TrendsUnavailable("Google Trends limitou as requisições (429); aguardando")
+            if not self.bucket.acquire(timeout=self.timeout):
+                raise TrendsUnavailable("limite local de requisições ao Google Trends")
+            dados = self._baixar(keywords, timeframe, geo)
+        except Exception as e:
+            if _limitado(e):
+                self._pausa_ate = time.time() + self.cooldown
+                self.bucket.drain()
+            if em_cache is not None:
+                return em_cache
+            raise e if isinstance(e, TrendsUnavailable) else TrendsUnavailable(str(e)) from e
+
+        agora = time.time()
+        self.cache.set(chave, json.dumps({"fetched_at": agora, "data": dados.to_json(orient="split", date_format="iso")}))
+        return dados, agora
+
+    def interest_over_time_many(self, keywords: List[str], timeframe: str = "today 12-m", geo: str = "",
+                                anchor: Optional[str] = None,
+                                max_age: Optional[float] = None) -> Tuple["pd.DataFrame", float]:
+        """Interesse de qualquer número de termos em uma escala 0–100 comparável.
+
+        Até 5 termos vão em um único payload. Acima disso, cada grupo leva
+        `anchor` (padrão: o primeiro termo) e mais 4 termos; os grupos são
+        reescalados pela razão entre o interesse total da âncora no primeiro
+        grupo e no grupo. Retorna (DataFrame com uma coluna por termo, coleta
+        mais antiga entre os grupos). Grupos sem dados são omitidos.
+        """
+        import pandas as pd
+
+        keywords = list(dict.fromkeys(k for k in keywords if k))
+        if not keywords:
+            raise TrendsUnavailable("nenhum termo para consultar")
+        if len(keywords) <= MAX_KEYWORDS_PER_PAYLOAD:
+            dados, coletado_em = self.interest_over_time(keywords, timeframe, geo, max_age)
+            return dados.drop(columns="isPartial", errors="ignore"), coletado_em
+
+        anchor = anchor or keywords[0]
+        outros = [k for k in keywords if k != anchor]
+        passo = MAX_KEYWORDS_PER_PAYLOAD - 1
+        grupos = [[anchor, *outros[i:i + passo]] for i in range(0, len(outros), passo)]
+
+        def buscar(grupo):
             try:
-                cur = latest.get(kw, None)
-                prev = previous.get(kw, cur)
-                if cur is None:
-                    parts.append(f"'{kw}': sem dados recentes")
-                    continue
-                change = ((cur - prev) / prev * 100) if prev and prev != 0 else 0
-                parts.append(f"'{kw}': interesse {cur}/100, variação {change:.1f}%")
-            except Exception:
-                parts.append(f"'{kw}': erro ao processar dados")
-
-        return "Dados do Google Trends: " + "; ".join(parts)
-    except Exception as e:
-        return f"Dados simulados do Google Trends: interesse crescente em {', '.join(keywords)} (fallback). Erro: {e}"
+                return self.interest_over_time(grupo, timeframe, geo, max_age)
+            except TrendsUnavailable:
+                return None
+
+        with ThreadPoolExecutor(min(self.workers, len(grupos))) as pool:
+            resultados = [r for r in pool.map(buscar, grupos) if r is not None and not r[0].empty]
+        if not resultados:
+            raise TrendsUnavailable("nenhum grupo de termos retornou dados")
+
+        referencia = resultados[0][0][anchor].sum()
+        colunas = []
+        for dados, _ in resultados:
+            total = dados[anchor].sum()
+            # Âncora sem volume no grupo: não há como comparar, fica na escala original
+            fator = referencia / total if referencia > 0 and total > 0 else 1.0
+            colunas.append(dados.drop(columns="isPartial", errors="ignore").astype(float) * fator)
+        combinado = pd.concat(
+            [colunas[0][[anchor]], *(c.drop(columns=anchor) for c in colunas)], axis=1
+        )
+        maximo = combinado.to_numpy().max()
+        if maximo > 0:
+            combinado = combinado * (100.0 / maximo)
+        return combinado.round(1), min(c for _, c in resultados)
+
+
+def _limitado(erro: Exception) -> bool:
+    resposta = getattr(erro, "response", None)
+    return getattr(resposta, "status_code", None) == 429 or type(erro).__name__ == "TooManyRequestsError"
+
+
+trends_client = TrendsClient(
+    # O cache guarda por `TRENDS_STALE_SECONDS`; a idade para considerar fresco é `TRENDS_CACHE_TTL_SECONDS`
+    ResponseCache(settings.LLM_CACHE_PATH, table="trends_cache", ttl=settings.TRENDS_STALE_SECONDS, memory_entries=256),
+    TokenBucket(settings.TRENDS_RATE_PER_MINUTE / 60.0, settings.TRENDS_BURST),
+    ttl=settings.TRENDS_CACHE_TTL_SECONDS,
+    cooldown=settings.TRENDS_COOLDOWN_SECONDS,
+    hl=settings.TRENDS_HL,
+    tz=settings.TRENDS_TZ,
+    timeout=settings.TRENDS_TIMEOUT_SECONDS,
+    workers=settings.TRENDS_MAX_WORKERS,
+)
+
+
+def trend_keywords(*textos: str, limite: int = 8) -> List[str]:
+    """Termos curtos para o Google Trends a partir de textos livres (objetivo, público).
+
+    Frases inteiras quase nunca têm volume de buscas: textos com até 3 palavras
+    entram como estão; dos maiores ficam as palavras relevantes (sem stopwords).
+    """
+    termos = []
+    for texto in textos:
+        palavras = re.findall(r"[#\w][\w'-]*", (texto or "").lower())
+        if not palavras:
+            continue
+        if len(palavras) <= 3:
+            termos.append(" ".join(palavras))
+        termos.extend(p for p in palavras if p not in _STOPWORDS and len(p) > 2 and not p.isdigit())
+    return list(dict.fromkeys(termos))[:limite]
+
+
+def trend_stats(dados: "pd.DataFrame", janela: int = 4, inclinacao_pontos: int = 12) -> "pd.DataFrame":
+    """Estatísticas por termo (uma linha por coluna de `dados`), calculadas de uma vez.
+
+    - atual: último valor; media_movel: média das últimas `janela` coletas.
+    - variacao_mm: % da média móvel atual sobre a de `janela` períodos antes.
+    - inclinacao: tendência linear (pontos por período) nos últimos `inclinacao_pontos`.
+    - yoy: % do valor atual sobre o de ~1 ano antes (NaN se a série for mais curta).
+    """
+    import pandas as pd
+
+    valores = dados.astype(float)
+    movel = valores.rolling(janela, min_periods=1).mean()
+    anterior = movel.shift(janela).iloc[-1]
+    recorte = valores.iloc[-inclinacao_pontos:]
+    if len(recorte) > 1:
+        inclinacao = np.polyfit(np.arange(len(recorte)), recorte.to_numpy(), 1)[0]
+    else:
+        inclinacao = np.zeros(valores.shape[1])
+
+    yoy = pd.Series(np.nan, index=valores.columns)
+    if isinstance(valores.index, pd.DatetimeIndex) and valores.index[-1] - valores.index[0] >= pd.Timedelta(days=358):
+        posicao = valores.index.get_indexer([valores.index[-1] - pd.Timedelta(days=365)], method="nearest")[0]
+        ano_antes = valores.iloc[posicao]
+        yoy = (valores.iloc[-1] - ano_antes) / ano_antes.where(ano_antes != 0) * 100
+
+    return pd.DataFrame({
+        "atual": valores.iloc[-1],
+        "media_movel": movel.iloc[-1],
+        "variacao_mm": (movel.iloc[-1] - anterior) / anterior.where(anterior != 0) * 100,
+        "inclinacao": pd.Series(inclinacao, index=valores.columns),
+        "yoy": yoy,
+    })
+
+
+def get_trends_summary(keywords: List[str], timeframe: str = "today 12-m", geo: str = "") -> str:
+    """Resumo do Google Trends pronto para inserção em prompts.
+
+    Usa `trends_client` (cache + limite de requisições), com qualquer número de
+    termos na mesma escala 0–100. Se o Google falhar, usa os últimos dados em
+    cache, avisando a data da coleta; sem nenhum dado, diz que as tendências
+    estão indisponíveis em vez de inventar números.
+    """
+    try:
+        trends_data, coletado_em = trends_client.interest_over_time_many(keywords, timeframe=timeframe, geo=geo)
+    except TrendsUnavailable as e:
+        return f"Dados do Google Trends indisponíveis no momento ({e}); não cite números de tendência."
+    if trends_data is None or trends_data.empty:
+        return "Dados do Google Trends: sem volume de buscas suficiente para " + ", ".join(keywords)
+
+    estatisticas = trend_stats(trends_data)
+    parts = []
+    for kw in keywords:
+        if kw not in estatisticas.index:
+            parts.append(f"'{kw}': sem dados recentes")
+            continue
+        e = estatisticas.loc[kw]
+        texto = f"'{kw}': interesse {e.atual:.0f}/100 (média de 4 períodos {e.media_movel:.0f}"
+        if not np.isnan(e.variacao_mm):
+            texto += f", {e.variacao_mm:+.1f}%"
+        texto += f"), tendência {e.inclinacao:+.2f} pontos/período"
+        if not np.isnan(e.yoy):
+            texto += f", {e.yoy:+.1f}% em 1 ano"
+        parts.append(texto)
+
+    resumo = "Dados do Google Trends: " + "; ".join(parts)
+    if time.time() - coletado_em > trends_client.ttl:
+        resumo += f" (coletados em {time.strftime('%d/%m/%Y %H:%M', time.localtime(coletado_em))})"
+    return resumo
@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_llm_temporario(tmp_path, monkeypatch):
+    """Cada teste usa caches próprios em `tmp_path`, nunca o arquivo de `LLM_CACHE_PATH`."""
+    from maestroia.memory.semantic_cache import semantic_cache
+    from maestroia.services import llm_cache, openai_service
+    from maestroia.services.trends_service import trends_client
+
+    caminho = str(tmp_path / "llm_cache.db")
+    respostas = llm_cache.ResponseCache(caminho)
+    embeddings = llm_cache.ResponseCache(caminho, table="embedding_cache")
+    for modulo in (llm_cache, openai_service):
+        monkeypatch.setattr(modulo, "response_cache", respostas)
+        monkeypatch.setattr(modulo, "embedding_cache", embeddings)
+    # As tabelas de tendências e do cache semântico moram no mesmo arquivo
+    cache = trends_client.cache
+    monkeypatch.setattr(trends_client, "cache", llm_cache.ResponseCache(
+        caminho, table="trends_cache", ttl=cache.ttl, memory_entries=cache.memory_entries,
+    ))
+    monkeypatch.setattr(semantic_cache, "outputs", llm_cache.ResponseCache(
+        caminho, table="semantic_cache", ttl=semantic_cache.outputs.ttl,
+    ))
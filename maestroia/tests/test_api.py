@@ -0,0 +1,241 @@
+import json
+import unittest
+from unittest.mock import patch
+
+
+class TestCampaignStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        from maestroia.api import routes
+        from maestroia.core.auth import get_current_user
+
+        class Usuario:
+            id = 1
+            email = "teste@maestroia.com"
+
+        routes.app.dependency_overrides[get_current_user] = lambda: Usuario()
+        self.addCleanup(routes.app.dependency_overrides.clear)
+        self.salvos = []
+        p = patch.object(routes, "_salvar_campanha", lambda db, user_id, state, result: self.salvos.append(result))
+        p.start()
+        self.addCleanup(p.stop)
+        self.routes = routes
+        self.client = TestClient(routes.app)
+
+    def test_sse_emite_eventos_e_salva_resultado(self):
+        async def stream_falso(state, campaign_id=None):
+            yield {"type": "node", "node": "pesquisador", "update": {"pesquisa": "ok"}}
+            yield {"type": "done", "result": {"pesquisa": "ok"}}
+
+        with patch.object(self.routes, "astream_campaign", stream_falso):
+            resp = self.client.post("/campaign/run/stream", json={"objetivo": "Teste"})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("text/event-stream"))
+        blocos = [b for b in resp.text.split("\n\n") if b]
+        self.assertEqual(blocos[0].splitlines()[0], "event: node")
+        self.assertEqual(json.loads(blocos[1].splitlines()[1][len("data: "):])["result"], {"pesquisa": "ok"})
+        self.assertEqual(self.salvos, [{"pesquisa": "ok"}])
+
+    def test_sse_reporta_erro(self):
+        async def stream_com_erro(state, campaign_id=None):
+            raise RuntimeError("falhou")
+            yield
+
+        with patch.object(self.routes, "astream_campaign", stream_com_erro):
+            resp = self.client.post("/campaign/run/stream", json={"objetivo": "Teste"})
+
+        self.assertIn("event: error", resp.text)
+        self.assertIn("falhou", resp.text)
+
+
+class TestCampaignJobsEndpoint(unittest.TestCase):
+    def setUp(self):
+        import threading
+        from fastapi.testclient import TestClient
+        from maestroia.api import routes
+        from maestroia.core.auth import get_current_user
+        from maestroia.services.jobs import CampaignJobManager
+
+        class Usuario:
+            id = 1
+            email = "teste@maestroia.com"
+
+        self.usuario = Usuario
+        routes.app.dependency_overrides[get_current_user] = lambda: self.usuario()
+        self.addCleanup(routes.app.dependency_overrides.clear)
+        self.salvos = []
+        self.liberar = threading.Event()
+        self.iniciados = []
+
+        def campanha(state, thread_id):
+            self.iniciados.append(thread_id)
+            yield {"type": "node", "node": "pesquisador", "update": {"pesquisa": "ok", "conteudos": ["a"]}}
+            self.liberar.wait(5)
+            yield {"type": "node", "node": "criador_conteudo", "update": {"conteudos": ["b"]}}
+            yield {"type": "done", "result": {"pesquisa": "ok", "conteudos": ["a", "b"]}}
+
+        self.jobs = CampaignJobManager(workers=1, queue_size=1, run=campanha, on_done=routes._salvar_job)
+        self.addCleanup(self.jobs.stop, 2)
+        self.addCleanup(self.liberar.set)
+        p1 = patch.object(routes, "campaign_jobs", self.jobs)
+        p2 = patch.object(routes, "_salvar_campanha", lambda db, user_id, state, result: self.salvos.append(result))
+        for p in (p1, p2):
+            p.start()
+            self.addCleanup(p.stop)
+        self.client = TestClient(routes.app)
+
+    def _esperar(self, job_id, condicao):
+        import time
+
+        limite = time.time() + 5
+        while time.time() < limite:
+            corpo = self.client.get(f"/campaign/jobs/{job_id}").json()
+            if condicao(corpo):
+                return corpo
+            time.sleep(0.02)
+        self.fail(f"job não chegou ao estado esperado: {corpo}")
+
+    def test_job_devolve_id_na_hora_e_estado_parcial(self):
+        resp = self.client.post("/campaign/jobs", json={"objetivo": "Teste"})
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.json()["job_id"]
+
+        parcial = self._esperar(job_id, lambda c: c["nodes_done"] == 1)
+        self.assertEqual(parcial["status"], "running")
+        self.assertEqual(parcial["partial"], {"pesquisa": "ok", "conteudos": ["a"]})
+
+        self.liberar.set()
+        final = self._esperar(job_id, lambda c: c["status"] == "succeeded")
+        self.assertEqual(final["partial"]["conteudos"], ["a", "b"])
+        self.assertEqual(self.salvos, [{"pesquisa": "ok", "conteudos": ["a", "b"]}])
+        self.assertEqual(self.iniciados, [None])
+
+        eventos = self.client.get(f"/campaign/jobs/{job_id}/events", params={"since": 1}).text
+        blocos = [b for b in eventos.split("\n\n") if b]
+        self.assertEqual([b.splitlines()[:2] for b in blocos], [["id: 2", "event: node"], ["id: 3", "event: done"]])
+
+        # Reconexão com o último id de um job já terminado: encerra sem repetir nada
+        for since in (3, 10):
+            resp = self.client.get(f"/campaign/jobs/{job_id}/events", params={"since": since})
+            self.assertEqual(resp.text, "")
+
+        # Outro usuário não enxerga o job
+        self.usuario = type("Outro", (), {"id": 2, "email": "x@y.com"})
+        self.assertEqual(self.client.get(f"/campaign/jobs/{job_id}").status_code, 404)
+
+    def test_stream_acordado_pelo_worker_sem_thread_do_pool(self):
+        import asyncio
+        import threading
+        import time
+        from maestroia.services.jobs import CampaignJob
+
+        job = CampaignJob({}, 1)
+        threading.Timer(0.1, job._emitir, [{"type": "node", "node": "pesquisador", "update": {}}]).start()
+
+        async def esperar():
+            inicio = time.perf_counter()
+            novos = await job.events_since(0, 5.0)
+            return novos, time.perf_counter() - inicio, job._assinantes
+
+        novos, decorrido, assinantes = asyncio.run(esperar())
+        self.assertEqual([e["node"] for e in novos], ["pesquisador"])
+        self.assertLess(decorrido, 2.0)
+        self.assertEqual(assinantes, [])
+
+    def test_fila_cheia_429_e_cancelamento(self):
+        primeiro = self.client.post("/campaign/jobs", json={"objetivo": "A"}, params={"campaign_id": "c1"}).json()["job_id"]
+        self._esperar(primeiro, lambda c: c["status"] == "running")
+        # Retentativa do cliente com o mesmo campaign_id: mesmo job, sem nova execução
+        repetido = self.client.post("/campaign/jobs", json={"objetivo": "A"}, params={"campaign_id": "c1"})
+        self.assertEqual(repetido.json()["job_id"], primeiro)
+
+        na_fila = self.client.post("/campaign/jobs", json={"objetivo": "B"}).json()["job_id"]
+        cheia = self.client.post("/campaign/jobs", json={"objetivo": "C"})
+        self.assertEqual(cheia.status_code, 429)
+        self.assertIn("Retry-After", cheia.headers)
+
+        self.assertEqual(self.client.post(f"/campaign/jobs/{na_fila}/cancel").json()["status"], "cancelled")
+        self.assertTrue(self.client.post(f"/campaign/jobs/{primeiro}/cancel").json()["cancel_requested"])
+        self.liberar.set()
+        cancelado = self._esperar(primeiro, lambda c: c["status"] == "cancelled")
+        self.assertEqual(cancelado["nodes_done"], 1)
+        # Só o job com campaign_id usa checkpoint; o sem id roda sem thread persistida
+        self.assertEqual(self.iniciados, ["1:c1"])
+        self.assertEqual(self.salvos, [])
+
+
+class TestCampaignHistoryEndpoint(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        from fastapi.testclient import TestClient
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from maestroia.api import routes
+        from maestroia.core.auth import get_current_user
+        from maestroia.core.database import Base, Campaign, get_db
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp.name, 'teste.db')}")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+
+        db = Sessao()
+        for i in range(7):
+            db.add(Campaign(user_id=1, objetivo=f"obj {i}", publico_alvo="pub", canais="Instagram,LinkedIn",
+                            orcamento="100", resultado=json.dumps({"estrategia": f"e{i}"})))
+        db.add(Campaign(user_id=2, objetivo="de outro", canais="", resultado=None))
+        db.commit()
+        db.close()
+
+        class Usuario:
+            id = 1
+            email = "teste@maestroia.com"
+
+        def sessao():
+            s = Sessao()
+            try:
+                yield s
+            finally:
+                s.close()
+
+        routes.app.dependency_overrides[get_current_user] = lambda: Usuario()
+        routes.app.dependency_overrides[get_db] = sessao
+        self.addCleanup(routes.app.dependency_overrides.clear)
+        p = patch.object(routes, "SessionLocal", Sessao)
+        p.start()
+        self.addCleanup(p.stop)
+        self.client = TestClient(routes.app)
+
+    def test_paginacao_por_cursor_sem_resultado(self):
+        pagina = self.client.get("/campaign/history", params={"limit": 3}).json()
+        self.assertEqual([c["objetivo"] for c in pagina["history"]], ["obj 0", "obj 1", "obj 2"])
+        self.assertNotIn("resultado", pagina["history"][0])
+        self.assertEqual(pagina["history"][0]["canais"], ["Instagram", "LinkedIn"])
+
+        vistos = [c["id"] for c in pagina["history"]]
+        while pagina["next_cursor"] is not None:
+            pagina = self.client.get("/campaign/history", params={"limit": 3, "after": pagina["next_cursor"]}).json()
+            vistos += [c["id"] for c in pagina["history"]]
+        self.assertEqual(len(vistos), 7)
+        self.assertEqual(vistos, sorted(vistos))
+
+    def test_projecao_de_campos(self):
+        pagina = self.client.get("/campaign/history", params={"fields": "objetivo,resultado", "limit": 1}).json()
+        self.assertEqual(pagina["history"], [{"id": 1, "objetivo": "obj 0", "resultado": {"estrategia": "e0"}}])
+        self.assertEqual(self.client.get("/campaign/history", params={"fields": "senha"}).status_code, 400)
+
+    def test_exportacao_ndjson(self):
+        resp = self.client.get("/campaign/history", params={"format": "ndjson", "after": 2})
+        self.assertTrue(resp.headers["content-type"].startswith("application/x-ndjson"))
+        linhas = [json.loads(l) for l in resp.text.splitlines()]
+        self.assertEqual([l["id"] for l in linhas], [3, 4, 5, 6, 7])
+        self.assertEqual(linhas[0]["resultado"], {"estrategia": "e2"})
+        self.assertEqual(linhas[0]["canais"], ["Instagram", "LinkedIn"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+
+class TestUsuarioAutenticado(unittest.TestCase):
+    def setUp(self):
+        from maestroia.core import auth
+        from maestroia.core.database import User
+
+        self.auth = auth
+        self.cache = auth.UserCache(ttl=60, max_entries=2)
+        p = patch.object(auth, "user_cache", self.cache)
+        p.start()
+        self.addCleanup(p.stop)
+        self.user = User(id=7, email="ana@maestroia.com", plano="starter")
+        self.db = MagicMock()
+        self.db.query.return_value.filter.return_value.first.return_value = self.user
+
+    def _token(self):
+        return self.auth.create_access_token(data=self.auth.user_claims(self.user))
+
+    def test_cache_evita_consulta_e_webhook_invalida(self):
+        token = self._token()
+        primeiro = self.auth.get_current_user(token, self.db)
+        segundo = self.auth.get_current_user(token, self.db)
+        self.assertEqual((segundo.id, segundo.email, segundo.plano), (7, "ana@maestroia.com", "starter"))
+        self.assertIs(primeiro, segundo)
+        self.assertEqual(self.db.query.call_count, 1)
+
+        # Plano ativado: a próxima requisição relê do banco
+        self.user.plano = "professional"
+        self.cache.invalidate("ana@maestroia.com")
+        self.assertEqual(self.auth.get_current_user(token, self.db).plano, "professional")
+        self.assertEqual(self.db.query.call_count, 2)
+
+    def test_cache_expira_e_descarta_o_menos_usado(self):
+        from maestroia.core.auth import CurrentUser, UserCache
+
+        cache = UserCache(ttl=60, max_entries=2)
+        for email in ("a", "b"):
+            cache.put(email, CurrentUser(1, email))
+        cache.get("a")
+        cache.put("c", CurrentUser(3, "c"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+
+        expirado = UserCache(ttl=-1)
+        expirado.put("a", CurrentUser(1, "a"))
+        self.assertIsNone(expirado.get("a"))
+
+    def test_modo_claims_nao_consulta_banco(self):
+        with patch("maestroia.config.settings.AUTH_CLAIMS_MODE", True):
+            token = self._token()
+            usuario = self.auth.get_current_user(token, self.db)
+        self.assertEqual((usuario.id, usuario.email, usuario.plano), (7, "ana@maestroia.com", "starter"))
+        self.db.query.assert_not_called()
+
+        # Com o modo desligado, o mesmo token volta ao caminho com cache/banco
+        self.auth.get_current_user(token, self.db)
+        self.db.query.assert_called_once()
+
+    def test_token_adulterado_rejeitado(self):
+        from fastapi import HTTPException
+        from jose import jwt
+
+        forjado = jwt.encode({"sub": "ana@maestroia.com", "uid": 1, "plan": "enterprise"}, "outra-chave", algorithm="HS256")
+        with patch("maestroia.config.settings.AUTH_CLAIMS_MODE", True), self.assertRaises(HTTPException):
+            self.auth.get_current_user(forjado, self.db)
+
+
+class TestChaveDoModoClaims(unittest.TestCase):
+    def _importar_settings(self, chave):
+        env = {**os.environ, "OPENAI_API_KEY": "x", "AUTH_CLAIMS_MODE": "true", "JWT_SECRET_KEY": chave}
+        return subprocess.run(
+            [sys.executable, "-c", "from maestroia.config import settings; print(len(settings.JWT_SECRET_KEY))"],
+            env=env, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        )
+
+    def test_recusa_iniciar_sem_chave(self):
+        for chave in ("", "your-secret-key"):
+            resultado = self._importar_settings(chave)
+            self.assertNotEqual(resultado.returncode, 0)
+            self.assertIn("JWT_SECRET_KEY", resultado.stderr)
+
+        resultado = self._importar_settings("a" * 64)
+        self.assertEqual((resultado.returncode, resultado.stdout.strip()), (0, "64"))
+
+
+if __name__ == "__main__":
+    unittest.main()
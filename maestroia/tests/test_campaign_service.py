@@ -0,0 +1,135 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+
+class TestCampaignCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.chamadas = []
+        self.falhar = {"LinkedIn"}
+
+        def chat(prompt, *args, **kwargs):
+            self.chamadas.append(prompt)
+            return "resposta mockada"
+
+        async def achat(prompt, *args, **kwargs):
+            return chat(prompt)
+
+        async def aimagem(*args, **kwargs):
+            return ["http://img"]
+
+        def publicar(canal, conteudo):
+            if canal in self.falhar:
+                raise RuntimeError(f"{canal} fora do ar")
+            return f"ok {canal}"
+
+        patches = [
+            patch("maestroia.agents.pesquisador.get_trends_summary", lambda *a, **k: "trends mockados"),
+            patch("maestroia.agents.criador_conteudo.generate_image", lambda *a, **k: ["http://img"]),
+            patch("maestroia.agents.criador_conteudo.agenerate_image", aimagem),
+            patch("maestroia.agents.publicador.publicar_canal", publicar),
+            patch("maestroia.config.settings.PUBLISH_OUTBOX_ENABLED", False),
+        ]
+        for modulo in ("pesquisador", "estrategista", "criador_conteudo", "otimizador"):
+            patches.append(patch(f"maestroia.agents.{modulo}.openai_chat", chat))
+            patches.append(patch(f"maestroia.agents.{modulo}.openai_achat", achat))
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, "checkpoints.db")
+        self.state = {"objetivo": "Teste", "publico_alvo": "Teste", "canais": ["Instagram", "LinkedIn"]}
+
+    def test_retoma_do_no_que_falhou(self):
+        from maestroia.services.campaign_service import run_campaign
+
+        with self.assertRaises(RuntimeError):
+            run_campaign(self.state, campaign_id="c1", checkpoint_path=self.db_path)
+        chamadas_ate_falha = len(self.chamadas)
+
+        self.falhar = set()
+        result = run_campaign(self.state, campaign_id="c1", checkpoint_path=self.db_path)
+
+        # Só o otimizador chama o LLM na retomada
+        self.assertEqual(len(self.chamadas), chamadas_ate_falha + 1)
+        self.assertEqual(result["publicacoes"], {"Instagram": "ok Instagram", "LinkedIn": "ok LinkedIn"})
+        self.assertEqual(len(result["conteudos"]), 2)
+
+        # Campanha concluída: devolve o resultado salvo sem novas chamadas
+        self.assertEqual(run_campaign(self.state, campaign_id="c1", checkpoint_path=self.db_path), result)
+        self.assertEqual(len(self.chamadas), chamadas_ate_falha + 1)
+
+    def test_retoma_assincrono(self):
+        from maestroia.services.campaign_service import arun_campaign
+
+        async def rodar():
+            with self.assertRaises(RuntimeError):
+                await arun_campaign(self.state, campaign_id="c2", checkpoint_path=self.db_path)
+            self.falhar = set()
+            return await arun_campaign(self.state, campaign_id="c2", checkpoint_path=self.db_path)
+
+        result = asyncio.run(rodar())
+        self.assertEqual(set(result["publicacoes"]), {"Instagram", "LinkedIn"})
+        self.assertEqual(len(result["conteudos"]), 2)
+
+
+    def test_stream_emite_evento_por_no(self):
+        from maestroia.services.campaign_service import stream_campaign
+
+        self.falhar = set()
+        eventos = list(stream_campaign(self.state))
+        nos = [e["node"] for e in eventos if e["type"] == "node"]
+
+        self.assertEqual(nos[:2], ["pesquisador", "estrategista"])
+        self.assertEqual(nos.count("criador_conteudo"), 2)
+        self.assertEqual(nos.count("publicador"), 2)
+        self.assertEqual(nos[-2:], ["otimizador", "maestro"])
+        self.assertLess(nos.index("criador_conteudo"), nos.index("publicador"))
+        self.assertEqual(eventos[-1]["type"], "done")
+        self.assertEqual(set(eventos[-1]["result"]["publicacoes"]), {"Instagram", "LinkedIn"})
+
+
+class TestRunCampaigns(unittest.TestCase):
+    def test_lote_com_concorrencia_limitada_e_falhas_isoladas(self):
+        from maestroia.services import campaign_service
+
+        lock = threading.Lock()
+        ativos = {"agora": 0, "max": 0}
+
+        def run_falso(state, campaign_id=None):
+            with lock:
+                ativos["agora"] += 1
+                ativos["max"] = max(ativos["max"], ativos["agora"])
+            time.sleep(0.05)
+            with lock:
+                ativos["agora"] -= 1
+            if state["objetivo"] == "ruim":
+                raise ValueError("entrada ruim")
+            return {"objetivo": state["objetivo"], "campaign_id": campaign_id}
+
+        entradas = [{"objetivo": f"c{i}"} for i in range(10)]
+        entradas[3] = {"objetivo": "ruim"}
+        entradas[5] = "linha inválida"
+        entradas[7] = {"objetivo": "c7", "campaign_id": "lote-7"}
+
+        with patch.object(campaign_service, "run_campaign", run_falso):
+            resultados = list(campaign_service.run_campaigns(iter(entradas), max_concurrency=3))
+
+        self.assertLessEqual(ativos["max"], 3)
+        por_indice = {r["index"]: r for r in resultados}
+        self.assertEqual(sorted(por_indice), list(range(10)))
+        self.assertEqual(por_indice[3]["status"], "error")
+        self.assertIn("entrada ruim", por_indice[3]["error"])
+        self.assertEqual(por_indice[5]["status"], "error")
+        self.assertEqual(por_indice[7]["result"], {"objetivo": "c7", "campaign_id": "lote-7"})
+        self.assertEqual(sum(r["status"] == "ok" for r in resultados), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
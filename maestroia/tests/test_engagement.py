@@ -0,0 +1,117 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Segunda-feira, 06/01/2025 00:00 UTC
+SEGUNDA = 1736121600
+
+
+class TestEngagementStore(unittest.TestCase):
+    def setUp(self):
+        from maestroia.services.engagement import EngagementStore
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+        self.store = EngagementStore(self.path, utc_offset_hours=0, chunk_rows=1000, min_posts=5)
+
+    def _posts(self, canal, nicho, how, engajamento, n, semanas=4):
+        ts = SEGUNDA + how * 3600 + (np.arange(n) % semanas) * 7 * 86400
+        self.store.ingest([canal] * n, [nicho] * n, ts, np.full(n, engajamento))
+
+    def test_hora_da_semana(self):
+        from maestroia.services.engagement import hora_da_semana, formatar_janela
+
+        self.assertEqual(list(hora_da_semana([SEGUNDA, SEGUNDA + 3600 * 42], 0)), [0, 42])
+        # 02:00 UTC de segunda ainda é domingo 23h em Brasília
+        self.assertEqual(hora_da_semana([SEGUNDA + 2 * 3600], -3)[0], 167)
+        self.assertEqual(formatar_janela(42), "Ter 18:00-19:00")
+
+    def test_melhores_janelas_por_nicho_e_plataforma(self):
+        self._posts("Instagram", "Mães de primeira viagem", 42, 90, 20)
+        self._posts("Instagram", "Mães de primeira viagem", 8, 30, 20)
+        self._posts("Instagram", "gamers", 150, 500, 20)
+        self._posts("LinkedIn", "gamers", 9, 10, 20)
+
+        janelas = self.store.top_windows("instagram", "  mães de PRIMEIRA viagem ", k=2)
+        self.assertEqual([j["janela"] for j in janelas], ["Ter 18:00-19:00", "Seg 08:00-09:00"])
+        self.assertEqual(janelas[0]["posts"], 20)
+        self.assertAlmostEqual(janelas[0]["media"], 90)
+        # Nicho sem histórico cai no da plataforma
+        self.assertEqual(self.store.top_windows("Instagram", "pets", k=1)[0]["janela"], "Dom 06:00-07:00")
+        self.assertEqual(self.store.top_windows("TikTok"), [])
+
+    def test_poucos_posts_nao_vencem(self):
+        self._posts("Facebook", "", 10, 40, 50)
+        self._posts("Facebook", "", 20, 1000, 1, semanas=1)
+        self.assertEqual(self.store.top_windows("Facebook", k=1)[0]["how"], 10)
+
+    def test_lotes_persistidos_e_cache(self):
+        from maestroia.services.engagement import EngagementStore
+
+        n = 250_000
+        rng = np.random.default_rng(0)
+        ts = SEGUNDA + rng.integers(0, 52 * 7 * 86400, n)
+        canais = rng.choice(["Instagram", "Facebook", "TikTok"], n)
+        nichos = rng.choice(["a", "b", "c", "d"], n)
+        engajamento = rng.poisson(20, n) + 50 * ((ts - SEGUNDA) // 3600 % 168 == 42)
+        self.store.chunk_rows = 100_000
+        self.store.ingest(canais, nichos, ts, engajamento)
+        self.store.flush()
+
+        somas, contagens = self.store.histogram("TikTok", "c")
+        mascara = (canais == "TikTok") & (nichos == "c")
+        esperado = np.bincount((ts[mascara] - SEGUNDA) // 3600 % 168, minlength=168)
+        np.testing.assert_array_equal(contagens, esperado)
+
+        # Outro processo lê os mesmos lotes
+        outro = EngagementStore(self.path, utc_offset_hours=0, min_posts=5)
+        self.assertEqual(outro.top_windows("Instagram", "b", k=1)[0]["how"], 42)
+        with patch.object(outro, "_colunas") as colunas:
+            outro.top_windows("Instagram", "b", k=1)
+            outro.top_windows("Facebook", k=1)
+        colunas.assert_not_called()
+
+    def test_dois_gravadores_nao_reaproveitam_codigos(self):
+        from maestroia.services.engagement import EngagementStore
+
+        # Dois processos (API e script de importação) com o dicionário carregado antes de gravar
+        outro = EngagementStore(self.path, utc_offset_hours=0, min_posts=5)
+        self.store._carregar_dicionario()
+        outro._carregar_dicionario()
+        self._posts("Instagram", "gamers", 42, 90, 20)
+        ts = SEGUNDA + 10 * 3600 + np.arange(20) % 4 * 7 * 86400
+        outro.ingest(["TikTok"] * 20, ["mães"] * 20, ts, np.full(20, 50))
+        self.store.flush()
+        outro.flush()
+
+        leitor = EngagementStore(self.path, utc_offset_hours=0, min_posts=5)
+        self.assertEqual(leitor.top_windows("Instagram", "gamers", k=1)[0]["how"], 42)
+        self.assertEqual(leitor.top_windows("TikTok", "mães", k=1)[0]["how"], 10)
+        self.assertEqual(leitor.top_windows("TikTok", "gamers", k=1)[0]["how"], 10)
+        self.assertEqual(leitor.histogram("TikTok", "gamers")[1].sum(), 0)
+
+    def test_proxima_ocorrencia(self):
+        quarta_10h = SEGUNDA + (2 * 24 + 10) * 3600 + 1200
+        self.assertEqual(self.store.next_occurrence(42, quarta_10h), SEGUNDA + (7 * 24 + 42) * 3600)
+        self.assertEqual(self.store.next_occurrence(59, quarta_10h), SEGUNDA + 59 * 3600)
+        self.assertEqual(self.store.next_occurrence(58, quarta_10h), SEGUNDA + (7 * 24 + 58) * 3600)
+
+
+class TestCriadorUsaJanelas(unittest.TestCase):
+    def test_prompt_inclui_horarios(self):
+        from maestroia.agents import criador_conteudo
+
+        with patch.object(criador_conteudo, "best_windows_text", return_value="Ter 18:00-19:00") as janelas:
+            prompt = criador_conteudo._prompt_canal("Instagram", "estratégia", "mães")
+        janelas.assert_called_once_with("Instagram", "mães")
+        self.assertIn("Ter 18:00-19:00", prompt)
+
+        with patch.object(criador_conteudo, "best_windows_text", return_value=""):
+            self.assertNotIn("Melhores horários", criador_conteudo._prompt_canal("Instagram", "estratégia"))
+
+
+if __name__ == "__main__":
+    unittest.main()
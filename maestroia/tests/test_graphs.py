@@ -0,0 +1,99 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+
+def _chat_lento(prompt, *args, **kwargs):
+    time.sleep(0.3)
+    return f"resposta para {prompt.strip()[:60]}"
+
+
+async def _achat_lento(prompt, *args, **kwargs):
+    await asyncio.sleep(0.2)
+    return f"resposta para {prompt.strip()[:60]}"
+
+
+async def _aimagem(*args, **kwargs):
+    return ["http://img"]
+
+
+class TestMarketingGraphFanOut(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            patch("maestroia.agents.pesquisador.openai_chat", lambda p, *a, **k: "pesquisa mockada"),
+            patch("maestroia.agents.pesquisador.get_trends_summary", lambda *a, **k: "trends mockados"),
+            patch("maestroia.agents.estrategista.openai_chat", lambda p, *a, **k: "estratégia mockada"),
+            patch("maestroia.agents.criador_conteudo.openai_chat", _chat_lento),
+            patch("maestroia.agents.criador_conteudo.generate_image", lambda *a, **k: ["http://img"]),
+            patch("maestroia.agents.otimizador.openai_chat", lambda p, *a, **k: "otimização mockada"),
+            patch("maestroia.agents.publicador.publicar_canal", lambda canal, conteudo: f"ok {canal}: {conteudo[:20]}"),
+            patch("maestroia.config.settings.PUBLISH_OUTBOX_ENABLED", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        from maestroia.graphs.marketing_graph import build_marketing_graph
+        self.graph = build_marketing_graph()
+
+    def test_conteudos_paralelos_por_canal(self):
+        canais = ["Instagram", "Facebook", "LinkedIn", "TikTok", "YouTube", "Pinterest"]
+        inicio = time.perf_counter()
+        result = self.graph.invoke({"objetivo": "Teste", "publico_alvo": "Teste", "canais": canais})
+        duracao = time.perf_counter() - inicio
+
+        # Seis chamadas de 0.3s em sequência levariam ~1.8s
+        self.assertLess(duracao, 1.2)
+        self.assertEqual(len(result["conteudos"]), len(canais))
+        for canal, conteudo in zip(canais, result["conteudos"]):
+            self.assertTrue(conteudo.startswith(f"**{canal}:**"))
+        self.assertEqual(set(result["publicacoes"]), set(canais))
+        self.assertTrue(result["publicacoes"]["LinkedIn"].startswith("ok LinkedIn: **LinkedIn:**"))
+        self.assertEqual(result["imagens"], ["http://img"])
+
+    def test_sem_estrategia_registra_erro_unico(self):
+        with patch("maestroia.agents.estrategista.openai_chat", lambda p, *a, **k: ""):
+            result = self.graph.invoke({"objetivo": "Teste", "canais": ["Instagram", "Facebook"]})
+        self.assertEqual(result["erros"].count("Estratégia não encontrada no estado."), 1)
+
+
+class TestMarketingGraphAsync(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            patch("maestroia.agents.pesquisador.openai_achat", _achat_lento),
+            patch("maestroia.agents.pesquisador.get_trends_summary", lambda *a, **k: "trends mockados"),
+            patch("maestroia.agents.estrategista.openai_achat", _achat_lento),
+            patch("maestroia.agents.criador_conteudo.openai_achat", _achat_lento),
+            patch("maestroia.agents.criador_conteudo.agenerate_image", _aimagem),
+            patch("maestroia.agents.otimizador.openai_achat", _achat_lento),
+            patch("maestroia.agents.publicador.publicar_canal", lambda canal, conteudo: f"ok {canal}"),
+            patch("maestroia.config.settings.PUBLISH_OUTBOX_ENABLED", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        from maestroia.graphs.marketing_graph import build_marketing_graph
+        self.graph = build_marketing_graph()
+
+    def test_campanhas_concorrentes_no_mesmo_loop(self):
+        state = {"objetivo": "Teste", "publico_alvo": "Teste", "canais": ["Instagram", "Facebook", "LinkedIn"]}
+
+        async def rodar():
+            return await asyncio.gather(*(self.graph.ainvoke(dict(state)) for _ in range(5)))
+
+        inicio = time.perf_counter()
+        resultados = asyncio.run(rodar())
+        duracao = time.perf_counter() - inicio
+
+        # 5 chamadas ao LLM no caminho crítico (~1s); 5 campanhas em série levariam ~5s
+        self.assertLess(duracao, 2.5)
+        for result in resultados:
+            self.assertEqual(len(result["conteudos"]), 3)
+            self.assertEqual(set(result["publicacoes"]), {"Instagram", "Facebook", "LinkedIn"})
+            self.assertIn("pesquisa", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from maestroia.services.llm_cache import ResponseCache, cache_key
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache.db")
+
+    def test_niveis_memoria_e_disco(self):
+        cache = ResponseCache(self.path)
+        key = cache_key("chat", "gpt-4o-mini", 0.3, "prompt")
+        self.assertIsNone(cache.get(key))
+        cache.set(key, "resposta")
+        self.assertEqual(cache.get(key), "resposta")
+
+        # Nova instância (novo processo): vem do disco e depois da memória
+        outra = ResponseCache(self.path)
+        self.assertEqual(outra.get(key), "resposta")
+        self.assertEqual(outra.get(key), "resposta")
+        self.assertEqual(outra.stats()["hits_disk"], 1)
+        self.assertEqual(outra.stats()["hits_memory"], 1)
+
+    def test_chave_depende_de_modelo_e_temperatura(self):
+        self.assertNotEqual(cache_key("chat", "a", 0.3, "p"), cache_key("chat", "b", 0.3, "p"))
+        self.assertNotEqual(cache_key("chat", "a", 0.3, "p"), cache_key("chat", "a", 0.7, "p"))
+
+    def test_ttl_expira(self):
+        cache = ResponseCache(self.path, ttl=0.05)
+        cache.set("k", "v")
+        time.sleep(0.1)
+        self.assertIsNone(ResponseCache(self.path, ttl=0.05).get("k"))
+        self.assertIsNone(cache.get("k"))
+
+    def test_evict_por_tamanho_remove_menos_acessados(self):
+        cache = ResponseCache(self.path, max_entries=3, memory_entries=1)
+        for i in range(5):
+            cache.set(f"k{i}", f"v{i}")
+            time.sleep(0.01)
+        cache.get("k0")  # k0 volta a ser recente
+        cache.evict()
+
+        outra = ResponseCache(self.path)
+        restantes = [k for k in ("k0", "k1", "k2", "k3", "k4") if outra.get(k) is not None]
+        self.assertEqual(restantes, ["k0", "k3", "k4"])
+
+
+class TestChatCache(unittest.TestCase):
+    def setUp(self):
+        import maestroia.services.openai_service as openai_service
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.openai_service = openai_service
+        self.fake_client = MagicMock()
+        resp = MagicMock()
+        resp.choices[0].message.content = "resposta da API"
+        self.fake_client.chat.completions.create.return_value = resp
+        for p in (
+            patch.object(openai_service, "client", self.fake_client),
+            patch.object(openai_service, "response_cache", ResponseCache(os.path.join(tmp.name, "c.db"))),
+        ):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_repeticao_nao_chama_api(self):
+        self.assertEqual(self.openai_service.chat("mesmo prompt"), "resposta da API")
+        self.assertEqual(self.openai_service.chat("mesmo prompt"), "resposta da API")
+        self.assertEqual(self.fake_client.chat.completions.create.call_count, 1)
+
+        self.openai_service.chat("mesmo prompt", cache=False)
+        self.assertEqual(self.fake_client.chat.completions.create.call_count, 2)
+
+    def test_fallback_nao_e_guardado(self):
+        self.fake_client.chat.completions.create.side_effect = RuntimeError("fora do ar")
+        self.assertIn("FALLBACK", self.openai_service.chat("p"))
+        self.fake_client.chat.completions.create.side_effect = None
+        self.assertEqual(self.openai_service.chat("p"), "resposta da API")
+
+    def test_achat_acessa_cache_fora_do_event_loop(self):
+        cache = self.openai_service.response_cache
+        threads = []
+        for nome in ("get", "set"):
+            original = getattr(cache, nome)
+
+            def registrar(*args, _original=original):
+                threads.append(threading.get_ident())
+                return _original(*args)
+
+            p = patch.object(cache, nome, registrar)
+            p.start()
+            self.addCleanup(p.stop)
+        fake_async = MagicMock()
+        resp = MagicMock()
+        resp.choices[0].message.content = "resposta assíncrona"
+        fake_async.chat.completions.create = AsyncMock(return_value=resp)
+
+        async def rodar():
+            loop = threading.get_ident()
+            respostas = [await self.openai_service.achat("p async") for _ in range(2)]
+            return loop, respostas
+
+        with patch.object(self.openai_service, "async_client", fake_async):
+            loop, respostas = asyncio.run(rodar())
+        self.assertEqual(respostas, ["resposta assíncrona"] * 2)
+        self.assertEqual(fake_async.chat.completions.create.await_count, 1)
+        # get, set e o get da segunda chamada, todos fora da thread do loop
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(loop, threads)
+
+
+class TestLimiteDeConcorrencia(unittest.TestCase):
+    def test_sincrono_e_assincrono_dividem_o_mesmo_limite(self):
+        import maestroia.services.openai_service as openai_service
+
+        ativos, picos, lock = [0], [], threading.Lock()
+
+        def entrar():
+            with lock:
+                ativos[0] += 1
+                picos.append(ativos[0])
+
+        def sair():
+            with lock:
+                ativos[0] -= 1
+
+        def criar(**kw):
+            entrar()
+            time.sleep(0.05)
+            sair()
+            resp = MagicMock()
+            resp.choices[0].message.content = "ok"
+            return resp
+
+        async def acriar(**kw):
+            entrar()
+            await asyncio.sleep(0.05)
+            sair()
+            resp = MagicMock()
+            resp.choices[0].message.content = "ok"
+            return resp
+
+        cliente, cliente_async = MagicMock(), MagicMock()
+        cliente.chat.completions.create.side_effect = criar
+        cliente_async.chat.completions.create = acriar
+
+        async def assincronas():
+            await asyncio.gather(*(openai_service.achat(f"a{i}", cache=False) for i in range(4)))
+
+        with patch.object(openai_service, "_llm_slots", threading.BoundedSemaphore(2)), \
+                patch.object(openai_service, "client", cliente), \
+                patch.object(openai_service, "async_client", cliente_async):
+            threads = [threading.Thread(target=openai_service.chat, args=(f"s{i}",), kwargs={"cache": False})
+                       for i in range(4)]
+            for t in threads:
+                t.start()
+            asyncio.run(assincronas())
+            for t in threads:
+                t.join()
+        self.assertEqual(len(picos), 8)
+        self.assertLessEqual(max(picos), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
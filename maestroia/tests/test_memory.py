@@ -0,0 +1,399 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from maestroia.config import settings
+from maestroia.services.llm_cache import ResponseCache
+
+
+def _vetor_falso(texto: str) -> list:
+    rng = np.random.default_rng(abs(hash(texto)) % (2 ** 32))
+    return rng.standard_normal(settings.DEFAULT_EMBEDDING_DIM).astype(np.float32).tolist()
+
+
+class EmbeddingsFalsos(unittest.TestCase):
+    """Base: cliente OpenAI falso que conta requisições de embeddings."""
+
+    def setUp(self):
+        import maestroia.services.openai_service as openai_service
+
+        self.openai_service = openai_service
+        self.requisicoes = []
+
+        def criar(model, input):
+            self.requisicoes.append(list(input))
+            return SimpleNamespace(data=[
+                SimpleNamespace(index=i, embedding=_vetor_falso(t)) for i, t in enumerate(input)
+            ])
+
+        fake_client = MagicMock()
+        fake_client.embeddings.create.side_effect = criar
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for p in (
+            patch.object(openai_service, "client", fake_client),
+            patch.object(openai_service, "embedding_cache", ResponseCache(os.path.join(tmp.name, "emb.db"), table="embedding_cache")),
+            patch.object(settings, "EMBEDDING_BATCH_SIZE", 500),
+        ):
+            p.start()
+            self.addCleanup(p.stop)
+
+
+class TestGetEmbeddings(EmbeddingsFalsos):
+    def test_lotes_matriz_e_cache(self):
+        textos = [f"campanha {i}" for i in range(1200)] + ["campanha 7"]
+        matriz = self.openai_service.get_embeddings(textos)
+
+        self.assertEqual(matriz.shape, (1201, settings.DEFAULT_EMBEDDING_DIM))
+        self.assertEqual(matriz.dtype, np.float32)
+        self.assertTrue(matriz.flags["C_CONTIGUOUS"])
+        # 1200 textos únicos em lotes de 500
+        self.assertEqual([len(r) for r in self.requisicoes], [500, 500, 200])
+        np.testing.assert_array_equal(matriz[7], matriz[1200])
+        np.testing.assert_allclose(matriz[3], _vetor_falso("campanha 3"))
+
+        # Segunda vez: tudo do cache, nenhuma requisição
+        novamente = self.openai_service.get_embeddings(textos[:10])
+        self.assertEqual(len(self.requisicoes), 3)
+        np.testing.assert_array_equal(novamente, matriz[:10])
+
+
+class TestVectorStoreBulk(EmbeddingsFalsos):
+    def test_add_documents_em_lote(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore()
+        textos = [f"texto de campanha {i}" for i in range(50)]
+        vs.add_documents(textos)
+
+        self.assertEqual(len(self.requisicoes), 1)
+        self.assertEqual(vs.index.ntotal, 50)
+        self.assertEqual(vs.search("texto de campanha 17", k=1), ["texto de campanha 17"])
+
+
+class TestVectorStorePersistente(EmbeddingsFalsos):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "memoria")
+
+    def test_append_incremental_e_recarga(self):
+        from maestroia.memory.vector import VectorStore, INDEX_FILE
+
+        vs = VectorStore(self.path)
+        vs.add_documents([f"memória {i}" for i in range(10)])
+        vs.add_document("memória 10")
+        # Sem save(): só o arquivo incremental, nada de index.faiss
+        self.assertFalse(os.path.exists(os.path.join(self.path, INDEX_FILE)))
+
+        outra = VectorStore(self.path)
+        self.assertEqual(outra.ntotal, 11)
+        self.assertEqual(outra.search("memória 10", k=1), ["memória 10"])
+
+    def test_save_compacta_e_leitores_somente_leitura(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore(self.path)
+        vs.add_documents([f"memória {i}" for i in range(10)])
+        vs.save()
+        vs.add_documents(["depois do save"])
+
+        leitor = VectorStore(self.path, read_only=True)
+        self.assertEqual(leitor.ntotal, 11)
+        self.assertEqual(leitor._base.ntotal, 10)
+        self.assertEqual(leitor.search("memória 3", k=1), ["memória 3"])
+        self.assertEqual(leitor.search("depois do save", k=1), ["depois do save"])
+        with self.assertRaises(RuntimeError):
+            leitor.add_document("x")
+
+        # Nada foi re-embedado na recarga (as consultas já estavam no cache de embeddings)
+        self.assertEqual(sum(len(r) for r in self.requisicoes), 11)
+
+    def test_leitor_sem_arquivos_fica_vazio(self):
+        from maestroia.memory.vector import VectorStore
+
+        self.assertEqual(VectorStore(self.path, read_only=True).search("nada"), [])
+
+
+class TestVectorStoreAproximado(EmbeddingsFalsos):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "memoria")
+        p = patch.object(settings, "MEMORY_ANN_THRESHOLD", 300)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_hnsw_acima_do_limite_e_incremental(self):
+        import faiss
+        from maestroia.memory.vector import VectorStore
+
+        with patch.object(settings, "MEMORY_ANN_INDEX", "hnsw"):
+            vs = VectorStore(self.path)
+            vs.add_documents([f"memória {i}" for i in range(200)])
+            vs.save()
+            self.assertIsNone(vs._ann)  # abaixo do limite continua exato
+
+            vs.add_documents([f"memória {i}" for i in range(200, 400)])
+            vs.save()
+            self.assertIsInstance(faiss.downcast_index(vs._ann.index), faiss.IndexHNSW)
+            self.assertEqual(vs._ann.ntotal, 400)
+
+            vs.add_documents([f"memória {i}" for i in range(400, 450)])
+            vs.save()  # estende o HNSW existente
+            leitor = VectorStore(self.path, read_only=True, ef_search=128)
+            self.assertEqual(leitor._ann.ntotal, 450)
+            self.assertEqual(leitor.search("memória 321", k=1), ["memória 321"])
+            self.assertEqual(leitor.search("memória 444", k=1), ["memória 444"])
+
+    def test_ivfpq_treina_em_memoria(self):
+        import faiss
+        from maestroia.memory.vector import VectorStore
+
+        with patch.object(settings, "MEMORY_ANN_INDEX", "ivfpq"):
+            vs = VectorStore(nprobe=64)
+            vs.add_documents([f"memória {i}" for i in range(400)])
+            vs.save()
+            self.assertIsInstance(faiss.downcast_index(vs._ann.index), faiss.IndexIVFPQ)
+            self.assertTrue(vs._ann.is_trained)
+            self.assertIn("memória 42", vs.search("memória 42", k=5))
+
+
+class TestVectorStoreMultiTenant(EmbeddingsFalsos):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "memoria")
+
+    def _popular(self, vs):
+        vs.add_documents([f"ana {i}" for i in range(30)], user_id="ana", campaign_id="c1", kind="conteudo")
+        vs.add_documents([f"ana {i}" for i in range(30, 40)], user_id="ana", campaign_id="c2")
+        vs.add_documents([f"bia {i}" for i in range(30)], user_id="bia", campaign_id="c1")
+
+    def test_filtro_por_usuario_e_campanha(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore(self.path)
+        self._popular(vs)
+        # "bia 5" é o mais próximo de si mesmo, mas pertence a outro usuário
+        resultado = vs.search_documents("bia 5", k=3, user_id="ana")
+        self.assertEqual(len(resultado), 3)
+        self.assertTrue(all(d["user_id"] == "ana" for d in resultado))
+        self.assertEqual(vs.search("ana 35", k=5, user_id="ana", campaign_id="c2")[0], "ana 35")
+        self.assertEqual(len(vs.search("ana 35", k=50, campaign_id="c2")), 10)
+        self.assertEqual(vs.search("x", user_id="ninguem"), [])
+
+    def test_remocao_com_lapides_e_compactacao(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore(self.path)
+        self._popular(vs)
+        vs.save()
+        self.assertEqual(vs.delete_where(user_id="bia"), 30)
+        # Vetores de bia ainda estão na base (lápides), mas não aparecem
+        self.assertEqual(vs.ntotal, 70)
+        self.assertNotIn("bia 7", vs.search("bia 7", k=5))
+        self.assertEqual(len(vs.search("bia 7", k=5)), 5)
+
+        ids = vs.add_documents(["nova"], user_id="ana")
+        vs.delete(ids)
+        vs.save()
+        self.assertEqual(vs.ntotal, 40)
+
+        outra = VectorStore(self.path)
+        self.assertEqual(outra.ntotal, 40)
+        self.assertEqual(outra.search("ana 12", k=1), ["ana 12"])
+        # Ids não são reaproveitados depois de remoções
+        self.assertGreater(outra.add_document("depois", user_id="ana"), ids[0])
+
+    def test_filtro_no_indice_aproximado(self):
+        from maestroia.memory.vector import VectorStore
+
+        with patch.object(settings, "MEMORY_ANN_THRESHOLD", 50), \
+                patch.object(settings, "MEMORY_FILTER_EXACT_LIMIT", 5):
+            vs = VectorStore()
+            self._popular(vs)
+            vs.save()
+            self.assertIsNotNone(vs._ann)
+            resultado = vs.search_documents("ana 33", k=3, user_id="ana", campaign_id="c2")
+            self.assertEqual(resultado[0]["text"], "ana 33")
+            self.assertTrue(all(d["campaign_id"] == "c2" for d in resultado))
+
+
+class TestVectorStoreComprimido(EmbeddingsFalsos):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "memoria")
+
+    def test_int8_com_rerank_exato_do_disco(self):
+        import faiss
+        from maestroia.memory.vector import VectorStore, SEARCH_FILE
+
+        with patch.object(settings, "MEMORY_STORAGE", "int8"):
+            vs = VectorStore(self.path)
+            vs.add_documents([f"memória {i}" for i in range(100)])
+            vs.save()
+            self.assertTrue(os.path.exists(os.path.join(self.path, SEARCH_FILE.format("int8"))))
+
+            leitor = VectorStore(self.path, read_only=True)
+            self.assertIsInstance(faiss.downcast_index(leitor._ann.index), faiss.IndexScalarQuantizer)
+            resultado = leitor.search_documents("memória 57", k=3)
+            self.assertEqual(resultado[0]["text"], "memória 57")
+            # Distância vem do vetor exato (rerank), não do código int8
+            self.assertAlmostEqual(resultado[0]["distance"], 0.0, places=4)
+
+        # Voltar para flat descarta o índice comprimido na próxima compactação
+        vs.save()
+        self.assertIsNone(vs._ann)
+        self.assertFalse(os.path.exists(os.path.join(self.path, SEARCH_FILE.format("int8"))))
+
+    def test_documentos_longos_comprimidos(self):
+        import sqlite3
+        from maestroia.memory.vector import VectorStore, DOCUMENTS_FILE
+
+        longo = "estratégia de conteúdo " * 100
+        vs = VectorStore(self.path)
+        vs.add_documents([longo, "curto"])
+
+        conn = sqlite3.connect(os.path.join(self.path, DOCUMENTS_FILE))
+        tipos = [r[0] for r in conn.execute("SELECT typeof(text) FROM documents ORDER BY id")]
+        conn.close()
+        self.assertEqual(tipos, ["blob", "text"])
+        self.assertEqual(VectorStore(self.path).search(longo, k=1), [longo])
+
+
+class TestVectorStoreConcorrente(EmbeddingsFalsos):
+    def test_adds_e_buscas_em_paralelo(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from maestroia.memory.vector import VectorStore
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        vs = VectorStore(tmp.name)
+
+        def adicionar(t):
+            return vs.add_documents([f"t{t} doc {i}" for i in range(20)], user_id=f"u{t}")
+
+        def buscar(t):
+            return vs.search(f"t{t} doc 3", k=3)
+
+        with ThreadPoolExecutor(8) as pool:
+            buscas = [pool.submit(buscar, t) for t in range(8)]
+            ids = list(pool.map(adicionar, range(8)))
+            for f in buscas:
+                f.result()
+
+        todos = [i for lote in ids for i in lote]
+        self.assertEqual(sorted(todos), list(range(160)))
+        self.assertEqual(vs.ntotal, 160)
+        # ids e documentos continuam alinhados
+        for t, lote in enumerate(ids):
+            docs = vs._documentos(lote)
+            self.assertEqual([docs[i]["text"] for i in lote], [f"t{t} doc {i}" for i in range(20)])
+        self.assertEqual(vs.search_documents("t5 doc 7", k=1)[0]["id"], ids[5][7])
+
+    def test_fila_do_writer_em_lotes(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore()
+        self.addCleanup(vs.close)
+        with patch.object(settings, "MEMORY_WRITE_FLUSH_SECONDS", 5.0), patch.object(settings, "MEMORY_WRITE_BATCH", 6):
+            futuros = [vs.enqueue([f"fila {i}", f"fila {i} b"], kind="k") for i in range(3)]
+            ids = [f.result(timeout=10) for f in futuros]
+
+        self.assertEqual(ids, [[0, 1], [2, 3], [4, 5]])
+        # Os três pedidos saíram em uma única requisição de embeddings
+        self.assertEqual(len(self.requisicoes), 1)
+        self.assertEqual(len(self.requisicoes[0]), 6)
+        vs.enqueue(["depois"]).result(timeout=10)
+        vs.flush()
+        self.assertEqual(vs.search_documents("fila 1 b", k=1, kind="k")[0]["id"], 3)
+
+
+class TestVectorStoreHibrido(EmbeddingsFalsos):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "memoria")
+
+    def test_termos_exatos_e_fusao(self):
+        from maestroia.memory.vector import VectorStore
+
+        vs = VectorStore(self.path)
+        vs.add_documents([f"post genérico {i}" for i in range(50)], user_id="ana")
+        sku, hashtag = vs.add_documents(["Lançamento do tênis SKU AB-1234", "Promoção #BlackFriday na loja"], user_id="ana")
+        vs.add_documents(["#BlackFriday de outro cliente"], user_id="bia")
+
+        self.assertEqual(vs.search_hybrid("ab-1234", k=1, mode="lexical")[0]["id"], sku)
+        # Acentos e caixa não importam
+        self.assertEqual(vs.search_hybrid("lancamento tenis", k=1, mode="lexical")[0]["id"], sku)
+
+        import maestroia.memory.vector as vector
+        with patch.object(vector, "get_embeddings", wraps=vector.get_embeddings) as embeddings:
+            # Só palavras-chave com resultados suficientes: nenhuma chamada de embeddings
+            resultado = vs.search_hybrid("#blackfriday", k=1, user_id="ana")
+            self.assertEqual([d["id"] for d in resultado], [hashtag])
+            embeddings.assert_not_called()
+
+            # Texto livre: as duas listas entram na fusão
+            resultado = vs.search_hybrid("post genérico 7", k=3)
+            self.assertEqual(resultado[0]["text"], "post genérico 7")
+            embeddings.assert_called_once()
+        self.assertEqual(VectorStore(self.path, read_only=True).search("AB-1234", k=1), ["Lançamento do tênis SKU AB-1234"])
+
+    def test_remocao_e_indexacao_de_memoria_antiga(self):
+        import sqlite3
+        from maestroia.memory.vector import VectorStore, DOCUMENTS_FILE, LEXICAL_TABLE
+
+        vs = VectorStore(self.path)
+        ids = vs.add_documents(["cupom VERAO25 " + "x" * 300, "cupom INVERNO10"])
+        vs.delete([ids[0]])
+        self.assertEqual(vs.search("verao25", k=2, mode="lexical"), [])
+
+        # Memória gravada antes do índice lexical: reconstruído ao abrir
+        conn = sqlite3.connect(os.path.join(self.path, DOCUMENTS_FILE))
+        conn.execute(f"DROP TABLE {LEXICAL_TABLE}")
+        conn.commit()
+        conn.close()
+        self.assertEqual(VectorStore(self.path).search("inverno10", k=2, mode="lexical"), ["cupom INVERNO10"])
+
+
+class TestFallbackEmbeddings(unittest.TestCase):
+    def test_normalizado_deterministico_e_vetorizado(self):
+        from maestroia.services.openai_service import _fallback_embeddings, _fallback_embedding
+
+        textos = ["produto X", "mulheres 25-40", "produto X", ""]
+        matriz = _fallback_embeddings(textos)
+
+        self.assertEqual(matriz.shape, (4, settings.DEFAULT_EMBEDDING_DIM))
+        self.assertEqual(matriz.dtype, np.float32)
+        self.assertTrue(np.isfinite(matriz).all())
+        np.testing.assert_allclose(np.linalg.norm(matriz, axis=1), 1.0, rtol=1e-5)
+        np.testing.assert_array_equal(matriz[0], matriz[2])
+        np.testing.assert_allclose(matriz[1], _fallback_embedding("mulheres 25-40"))
+        # Textos diferentes ficam quase ortogonais
+        self.assertLess(abs(float(matriz[0] @ matriz[1])), 0.2)
+
+    def test_busca_offline_encontra_texto_identico(self):
+        import maestroia.services.openai_service as openai_service
+        from maestroia.memory.vector import VectorStore
+
+        with patch.object(openai_service, "client", None):
+            vs = VectorStore()
+            vs.add_documents([f"memória {i}" for i in range(20)])
+            self.assertEqual(vs.search("memória 11", k=1), ["memória 11"])
+
+
+if __name__ == "__main__":
+    unittest.main()
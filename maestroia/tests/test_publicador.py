@@ -0,0 +1,173 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+
+class TestPublicacaoConcorrente(unittest.TestCase):
+    def test_canais_em_paralelo(self):
+        from maestroia.agents import publicador
+
+        def publicar(canal, conteudo):
+            time.sleep(0.3)
+            return f"ok {canal}: {conteudo}"
+
+        inicio = time.perf_counter()
+        with patch.object(publicador, "publicar_canal", publicar), \
+                patch("maestroia.config.settings.PUBLISH_OUTBOX_ENABLED", False):
+            resultado = publicador.agente_publicador({
+                "canais": ["Facebook", "LinkedIn", "TikTok", "YouTube"],
+                "conteudos": ["a", "b", "c", "d"],
+            })
+        self.assertLess(time.perf_counter() - inicio, 0.9)
+        self.assertEqual(resultado["publicacoes"]["LinkedIn"], "ok LinkedIn: b")
+        self.assertEqual(len(resultado["publicacoes"]), 4)
+
+    def test_erro_em_um_canal_nao_derruba_os_outros(self):
+        from maestroia.agents import publicador
+
+        def publicar(canal, conteudo):
+            if canal == "Facebook":
+                raise requests.ConnectTimeout("timeout")
+            return "ok"
+
+        with patch.object(publicador, "publicar_canal", publicar):
+            publicacoes = publicador.publicar_canais([("Facebook", "x"), ("LinkedIn", "y")])
+        self.assertIn("timeout", publicacoes["Facebook"])
+        self.assertEqual(publicacoes["LinkedIn"], "ok")
+
+
+class TestClientesCompartilhados(unittest.TestCase):
+    def test_sessao_reaproveitada_com_timeout(self):
+        from maestroia.config import settings
+        from maestroia.services import publishing
+
+        sessao = publishing.http_session()
+        self.assertIs(sessao, publishing.http_session())
+        with patch.object(requests.Session, "request", return_value=MagicMock()) as request:
+            sessao.post("https://graph.facebook.com/me/feed", data={})
+        self.assertEqual(request.call_args.kwargs["timeout"], (settings.PUBLISH_CONNECT_TIMEOUT, settings.PUBLISH_READ_TIMEOUT))
+
+    def test_twitter_client_criado_uma_vez(self):
+        from maestroia.services import publishing
+
+        with patch.object(publishing, "_twitter", None):
+            cliente = publishing.twitter_client()
+            self.assertIs(cliente, publishing.twitter_client())
+            self.assertIsInstance(cliente.session, publishing.TimeoutSession)
+
+    def test_limite_por_plataforma(self):
+        from maestroia.agents import publicador
+        from maestroia.services import publishing
+
+        publishing.limiter("twitter").drain()
+        with patch.object(publicador, "PUBLISH_RATE_WAIT_SECONDS", 0.01), \
+                patch.object(publicador, "publicar_twitter") as twitter, \
+                patch.object(publicador, "publicar_linkedin", return_value="ok") as linkedin:
+            self.assertIn("Limite de publicações", publicador.publicar_canal("Twitter/X", "oi"))
+            self.assertEqual(publicador.publicar_canal("LinkedIn", "oi"), "ok")
+        twitter.assert_not_called()
+        linkedin.assert_called_once()
+        self.assertIs(publishing.limiter("twitter"), publishing.limiter(publishing.plataforma("twitter")))
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        from maestroia.services.outbox import PublicationOutbox
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.outbox = PublicationOutbox(os.path.join(tmp.name, "outbox.db"), max_attempts=3, base_delay=0.0)
+
+    def test_enfileira_uma_vez_por_chave(self):
+        from maestroia.agents import publicador
+
+        with patch.object(publicador, "publication_outbox", self.outbox), \
+                patch.object(publicador, "outbox_worker") as worker, \
+                patch.object(publicador, "publicar_canal") as publicar:
+            config = {"configurable": {"thread_id": "camp-1"}}
+            estado = {"canais": ["Facebook", "Twitter"], "conteudos": ["post fb", "tweet"]}
+            primeira = publicador.agente_publicador(estado, config)
+            # Campanha executada de novo: nada é publicado em dobro
+            segunda = publicador.agente_publicador(estado, config)
+            publicador.agente_publicador({"canal": "Facebook", "conteudo": "post fb"}, config)
+            # Sem id de campanha cada execução é nova, mesmo com o mesmo texto
+            sem_id = {"configurable": {}}
+            publicador.agente_publicador({"canal": "Facebook", "conteudo": "post fb"}, sem_id)
+            publicador.agente_publicador({"canal": "Facebook", "conteudo": "post fb"}, sem_id)
+
+        publicar.assert_not_called()
+        worker.start.assert_called()
+        self.assertIn("na fila", primeira["publicacoes"]["Facebook"])
+        self.assertIn("ignorada", segunda["publicacoes"]["Facebook"])
+        self.assertEqual(self.outbox.stats()["pending"], 4)
+        self.assertEqual({i["channel"] for i in self.outbox.by_campaign("camp-1")}, {"Facebook", "Twitter"})
+
+    def test_worker_retenta_e_manda_para_fila_morta(self):
+        from maestroia.services.outbox import OutboxWorker, PublishError
+
+        tentativas = []
+
+        def publicar(canal, conteudo):
+            tentativas.append(canal)
+            if canal == "Twitter":
+                raise PublishError("Erro ao publicar no Twitter: 503")
+            if tentativas.count(canal) == 1:
+                raise PublishError("Erro ao publicar no Facebook: timeout")
+            return f"Publicado no {canal}"
+
+        self.outbox.enqueue("c", "Facebook", "a")
+        self.outbox.enqueue("c", "Twitter", "b")
+        worker = OutboxWorker(self.outbox, publicar)
+        while worker.run_once():
+            pass
+
+        self.assertEqual(tentativas.count("Facebook"), 2)
+        self.assertEqual(tentativas.count("Twitter"), 3)
+        status = {i["channel"]: i for i in self.outbox.by_campaign("c")}
+        self.assertEqual(status["Facebook"]["status"], "done")
+        self.assertEqual(status["Facebook"]["result"], "Publicado no Facebook")
+        self.assertEqual(status["Twitter"]["status"], "dead")
+        self.assertEqual([i["channel"] for i in self.outbox.dead_letters()], ["Twitter"])
+
+        # Concluído não volta para a fila; a fila morta pode ser reenviada
+        self.assertIsNone(self.outbox.claim())
+        self.assertTrue(self.outbox.requeue(status["Twitter"]["idempotency_key"]))
+        self.assertEqual(self.outbox.claim()["channel"], "Twitter")
+
+    def test_drain_publica_antes_de_sair(self):
+        from maestroia.services.outbox import OutboxWorker
+
+        publicados = []
+        worker = OutboxWorker(self.outbox, lambda canal, conteudo: publicados.append(canal) or "ok", workers=2, poll=30)
+        worker.start()
+        for canal in ("Facebook", "Twitter", "LinkedIn"):
+            self.outbox.enqueue("c", canal, "x")
+        stats = worker.drain(timeout=5)
+        self.assertEqual(sorted(publicados), ["Facebook", "LinkedIn", "Twitter"])
+        self.assertEqual((stats["done"], stats["pending"], stats["running"]), (3, 0, 0))
+        self.assertFalse(any(t.is_alive() for t in worker._threads))
+
+    def test_backoff_e_lease_expirado(self):
+        from maestroia.services.outbox import PublicationOutbox
+
+        outbox = PublicationOutbox(self.outbox.path, base_delay=60.0, lease=0.05)
+        outbox.enqueue("c", "LinkedIn", "x")
+        item = outbox.claim()
+        self.assertIsNone(outbox.claim())
+        # Worker morreu com o item reservado: volta depois do lease
+        time.sleep(0.1)
+        novo = outbox.claim()
+        self.assertEqual(novo["id"], item["id"])
+        # O worker antigo volta tarde: o lease não é mais dele e nada muda
+        self.assertFalse(outbox.complete(item["id"], "Publicado", item["lease"]))
+        self.assertIsNone(outbox.fail(item["id"], "erro", item["attempts"], item["lease"]))
+        self.assertEqual(outbox.fail(novo["id"], "erro", novo["attempts"], novo["lease"]), "pending")
+        self.assertIsNone(outbox.claim())
+
+
+if __name__ == "__main__":
+    unittest.main()
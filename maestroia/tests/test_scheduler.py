@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import unittest
+
+
+class TestPostScheduler(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "scheduler.db")
+        self.lotes = []
+
+    def _agendador(self, **kwargs):
+        from maestroia.services.scheduler import PostScheduler
+
+        return PostScheduler(self.path, deliver=self.lotes.append, **kwargs)
+
+    def test_despacha_vencidos_em_lotes(self):
+        agendador = self._agendador(window=60, batch=2)
+        agora = time.time()
+        for i in range(5):
+            agendador.schedule("LinkedIn", f"post {i}", agora - 10 + i, user_id="a@b.com")
+        futuro = agendador.schedule("Facebook", "depois", agora + 3600)
+
+        self.assertEqual(agendador.run_due(agora), 5)
+        self.assertEqual([len(lote) for lote in self.lotes], [2, 2, 1])
+        self.assertEqual([p["content"] for lote in self.lotes for p in lote], [f"post {i}" for i in range(5)])
+        # Fora da janela não ocupa memória
+        self.assertEqual(agendador.stats()["in_memory"], 0)
+        self.assertEqual(agendador.run_due(agora), 0)
+        self.assertEqual([p["id"] for p in agendador.pending()], [futuro])
+
+    def test_sobrevive_a_reinicio_e_cancelamento(self):
+        agendador = self._agendador(window=60)
+        agora = time.time()
+        manter = agendador.schedule("Instagram", "foto", agora + 5)
+        cancelado = agendador.schedule("Instagram", "cancelado", agora + 5)
+        self.assertTrue(agendador.cancel(cancelado))
+
+        # Novo processo: o agendamento continua no SQLite
+        reiniciado = self._agendador(window=60)
+        self.assertEqual(reiniciado.run_due(agora), 0)
+        self.assertEqual(reiniciado.run_due(agora + 6), 1)
+        self.assertEqual([p["id"] for p in self.lotes[0]], [manter])
+        self.assertFalse(reiniciado.cancel(manter))
+
+    def test_falha_na_entrega_mantem_agendado(self):
+        from maestroia.services.scheduler import PostScheduler
+
+        def falhar(posts):
+            raise RuntimeError("outbox indisponível")
+
+        agendador = PostScheduler(self.path, deliver=falhar, window=60)
+        agendador.schedule("TikTok", "video", time.time() - 1)
+        with self.assertRaises(RuntimeError):
+            agendador.run_due()
+        self.assertEqual(self._agendador(window=60).run_due(), 1)
+
+    def test_dois_despachantes_nao_entregam_o_mesmo_post(self):
+        from maestroia.services.scheduler import PostScheduler
+
+        agora = time.time()
+        outro = self._agendador(window=60)
+
+        def entregar(posts):
+            # O outro processo roda no meio desta entrega: os posts já estão reservados
+            self.assertEqual(outro.run_due(agora), 0)
+            self.lotes.append(posts)
+
+        agendador = PostScheduler(self.path, deliver=entregar, window=60)
+        for i in range(3):
+            agendador.schedule("LinkedIn", f"post {i}", agora - 1)
+        self.assertEqual(agendador.run_due(agora), 3)
+        self.assertEqual(outro.run_due(agora), 0)
+        self.assertEqual(len(self.lotes), 1)
+        self.assertEqual(agendador.stats()["dispatched"], 3)
+
+    def test_falha_retenta_com_backoff_e_depois_marca_failed(self):
+        from maestroia.services.scheduler import PostScheduler
+
+        tentativas = []
+
+        def entregar(posts):
+            tentativas.append([p["id"] for p in posts])
+            return {p["id"]: "Erro ao publicar no TikTok: 503" for p in posts if p["channel"] == "TikTok"}
+
+        agendador = PostScheduler(self.path, deliver=entregar, window=3600, max_attempts=2, retry_delay=10)
+        agora = time.time()
+        falho = agendador.schedule("TikTok", "video", agora - 1)
+        ok = agendador.schedule("Instagram", "foto", agora - 1)
+        self.assertEqual(agendador.run_due(agora), 1)
+        self.assertEqual([p["id"] for p in agendador.pending()], [falho])
+        # Backoff: ainda não é hora de tentar de novo
+        self.assertEqual(agendador.run_due(agora + 1), 0)
+        self.assertEqual(agendador.run_due(agora + 12), 0)
+        self.assertEqual(tentativas, [[falho, ok], [falho]])
+        stats = agendador.stats()
+        self.assertEqual((stats["failed"], stats["dispatched"], stats["scheduled"]), (1, 1, 0))
+
+    def test_reserva_de_despachante_morto_expira(self):
+        agendador = self._agendador(window=60, lease=30)
+        agora = time.time()
+        post_id = agendador.schedule("Facebook", "post", agora - 1)
+        # Processo caiu logo depois de reservar
+        self.assertEqual(len(agendador._reservar([post_id], agora)), 1)
+
+        reiniciado = self._agendador(window=60, lease=30)
+        self.assertEqual(reiniciado.run_due(agora + 1), 0)
+        self.assertEqual(reiniciado.run_due(agora + 31), 1)
+        self.assertEqual([p["id"] for p in self.lotes[0]], [post_id])
+
+    def test_thread_acorda_com_novo_agendamento(self):
+        agendador = self._agendador(window=60, refresh=60)
+        agendador.start()
+        self.addCleanup(agendador.stop, 2)
+        time.sleep(0.1)
+        agendador.schedule("YouTube", "video", time.time() + 0.2)
+        limite = time.time() + 3
+        while not self.lotes and time.time() < limite:
+            time.sleep(0.05)
+        self.assertEqual(self.lotes[0][0]["content"], "video")
+
+
+if __name__ == "__main__":
+    unittest.main()
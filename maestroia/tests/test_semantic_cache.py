@@ -0,0 +1,97 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from maestroia.config import settings
+from maestroia.memory.semantic_cache import SemanticCache
+from maestroia.memory.vector import VectorStore
+from maestroia.services.llm_cache import ResponseCache
+
+
+def _embeddings_por_tema(texts):
+    """Textos com a mesma primeira palavra ficam quase paralelos (cos ~0.98)."""
+    linhas = []
+    for t in texts:
+        tema = np.random.default_rng(sum(t.split()[0].encode())).standard_normal(settings.DEFAULT_EMBEDDING_DIM)
+        ruido = np.random.default_rng(sum(t.encode())).standard_normal(settings.DEFAULT_EMBEDDING_DIM)
+        v = tema + 0.15 * ruido
+        linhas.append(v / np.linalg.norm(v))
+    return np.asarray(linhas, dtype=np.float32)
+
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for p in (
+            patch("maestroia.memory.vector.get_embeddings", side_effect=_embeddings_por_tema),
+            patch.object(settings, "SEMANTIC_CACHE_ENABLED", True),
+        ):
+            p.start()
+            self.addCleanup(p.stop)
+        self.cache = SemanticCache(
+            VectorStore(os.path.join(tmp.name, "sem")),
+            ResponseCache(os.path.join(tmp.name, "c.db"), table="semantic_cache"),
+            threshold=0.9,
+        )
+        self.chamadas = []
+
+    def _gerar(self, saida):
+        def gerar():
+            self.chamadas.append(saida)
+            return saida
+        return gerar
+
+    def test_pedido_parecido_reaproveita_saida(self):
+        c = self.cache
+        self.assertEqual(c.get_or_generate("pesquisador", "cosméticos mulheres 25-40", self._gerar("A")), "A")
+        self.assertEqual(c.get_or_generate("pesquisador", "cosméticos mulheres 25-45", self._gerar("B")), "A")
+        # Outro tema ou outro agente: gera de novo
+        self.assertEqual(c.get_or_generate("pesquisador", "pneus frotas", self._gerar("C")), "C")
+        self.assertEqual(c.get_or_generate("estrategista", "cosméticos mulheres 25-40", self._gerar("D")), "D")
+        self.assertEqual(self.chamadas, ["A", "C", "D"])
+
+        stats = c.stats()["pesquisador"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+        self.assertIn("latency_saved_s", stats)
+
+    def test_janela_de_validade_e_fallback(self):
+        c = self.cache
+        c.get_or_generate("pesquisador", "cosméticos", self._gerar("[FALLBACK OPENAI] fora do ar"))
+        self.assertEqual(c.get_or_generate("pesquisador", "cosméticos", self._gerar("real")), "real")
+
+        c.ttl = -1  # tudo fora da janela
+        self.assertEqual(c.get_or_generate("pesquisador", "cosméticos", self._gerar("nova")), "nova")
+
+    def test_desligado_nao_consulta(self):
+        with patch.object(settings, "SEMANTIC_CACHE_ENABLED", False):
+            self.cache.get_or_generate("pesquisador", "x", self._gerar("A"))
+            self.cache.get_or_generate("pesquisador", "x", self._gerar("B"))
+        self.assertEqual(self.chamadas, ["A", "B"])
+        self.assertEqual(self.cache.stats(), {})
+
+    def test_agente_pesquisador_async_usa_cache(self):
+        import maestroia.agents.pesquisador as pesquisador
+
+        async def achat(prompt, **kw):
+            self.chamadas.append(prompt)
+            return "análise"
+
+        state = {"objetivo": "lançar produto X", "publico_alvo": "mulheres 25-40"}
+        with patch.object(pesquisador, "semantic_cache", self.cache), \
+                patch.object(pesquisador, "openai_achat", side_effect=achat), \
+                patch.object(pesquisador, "get_trends_summary", return_value="trends"):
+            primeiro = asyncio.run(pesquisador.agente_pesquisador_async(state))
+            segundo = asyncio.run(pesquisador.agente_pesquisador_async(state))
+
+        self.assertEqual(primeiro, segundo)
+        self.assertEqual(len(self.chamadas), 2)  # concorrentes + análise, só na primeira vez
+
+
+if __name__ == "__main__":
+    unittest.main()
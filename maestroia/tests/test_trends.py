@@ -0,0 +1,198 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+from maestroia.services.llm_cache import ResponseCache
+from maestroia.services.rate_limit import TokenBucket
+
+
+def _serie(valores, **colunas):
+    datas = pd.date_range("2024-01-07", periods=len(valores), freq="W")
+    return pd.DataFrame({"tênis": valores, **colunas}, index=pd.Index(datas, name="date"))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rajada_e_reposicao(self):
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertFalse(bucket.acquire(timeout=0.01))
+        inicio = time.monotonic()
+        self.assertTrue(bucket.acquire(timeout=1.0))
+        self.assertGreater(time.monotonic() - inicio, 0.02)
+
+
+class TestTrendsClient(unittest.TestCase):
+    def setUp(self):
+        from maestroia.services.trends_service import TrendsClient
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = ResponseCache(os.path.join(tmp.name, "cache.db"), table="trends_cache", ttl=3600)
+        self.pytrends = MagicMock()
+        self.pytrends.interest_over_time.return_value = _serie([40, 50])
+        self.client = TrendsClient(self.cache, TokenBucket(rate=100.0, capacity=5), ttl=60, cooldown=30, timeout=0.1)
+        self.client._sessao = lambda: self.pytrends
+
+    def test_cache_por_consulta_e_sessao_unica(self):
+        dados, _ = self.client.interest_over_time(["tênis"], geo="BR")
+        self.assertEqual(dados["tênis"].tolist(), [40, 50])
+        self.client.interest_over_time(["tênis"], geo="BR")
+        self.assertEqual(self.pytrends.interest_over_time.call_count, 1)
+
+        # Outro processo lê do disco, com o índice de datas preservado
+        from maestroia.services.trends_service import TrendsClient
+        outro = TrendsClient(ResponseCache(self.cache.path, table="trends_cache", ttl=3600), TokenBucket(1.0))
+        dados, _ = outro.interest_over_time(["tênis"], geo="BR")
+        self.assertIsInstance(dados.index, pd.DatetimeIndex)
+
+        # geo diferente é outra chave
+        self.client.interest_over_time(["tênis"], geo="PT")
+        self.assertEqual(self.pytrends.interest_over_time.call_count, 2)
+
+    def test_dados_vencidos_depois_de_429(self):
+        from maestroia.services.trends_service import TrendsUnavailable
+
+        self.client.interest_over_time(["tênis"])
+        erro = Exception("429")
+        erro.response = SimpleNamespace(status_code=429)
+        self.pytrends.interest_over_time.side_effect = erro
+
+        with patch("maestroia.services.trends_service.time.time", return_value=time.time() + 120):
+            dados, coletado_em = self.client.interest_over_time(["tênis"])
+            self.assertEqual(dados["tênis"].tolist(), [40, 50])
+            # Em pausa depois do 429: nem tenta o Google
+            self.client.interest_over_time(["tênis"])
+        self.assertEqual(self.pytrends.interest_over_time.call_count, 2)
+
+        with self.assertRaises(TrendsUnavailable):
+            self.client.interest_over_time(["outro termo"])
+
+    def test_resumo_usa_cache_vencido_e_nunca_simula(self):
+        from maestroia.services import trends_service
+
+        with patch.object(trends_service, "trends_client", self.client):
+            self.assertIn("interesse 50/100 (média de 4 períodos 45), tendência +10.00", trends_service.get_trends_summary(["tênis"]))
+            self.pytrends.interest_over_time.side_effect = RuntimeError("sem rede")
+            with patch("maestroia.services.trends_service.time.time", return_value=time.time() + 120):
+                resumo = trends_service.get_trends_summary(["tênis"])
+            self.assertIn("interesse 50/100", resumo)
+            self.assertIn("coletados em", resumo)
+
+            resumo = trends_service.get_trends_summary(["sem cache"])
+            self.assertIn("indisponíveis", resumo)
+            self.assertNotIn("simulados", resumo)
+
+
+class TestTrendsMuitosTermos(unittest.TestCase):
+    def test_grupos_com_ancora_e_escala_unica(self):
+        from maestroia.services.trends_service import TrendsClient
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = ResponseCache(os.path.join(tmp.name, "cache.db"), table="trends_cache")
+        client = TrendsClient(cache, TokenBucket(rate=100.0, capacity=10), workers=2)
+        # Volume "real" de cada termo; o Google normaliza cada payload pelo seu máximo
+        volume = {f"t{i}": float(10 * (i + 1)) for i in range(9)}
+        payloads = []
+
+        class Sessao:
+            def build_payload(self, kw_list, **kwargs):
+                self.kw = kw_list
+                payloads.append(list(kw_list))
+
+            def interest_over_time(self):
+                maximo = max(volume[k] for k in self.kw)
+                dados = {k: [round(volume[k] / maximo * 100 * f) for f in (0.5, 1.0)] for k in self.kw}
+                return pd.DataFrame({**dados, "isPartial": [False, True]},
+                                    index=pd.date_range("2024-01-07", periods=2, freq="W"))
+
+        client._sessao = Sessao
+        dados, _ = client.interest_over_time_many(list(volume), anchor="t0")
+
+        self.assertEqual(sorted(len(p) for p in payloads), [5, 5])
+        self.assertTrue(all(p[0] == "t0" for p in payloads))
+        self.assertEqual(list(dados.columns), list(volume))
+        # Mesma escala: proporcional ao volume, com o maior termo em 100
+        np.testing.assert_allclose(dados.iloc[-1].to_numpy(), [v / 90 * 100 for v in volume.values()], atol=1.5)
+
+    def test_estatisticas_vetorizadas(self):
+        from maestroia.services.trends_service import trend_stats
+
+        datas = pd.date_range("2023-01-01", periods=60, freq="W")
+        dados = pd.DataFrame({"sobe": np.arange(60, dtype=float) + 10, "plano": np.full(60, 20.0)}, index=datas)
+        e = trend_stats(dados)
+
+        self.assertAlmostEqual(e.loc["sobe", "inclinacao"], 1.0)
+        self.assertAlmostEqual(e.loc["plano", "inclinacao"], 0.0)
+        self.assertAlmostEqual(e.loc["sobe", "media_movel"], 67.5)
+        self.assertAlmostEqual(e.loc["plano", "yoy"], 0.0)
+        self.assertGreater(e.loc["sobe", "yoy"], 0)
+        self.assertTrue(np.isnan(trend_stats(dados.iloc[:10]).loc["sobe", "yoy"]))
+
+    def test_termos_curtos_de_textos_livres(self):
+        from maestroia.services.trends_service import trend_keywords
+
+        termos = trend_keywords("Aumentar as vendas de tênis de corrida", "Mulheres 25-40")
+        self.assertIn("tênis", termos)
+        self.assertIn("corrida", termos)
+        self.assertIn("mulheres 25-40", termos)
+        self.assertNotIn("de", termos)
+
+
+class TestTrendsPrewarmer(unittest.TestCase):
+    def test_aquece_os_termos_do_pesquisador(self):
+        from maestroia.services.trends_prewarm import TrendsPrewarmer
+        from maestroia.services.trends_service import TrendsUnavailable, trend_keywords
+
+        client = MagicMock(ttl=6 * 3600)
+        client.interest_over_time_many.side_effect = [(None, 1000.0), TrendsUnavailable("429")]
+        nichos = [("Vender tênis de corrida", "Mulheres 25-40"), ("Curso de inglês", "")]
+        prewarmer = TrendsPrewarmer(client, intervalo=3600, top=2, fonte=lambda top: nichos[:top])
+
+        status = prewarmer.run_once()
+
+        primeiro = trend_keywords(*nichos[0])
+        client.interest_over_time_many.assert_any_call(primeiro, max_age=5 * 3600)
+        self.assertEqual(status[" | ".join(primeiro)]["refreshed_at"], 1000.0)
+        segundo = status[" | ".join(trend_keywords(*nichos[1]))]
+        self.assertIsNone(segundo["refreshed_at"])
+        self.assertEqual(segundo["error"], "429")
+        self.assertIsNotNone(prewarmer.status()["last_run"])
+
+    def test_nichos_mais_frequentes(self):
+        import os
+        import tempfile
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from maestroia.core.database import Base, Campaign
+        from maestroia.services.trends_prewarm import popular_niches
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp.name, 'teste.db')}")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(bind=engine)
+        Sessao = sessionmaker(bind=engine)
+
+        db = Sessao()
+        db.add(Campaign(user_id=1, objetivo="nicho raro", publico_alvo="p"))
+        db.add_all([Campaign(user_id=1, objetivo="nicho popular", publico_alvo="p") for _ in range(3)])
+        db.add(Campaign(user_id=1, objetivo="sem público", publico_alvo=None))
+        db.commit()
+        db.close()
+
+        nichos = popular_niches(10, sessao=Sessao)
+        self.assertEqual(nichos[0], ("nicho popular", "p"))
+        self.assertIn(("sem público", ""), nichos)
+        self.assertEqual(popular_niches(1, sessao=Sessao), [("nicho popular", "p")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,8 @@ warnings.filterwarnings("ignore", message="Core Pydantic V1 functionality isn't
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'maestroia'))
 
 from maestroia.graphs.marketing_graph import build_marketing_graph
+from maestroia.config.settings import PUBLISH_OUTBOX_ENABLED
+from maestroia.services.outbox import outbox_worker
 
 if __name__ == "__main__":
     graph = build_marketing_graph()
@@ -18,4 +20,7 @@ if __name__ == "__main__":
         "orcamento": 10000.0
     }
     result = graph.invoke(initial_state)
-    print("Resultado da Campanha:", result)
\ No newline at end of file
+    print("Resultado da Campanha:", result)
+    if PUBLISH_OUTBOX_ENABLED:
+        # Os workers da outbox morrem com o processo: publica o que foi enfileirado antes de sair
+        print("Outbox:", outbox_worker.drain())
@@ -0,0 +1,71 @@
+"""Executa campanhas em lote a partir de um arquivo JSONL.
+
+Cada linha de entrada é um `MaestroState` (opcionalmente com `campaign_id` para
+salvar checkpoints e retomar o lote). Cada linha de saída é o resultado de uma
+campanha, escrito assim que ela termina.
+
+Uso:
+  python run_batch.py campanhas.jsonl -o resultados.jsonl --max-concurrency 4
+  cat campanhas.jsonl | python run_batch.py - > resultados.jsonl
+"""
+import sys
+import os
+import json
+import argparse
+import warnings
+
+# Suprimir aviso de compatibilidade Pydantic v1 com Python 3.14+
+warnings.filterwarnings("ignore", message="Core Pydantic V1 functionality isn't compatible with Python 3.14 or greater")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'maestroia'))
+
+from maestroia.services.campaign_service import run_campaigns
+from maestroia.config.settings import PUBLISH_OUTBOX_ENABLED
+from maestroia.services.outbox import outbox_worker
+
+
+def ler_jsonl(arquivo):
+    for linha in arquivo:
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield json.loads(linha)
+        except json.JSONDecodeError:
+            # A linha inválida vira um resultado de erro sem interromper o lote
+            yield linha
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa campanhas MaestroIA em lote (JSONL)')
+    parser.add_argument('entrada', help="arquivo JSONL de entrada ('-' para stdin)")
+    parser.add_argument('-o', '--saida', help='arquivo JSONL de saída (padrão: stdout)')
+    parser.add_argument('--max-concurrency', type=int, default=4, help='campanhas simultâneas')
+    args = parser.parse_args()
+
+    entrada = sys.stdin if args.entrada == '-' else open(args.entrada, encoding='utf-8')
+    saida = open(args.saida, 'w', encoding='utf-8') if args.saida else sys.stdout
+    erros = 0
+    try:
+        for resultado in run_campaigns(ler_jsonl(entrada), max_concurrency=args.max_concurrency):
+            if resultado["status"] != "ok":
+                erros += 1
+            saida.write(json.dumps(resultado, ensure_ascii=False, default=str) + "\n")
+            saida.flush()
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+
+    if PUBLISH_OUTBOX_ENABLED:
+        # Os workers da outbox morrem com o processo: publica o que foi enfileirado antes de sair
+        stats = outbox_worker.drain()
+        print(f"Outbox: {stats['pending']} publicações aguardando nova tentativa, {stats['dead']} na fila morta.",
+              file=sys.stderr)
+    print(f"Lote concluído ({erros} com erro).", file=sys.stderr)
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark dos índices aproximados da memória vetorial contra o IndexFlatL2.
+
+Gera vetores sintéticos agrupados (parecidos com embeddings de textos de
+campanha), usa o IndexFlatL2 como verdade e mede recall@k, latência por
+consulta e tamanho do índice do HNSW e do IVF em vários valores de
+`efSearch`/`nprobe`, com os códigos de `--storage` (flat, fp16, int8, pq) e
+rerank exato de `k * --rerank` candidatos (como o VectorStore faz).
+
+Uso:
+  python scripts/benchmark_memory.py
+  python scripts/benchmark_memory.py --n 200000 --index ivfpq --k 10
+  python scripts/benchmark_memory.py --storage int8 --rerank 4
+  python scripts/benchmark_memory.py --dim 256 --queries 500
+
+Requer OPENAI_API_KEY no ambiente (exigida por maestroia.config.settings),
+mas não faz nenhuma chamada à API.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from maestroia.memory.vector import build_ann_index, ann_search_params, rerank_exact  # noqa: E402
+
+
+def dados_sinteticos(n: int, dim: int, consultas: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centros = rng.standard_normal((max(1, n // 100), dim)).astype(np.float32)
+    rotulos = rng.integers(0, len(centros), n + consultas)
+    vetores = centros[rotulos] + 0.35 * rng.standard_normal((n + consultas, dim)).astype(np.float32)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    return np.ascontiguousarray(vetores[:n]), np.ascontiguousarray(vetores[n:])
+
+
+def recall(encontrados: np.ndarray, verdade: np.ndarray) -> float:
+    acertos = sum(len(set(a) & set(b)) for a, b in zip(encontrados, verdade))
+    return acertos / verdade.size
+
+
+def medir(index, consultas: np.ndarray, k: int, params=None, exato=None, rerank: int = 1):
+    inicio = time.perf_counter()
+    _, ids = index.search(consultas, k * rerank, params=params)
+    if rerank > 1:
+        base, base_ids = exato
+        reordenados = []
+        for consulta, candidatos in zip(consultas, ids):
+            candidatos = candidatos[candidatos >= 0]
+            distancias = rerank_exact(base, base_ids, consulta, candidatos)
+            reordenados.append(candidatos[np.argsort(distancias)[:k]])
+        ids = reordenados
+    return ids, (time.perf_counter() - inicio) * 1000 / len(consultas)
+
+
+def megabytes(index) -> float:
+    return faiss.serialize_index(index).nbytes / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100000, help="vetores indexados")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index", choices=["hnsw", "ivfpq", "all"], default="all")
+    parser.add_argument("--storage", choices=["flat", "fp16", "int8", "pq"], default="flat")
+    parser.add_argument("--rerank", type=int, default=1, help="candidatos por resultado no rerank exato (1 = sem rerank)")
+    args = parser.parse_args()
+
+    print(f"Gerando {args.n} vetores (dim={args.dim}) e {args.queries} consultas...")
+    vetores, consultas = dados_sinteticos(args.n, args.dim, args.queries)
+
+    flat = faiss.IndexIDMap(faiss.IndexFlatL2(args.dim))
+    flat.add_with_ids(vetores, np.arange(args.n, dtype=np.int64))
+    exato = (flat, np.arange(args.n, dtype=np.int64))
+    verdade, ms_flat = medir(flat, consultas, args.k)
+    print(f"\n{'índice':<8} {'parâmetro':<14} {'recall@' + str(args.k):>9} {'ms/consulta':>12} {'MB':>8}")
+    print(f"{'flat':<8} {'-':<14} {1.0:>9.3f} {ms_flat:>12.3f} {megabytes(flat):>8.1f}")
+
+    tipos = ["hnsw", "ivfpq"] if args.index == "all" else [args.index]
+    for tipo in tipos:
+        inicio = time.perf_counter()
+        ann = build_ann_index(vetores, kind=tipo, storage=args.storage)
+        print(f"{tipo:<8} {'(construção)':<14} {'':>9} {time.perf_counter() - inicio:>10.1f} s {megabytes(ann):>8.1f}")
+        valores = [16, 32, 64, 128, 256] if tipo == "hnsw" else [1, 4, 16, 64]
+        for valor in valores:
+            if tipo == "hnsw":
+                params, rotulo = ann_search_params(ann, args.k * args.rerank, ef_search=valor), f"efSearch={valor}"
+            else:
+                params, rotulo = ann_search_params(ann, args.k * args.rerank, nprobe=valor), f"nprobe={valor}"
+            ids, ms = medir(ann, consultas, args.k, params, exato, args.rerank)
+            print(f"{tipo:<8} {rotulo:<14} {recall(ids, verdade):>9.3f} {ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Importa o histórico de engajamento por post para o armazenamento colunar.
+
+O CSV precisa das colunas `platform`, `niche`, `timestamp` (epoch em segundos
+ou data ISO) e `engagement` (curtidas + comentários + compartilhamentos, ou a
+métrica que preferir). O arquivo é lido em blocos, então milhões de linhas
+não precisam caber na memória. No fim mostra as melhores janelas por
+plataforma.
+
+Uso:
+  python scripts/import_engagement.py posts.csv
+  python scripts/import_engagement.py posts.csv --chunksize 500000
+
+Requer OPENAI_API_KEY no ambiente (exigida por maestroia.config.settings).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from maestroia.services.engagement import engagement_store  # noqa: E402
+
+
+def epoch(coluna: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(coluna):
+        return coluna.astype("int64")
+    datas = pd.to_datetime(coluna, utc=True)
+    return (datas - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", help="arquivo com platform, niche, timestamp, engagement")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    total = 0
+    plataformas = set()
+    for bloco in pd.read_csv(args.csv, chunksize=args.chunksize):
+        bloco["niche"] = bloco["niche"].fillna("")
+        total += engagement_store.ingest(
+            bloco["platform"].to_numpy(), bloco["niche"].to_numpy(),
+            epoch(bloco["timestamp"]).to_numpy(), bloco["engagement"].fillna(0).to_numpy(),
+        )
+        plataformas.update(bloco["platform"].unique())
+        print(f"{total} posts importados")
+    engagement_store.flush()
+
+    for plataforma in sorted(plataformas):
+        janelas = engagement_store.top_windows(plataforma)
+        print(f"{plataforma}: " + ", ".join(f"{j['janela']} ({j['media']:.1f}, {j['posts']} posts)" for j in janelas))
+
+
+if __name__ == "__main__":
+    main()
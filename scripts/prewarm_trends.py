@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Aquece o cache do Google Trends com os nichos mais frequentes das campanhas.
+
+Lê os pares objetivo/público mais comuns da tabela `campaigns` e atualiza os
+dados do Google Trends no cache usado pelo agente pesquisador, respeitando o
+limite de requisições (TRENDS_RATE_PER_MINUTE).
+
+Uso:
+  python scripts/prewarm_trends.py --once
+  python scripts/prewarm_trends.py --interval 3600 --top 30
+
+Requer OPENAI_API_KEY no ambiente (exigida por maestroia.config.settings).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from maestroia.config import settings  # noqa: E402
+from maestroia.services.trends_prewarm import TrendsPrewarmer  # noqa: E402
+from maestroia.services.trends_service import trends_client  # noqa: E402
+
+
+def imprimir(nichos: dict):
+    for chave, item in nichos.items():
+        quando = time.strftime("%d/%m/%Y %H:%M", time.localtime(item["refreshed_at"])) if item["refreshed_at"] else "-"
+        print(f"{quando:<17} {chave}" + (f"  (erro: {item['error']})" if item["error"] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="uma rodada e sai")
+    parser.add_argument("--interval", type=int, default=settings.TRENDS_PREWARM_INTERVAL_SECONDS)
+    parser.add_argument("--top", type=int, default=settings.TRENDS_PREWARM_TOP, help="nichos mais frequentes")
+    args = parser.parse_args()
+
+    prewarmer = TrendsPrewarmer(trends_client, intervalo=args.interval, top=args.top)
+    while True:
+        imprimir(prewarmer.run_once())
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import hashlib
 import re
 import warnings
 from io import BytesIO
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage
@@ -15,7 +15,13 @@ from reportlab.lib.units import inch
 # Suprimir aviso de compatibilidade Pydantic v1 com Python 3.14+
 warnings.filterwarnings("ignore", message="Core Pydantic V1 functionality isn't compatible with Python 3.14 or greater")
 
-from maestroia.graphs.marketing_graph import build_marketing_graph
+from maestroia.services.campaign_service import stream_campaign
+from maestroia.services.scheduler import post_scheduler
+from maestroia.services.engagement import engagement_store
+from maestroia.config.settings import ENGAGEMENT_UTC_OFFSET_HOURS
+
+# Agendamentos no mesmo fuso das janelas de engajamento, e não no do servidor
+FUSO_AGENDAMENTO = timezone(timedelta(hours=ENGAGEMENT_UTC_OFFSET_HOURS))
 
 # Mercado Pago
 import mercadopago
@@ -692,8 +698,6 @@ else:
             st.session_state.logged_in = False
             st.rerun()
 
-    graph = build_marketing_graph()
-
     # Abas estilizadas
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Criar Campanha", "💎 Planos & Pagamento", "⚙️ Configurações", "📊 Resultados", "📅 Agendamento"])
 
@@ -762,29 +766,41 @@ else:
                     progress_bar = st.progress(0)
                     status_text = st.empty()
 
-                    agentes = [
-                        ("🔍 Pesquisador", "Analisando mercado e tendências"),
-                        ("🎯 Estrategista", "Desenvolvendo estratégia de marketing"),
-                        ("✍️ Criador de Conteúdo", "Gerando conteúdos otimizados"),
-                        ("📤 Publicador", "Publicando em canais selecionados"),
-                        ("📊 Otimizador", "Otimizando performance"),
-                        ("🎼 Maestro", "Orquestrando resultados finais")
-                    ]
-
-                    for i, (agente, descricao) in enumerate(agentes):
+                    agentes = {
+                        "pesquisador": ("🔍 Pesquisador", "Mercado e tendências analisados"),
+                        "estrategista": ("🎯 Estrategista", "Estratégia de marketing definida"),
+                        "criador_conteudo": ("✍️ Criador de Conteúdo", "Conteúdo gerado"),
+                        "gerador_imagem": ("🖼️ Criador de Conteúdo", "Imagem gerada"),
+                        "publicador": ("📤 Publicador", "Publicação processada"),
+                        "otimizador": ("📊 Otimizador", "Performance otimizada"),
+                        "maestro": ("🎼 Maestro", "Resultados orquestrados")
+                    }
+                    # Criação e publicação emitem um evento por canal
+                    total_eventos = 5 + 2 * len(canais)
+                    concluidos = 0
+
+                    # Executar campanha acompanhando cada agente concluído
+                    state = {
+                        "objetivo": objetivo,
+                        "publico_alvo": publico,
+                        "canais": canais,
+                        "orcamento": orcamento
+                    }
+                    result = {}
+                    for evento in stream_campaign(state):
+                        if evento["type"] == "done":
+                            result = evento["result"]
+                            break
+                        if evento["node"] not in agentes:
+                            continue
+                        agente, descricao = agentes[evento["node"]]
+                        update = evento["update"]
+                        if update.get("publicacoes"):
+                            descricao += f" ({', '.join(update['publicacoes'])})"
+                        concluidos += 1
                         status_text.markdown(f'<div class="agent-progress">{agente}: {descricao}</div>', unsafe_allow_html=True)
-                        progress_bar.progress((i + 1) / len(agentes))
-                        import time
-                        time.sleep(1.0)  # Simular processamento
-
-                # Executar campanha
-                state = {
-                    "objetivo": objetivo,
-                    "publico_alvo": publico,
-                    "canais": canais,
-                    "orcamento": orcamento
-                }
-                result = graph.invoke(state)
+                        progress_bar.progress(min(concluidos / total_eventos, 1.0))
+
                 st.session_state.last_result = result
                 st.session_state.campaign_executed = True
                 st.session_state.campaign_data = state
@@ -1218,8 +1234,8 @@ else:
         # Análise de horários ideais
         st.markdown("#### 🕐 Horários Mais Acessados no Nicho")
 
-        # Simulação de dados de horários (futuramente integrar com analytics reais)
-        horarios_ideais = {
+        # Referência genérica, usada só para plataformas ainda sem histórico de engajamento
+        horarios_padrao = {
             "Instagram": ["08:00-10:00", "18:00-20:00", "12:00-14:00"],
             "Facebook": ["13:00-15:00", "19:00-21:00", "09:00-11:00"],
             "Twitter/X": ["12:00-14:00", "18:00-20:00", "08:00-10:00"],
@@ -1227,16 +1243,21 @@ else:
             "TikTok": ["18:00-22:00", "12:00-14:00", "08:00-10:00"],
             "YouTube": ["14:00-16:00", "19:00-21:00", "11:00-13:00"]
         }
+        nicho_campanha = st.session_state.get("campaign_data", {}).get("publico_alvo")
+        janelas_ideais = {p: engagement_store.top_windows(p, nicho_campanha) for p in horarios_padrao}
 
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**Horários Sugeridos por Plataforma:**")
-            for plataforma, horarios in horarios_ideais.items():
-                st.markdown(f"**{plataforma}:** {', '.join(horarios)}")
+            for plataforma, horarios in horarios_padrao.items():
+                if janelas_ideais[plataforma]:
+                    st.markdown(f"**{plataforma}:** {', '.join(j['janela'] for j in janelas_ideais[plataforma])}")
+                else:
+                    st.markdown(f"**{plataforma}:** {', '.join(horarios)} _(referência geral)_")
 
         with col2:
             st.markdown("**📊 Baseado em Análise de Dados**")
-            st.info("💡 Estes horários são sugeridos com base em padrões de engajamento no seu nicho. Use analytics reais para otimizar.")
+            st.info("💡 Horários calculados a partir do engajamento médio por hora da semana dos posts do seu nicho (ou da plataforma, com pouco histórico).")
 
         st.markdown("---")
 
@@ -1253,18 +1274,47 @@ else:
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     plataforma = st.selectbox("Plataforma:", ["Instagram", "Facebook", "Twitter/X", "LinkedIn", "TikTok", "YouTube"])
+                # Sugere a próxima ocorrência da melhor janela da plataforma escolhida
+                sugestao = None
+                if janelas_ideais.get(plataforma):
+                    sugestao = datetime.fromtimestamp(
+                        engagement_store.next_occurrence(janelas_ideais[plataforma][0]["how"]), FUSO_AGENDAMENTO
+                    )
+                agora = datetime.now(FUSO_AGENDAMENTO)
+                # Sem sugestão, a próxima hora cheia (valor estável entre os reruns do widget)
+                sugestao = sugestao or agora.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
                 with col2:
-                    data_agendamento = st.date_input("Data:", min_value=datetime.now().date())
+                    data_agendamento = st.date_input("Data:", value=sugestao.date(), min_value=agora.date())
                 with col3:
-                    hora_agendamento = st.time_input("Hora:")
+                    hora_agendamento = st.time_input(f"Hora (UTC{ENGAGEMENT_UTC_OFFSET_HOURS:+g}):", value=sugestao.time())
 
                 if st.button("📅 Agendar Post", type="primary"):
-                    # Simulação de agendamento (futuramente integrar com scheduler real)
-                    st.success(f"✅ Post agendado para {plataforma} em {data_agendamento} às {hora_agendamento}")
-                    # TODO: Salvar no banco de dados ou scheduler
+                    quando = datetime.combine(data_agendamento, hora_agendamento, tzinfo=FUSO_AGENDAMENTO)
+                    conteudo = st.session_state.last_result["conteudos"][selected_conteudo - 1]
+                    if quando <= datetime.now(FUSO_AGENDAMENTO):
+                        st.warning("⚠️ Escolha uma data e hora no futuro.")
+                    else:
+                        post_scheduler.schedule(plataforma, conteudo, quando.timestamp(), user_id=st.session_state.email)
+                        # O despacho roda em segundo plano neste processo (e na API, se estiver no ar)
+                        post_scheduler.start()
+                        st.success(f"✅ Post agendado para {plataforma} em {data_agendamento} às {hora_agendamento}")
             else:
                 st.info("📝 Aprove conteúdos na aba de Resultados primeiro.")
         else:
             st.info("📝 Execute e aprove conteúdos primeiro para agendar posts.")
 
+        # Próximos posts agendados do usuário
+        agendados = post_scheduler.pending(user_id=st.session_state.email, limit=20)
+        if agendados:
+            st.markdown("#### 🗓️ Próximos Posts Agendados")
+            for post in agendados:
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    quando = datetime.fromtimestamp(post["due_at"], FUSO_AGENDAMENTO).strftime("%d/%m/%Y %H:%M")
+                    st.markdown(f"**{quando}** · {post['channel']} · {post['content'][:80]}")
+                with col2:
+                    if st.button("Cancelar", key=f"cancelar_agendamento_{post['id']}"):
+                        post_scheduler.cancel(post["id"])
+                        st.rerun()
+
         st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file